@@ -1,7 +1,11 @@
+from urllib.parse import urlsplit
+
 import pandas as pd
 
+from . import httpclient, instrument
 from .helperfunctions import convert_inch_to_cm, convert_pounds_to_kg
-from .roster import download_player_ids
+from .roster import download_player_ids, get_player_links, submit_player_ids, collect_player_ids
+from .scheduler import get_scheduler, BULK
 
 
 team_urls = {
@@ -45,7 +49,8 @@ def get_players(team: str):
     apendix = "team/players-roster"
     if url:
         url += apendix
-        tables = pd.read_html(url)
+        with instrument.span('active_players.roster.read_html'):
+            tables = httpclient.read_html(url, stage='active_players')
         return tables
     return None
 
@@ -54,7 +59,8 @@ def download_injury_report(team: str):
     apendix = "team/injury-report"
     if base_url:
         url = base_url + apendix
-        tables = pd.read_html(url)
+        with instrument.span('active_players.injuries.read_html'):
+            tables = httpclient.read_html(url, stage='active_players')
         return tables
     return None
 
@@ -80,7 +86,11 @@ def get_active_players(team: str) -> pd.DataFrame:
     return active[active['status'] == 1].copy()
 
 def build_active_players(team: str) -> pd.DataFrame:
-    actives = get_active_players(team)
+    return merge_active_players(team, get_active_players(team), download_player_ids(team))
+
+
+def merge_active_players(team: str, actives: pd.DataFrame, ids: dict) -> pd.DataFrame:
+    """joins the active players of the team site with their ids {name: (gsis_id, esb_id)}"""
     del actives['status']
     actives = actives.rename(
         columns={'Player': 'name',
@@ -90,19 +100,33 @@ def build_active_players(team: str) -> pd.DataFrame:
                  'Exp': 'exp',
                  'College': 'college',
                  'Pos': 'Position',})
-    ids = download_player_ids(team)
     ids = pd.DataFrame(ids, index=('gsis_id', 'esb_id'))
     ids = ids.T
     ids = ids.reset_index()
     ids.rename(columns={'index': 'name'}, inplace=True)
     df = pd.merge(actives, ids, how='inner', on='name')
     df['team'] = team
+    instrument.count('rows.active_players', len(df))
     print(team)
     return df
 
 
-def get_active_players_for_all_teams() -> pd.DataFrame:
-    players = [build_active_players(team) for team in team_urls]
+def get_active_players_for_all_teams(priority: int = BULK) -> pd.DataFrame:
+    """the team sites, roster pages and player profiles of all teams are fetched
+    concurrently by the shared FetchScheduler under the rate limit of their hosts
+    """
+    scheduler = get_scheduler()
+    # both pages of a team site (roster and injury report) count against its budget
+    actives = {
+        team: scheduler.submit(get_active_players, team, host=urlsplit(url).netloc,
+                               priority=priority, cost=2)
+        for team, url in team_urls.items()}
+    links = {
+        team: scheduler.submit(get_player_links, team, host='nfl.com', priority=priority)
+        for team in team_urls}
+    ids = {team: submit_player_ids(links[team].result(), priority) for team in team_urls}
+    players = [merge_active_players(team, actives[team].result(), collect_player_ids(ids[team]))
+               for team in team_urls]
     df = pd.concat(players, sort=False, ignore_index=True)
     df.to_csv('active_players_2019-09-26.csv')
     return df
@@ -120,7 +144,8 @@ def get_depth_info(team: str):
 def download_depth_chart(team: str):
     appendix = "team/depth-chart"
     url = team_urls.get(team, None) + appendix
-    frames = pd.read_html(url)
+    with instrument.span('active_players.depth_chart.read_html'):
+        frames = httpclient.read_html(url, stage='active_players')
     offense, defense, *_ = frames
     return offense, defense
 
@@ -0,0 +1,101 @@
+# cache.py
+import threading
+from collections import OrderedDict
+
+# cap on the raw payload bytes, the parsed objects take a few times more memory
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+
+
+class PayloadCache():
+    """LRU cache for parsed payloads (e.g. gtd.json), bounded by the summed size
+    of their raw payloads in bytes: the decompressed bytes the object was decoded
+    from, the same for a cached file and a download. The cap is an approximation of
+    the memory, it doesn't measure the parsed objects, which are a few times larger
+    and the size of a payload differs slightly with its json formatting.
+    The cached objects are shared, callers must not change them.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, key):
+        """returns the payload of key or None, a hit makes key the most recently used"""
+        with self._lock:
+            try:
+                obj, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return obj
+
+
+    def put(self, key, obj, size: int):
+        """adds the payload with the size of its raw payload (see PayloadCache),
+        payloads larger than the whole cache are not stored
+        """
+        with self._lock:
+            self.__discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (obj, size)
+            self.size += size
+            self.__evict()
+
+
+    def invalidate(self, key):
+        """drops key, e.g. after a live game was fetched again"""
+        with self._lock:
+            self.__discard(key)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+    def configure(self, max_bytes: int):
+        """changes the memory cap, evicts payloads above the new cap"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.__evict()
+
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+        }
+
+
+    def __discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+    def __evict(self):
+        while self.size > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+
+
+# parsed gtd.json payloads by eid, shared by all NflLoader instances
+GAME_CACHE = PayloadCache()
@@ -1,16 +1,27 @@
-import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import partial
 from pathlib import Path
 from typing import NewType
 
-import requests
 import pandas as pd
-import numpy as np
+from requests.exceptions import RequestException
 from tqdm import tqdm
 
+from . import instrument, serialization
+from .serialization import CorruptFileError
 from .scheduleloader import (
-    ScheduleLoader, load_json, save_obj_to_json, create_date_from_eid, add_dateinfo)
+    ScheduleLoader, load_json, read_json_bytes, save_obj_to_json, create_date_from_eid,
+    add_dateinfo, SCHEDULE_TTL)
 from .playerdataloader import PlayerDataLoader
+from .cache import GAME_CACHE
+from .gamecenter import GAMECENTER_URL, JSONARCHIVE_PATH, prefetch_games, flatten_team_stats
+from .tablestore import get_store, DEFAULT_FORMAT
+from .manifest import CacheManifest, game_key, week_key, season_key, gamestats_key
+from .schema import compact_table, concat_tables
+from .scoring import standard_fpts, score_table, add_fpts_columns, DEFAULT_RULESETS
 from .active_players import get_active_players_for_all_teams
+from .scheduler import get_scheduler, BULK
 
 EID = NewType('EID', str)
 
@@ -25,56 +36,199 @@ class NflLoader():
         new bool: if True creates new tables from scratch, ignoring old ones (default False)
         save bool: if True saves intermediate tables (default True)
         seasontype str: 'PRE', 'REG' (default), 'POST'?
+        rulesets tuple: names of the scoring rulesets, each adds a fpts_<name> column
+            (default ('standard', 'half_ppr', 'ppr'))
+        workers int: number of threads building the game tables of a week (default 1)
+        storage str: format of the stored tables, 'parquet' (default if pyarrow is
+            installed), 'feather' or 'csv', existing csv tables are converted on read
+        preload bool: if True loads all players of the database into memory once and
+            downloads the players missing in a week in one batch (default False)
+        compact bool: if True tables use the compact schema of schema.compact_table
+            (categoricals, small integers, float32, datetime64), tables read from
+            the store are converted as well (default False)
+        priority int: priority of the game downloads in the shared FetchScheduler,
+            scheduler.INTERACTIVE jumps ahead of bulk downloads (default scheduler.BULK)
+        schedule_ttl float: seconds until the schedule of a week with open games is
+            fetched again, finished weeks are never fetched again
+            (default scheduleloader.SCHEDULE_TTL)
         """
         self.season = season
         self.update_schedule = update_schedule
         self.seasontype = kwargs.get('seasontype', 'REG')
         self.new = kwargs.get('new', False)
         self.save = kwargs.get('save', True)
+        self.rulesets = tuple(kwargs.get('rulesets', DEFAULT_RULESETS))
+        self.workers = max(1, kwargs.get('workers', 1))
+        self.store = get_store(kwargs.get('storage', DEFAULT_FORMAT))
+        self.preload = kwargs.get('preload', False)
+        self.compact = kwargs.get('compact', False)
+        self.priority = kwargs.get('priority', BULK)
+        self.schedule_ttl = kwargs.get('schedule_ttl', SCHEDULE_TTL)
 
         self.schedule_loader = ScheduleLoader(
-            season=self.season, seasontype=self.seasontype, update=True)
+            season=self.season, seasontype=self.seasontype, update=True,
+            ttl=self.schedule_ttl, priority=self.priority)
         self.tables = []
         self.weektables = {}
-        self.datapath = Path("NflDataLoader/database")
-        self.datapath = self.datapath / str(self.season) / self.seasontype
-        self.datapath.mkdir(exist_ok=True, parents=True)
+        self.database_path = Path("NflDataLoader/database")
+        self.datapath = self.database_path / str(self.season) / self.seasontype
+        self.manifest = CacheManifest.for_root(self.database_path)
         self.schedule = None
         self.seasontable = pd.DataFrame()
         self.player_loader = PlayerDataLoader()
+        if self.preload:
+            self.player_loader.preload()
 
 
     def get_game_eid(self, week: int, team: str) -> EID:
         '''
-        return the eid for the given combination of season, week, team
+        return the eid for the given combination of season, week, team,
+        None in the team's bye week
         '''
         if (self.schedule_loader is None) or (self.schedule_loader.season != self.season):
             self.schedule_loader = ScheduleLoader(
-                self.season, week, seasontype=self.seasontype, update=True)
-        schedule = self.schedule_loader.get_schedule(self.season, week, self.seasontype)
-        for dic in schedule:
-            if team in dic['home'] or team in dic['away']:
-                return EID(dic['eid'])
-        return None
+                self.season, week, seasontype=self.seasontype, update=True,
+                ttl=self.schedule_ttl, priority=self.priority)
+        index = self.schedule_loader.get_index(self.season, self.seasontype)
+        return index.get_eid(self.season, self.seasontype, week, team)
 
 
     def get_game_stats(self, eid: EID) -> dict:
         '''
         eid -> dic(gamestats)
         '''
-        jsonurl = f'http://www.nfl.com/liveupdate/game-center/{eid}/{eid}_gtd.json'
-        directory_path = Path("NflDataLoader/database/jsonarchive")
-        filename = f'{eid}.json'
-        filepath = directory_path / filename
-        directory_path.mkdir(parents=True, exist_ok=True)
+        gamestats = GAME_CACHE.get(eid)
+        if gamestats is not None:
+            instrument.count('cache.gamestats.memory_hits')
+            return gamestats
+        filepath = JSONARCHIVE_PATH / f'{eid}.json'
         try:
-            return load_json(filepath)
-        except FileNotFoundError:
-            resp = requests.get(jsonurl, timeout=5)
-            if resp.status_code == 200:
-                save_obj_to_json(resp.json(), directory_path, filename)
-                return resp.json()
+            with instrument.span('gamestats.read'):
+                raw = read_json_bytes(filepath)
+            with instrument.span('gamestats.parse'):
+                gamestats, size = serialization.loads_sized(raw)
+        except (FileNotFoundError, CorruptFileError) as err:
+            if isinstance(err, CorruptFileError):
+                print(f"Corrupt game stats of {eid} ({err}), fetching them again")
+                instrument.count('cache.gamestats.corrupt')
+            else:
+                instrument.count('cache.gamestats.misses')
+            # without a local copy an ETag of the manifest would only get a 304
+            self.manifest.remove(gamestats_key(eid))
+            gamestats = self.__fetch_game_stats(eid, create_date_from_eid(eid) < date.today())
+            if gamestats is not None:
+                return gamestats
             print("No Connection to game center")
+            return None
+        instrument.count('cache.gamestats.disk_hits')
+        GAME_CACHE.put(eid, gamestats, size)
+        return gamestats
+
+
+    def __fetch_game_stats(self, eid: EID, finished: bool) -> dict:
+        '''
+        downloads the gtd.json of eid, if it changed since the last fetch
+        (conditional request with the stored ETag/Last-Modified),
+        stores the fetch metadata in the manifest,
+        returns the new gamestats or None if nothing changed or the download failed
+        '''
+        key = gamestats_key(eid)
+        filepath = JSONARCHIVE_PATH / f'{eid}.json'
+        meta = self.manifest.get(key) or {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        fetched = datetime.now().isoformat(timespec='seconds')
+        try:
+            with instrument.span('gamestats.download'):
+                resp = get_scheduler().fetch(
+                    GAMECENTER_URL.format(eid=eid), headers=headers, stage='gamestats',
+                    priority=self.priority).result()
+        except RequestException:
+            return None
+        if resp.status_code == 304:
+            self.manifest.update(key, fetched=fetched, finished=finished)
+            return None
+        if resp.status_code != 200:
+            return None
+        try:
+            gamestats = resp.json()
+        except ValueError:
+            print(f"Invalid game stats of {eid}")
+            instrument.count('gamestats.invalid_json')
+            return None
+        try:
+            changed = load_json(filepath) != gamestats
+        except (FileNotFoundError, CorruptFileError):
+            changed = True
+        if changed:
+            save_obj_to_json(gamestats, JSONARCHIVE_PATH, f'{eid}.json')
+            # a live game was fetched again, the parsed old version is stale
+            GAME_CACHE.invalidate(eid)
+            # the decoded json like the decompressed payload of a cached file
+            GAME_CACHE.put(eid, gamestats, len(resp.content))
+        self.manifest.add(
+            key, filepath, fetched=fetched, finished=finished,
+            etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+        return gamestats if changed else None
+
+
+    def refresh(self, weeks: list = None) -> list:
+        '''
+        incremental update of the given weeks (default all weeks of the seasontype),
+        only games which were not finished at their last fetch are downloaded again,
+        the tables of changed games, their weektables and the seasontable
+        (all weeks given) are rebuilt, returns the rebuilt weeks
+        '''
+        if weeks is None:
+            weeks = range(1, 18, 1) if self.seasontype == 'REG' else range(1, 5, 1)
+        weeks = list(weeks)
+        today = date.today()
+        rebuilt = []
+        for week in weeks:
+            games = self.schedule_loader.get_schedule(self.season, week, self.seasontype) or []
+            changed = False
+            for game in games:
+                eid = EID(game['eid'])
+                if create_date_from_eid(eid) > today:
+                    continue
+                meta = self.manifest.get(gamestats_key(eid))
+                if meta is not None and meta.get('finished'):
+                    continue
+                if self.__fetch_game_stats(eid, game['finished']) is not None:
+                    for place in ('home', 'away'):
+                        self.__create_game_table(week, game[place], eid=eid)
+                    changed = True
+            if changed or week_key(self.season, self.seasontype, week) not in self.manifest:
+                if not self.__create_weektable(week).empty:
+                    rebuilt.append(week)
+        stems = [self.datapath / str(week) for week in weeks
+                 if week_key(self.season, self.seasontype, week) in self.manifest]
+        key = season_key(self.season, self.seasontype)
+        if self.save and stems and (rebuilt or key not in self.manifest):
+            self.manifest.add(key, self.store.write_concat(stems, self.get_seasontable_stem()))
+        return rebuilt
+
+
+    def prefetch_games(self, seasons, seasontypes=('REG',), **kwargs) -> dict:
+        '''
+        downloads the gtd.json of every scheduled game of the given seasons
+        and seasontypes into the jsonarchive, which are not yet archived,
+        takes the optional arguments of gamecenter.fetch_games,
+        returns {eid: success}
+        '''
+        eids = []
+        for season in seasons:
+            for seasontype in seasontypes:
+                schedule_loader = ScheduleLoader(
+                    season, seasontype=seasontype, update=False, ttl=self.schedule_ttl)
+                weeks = range(1, 18, 1) if seasontype == 'REG' else range(1, 5, 1)
+                for week in weeks:
+                    schedule = schedule_loader.get_schedule(season, week, seasontype) or []
+                    eids += [game['eid'] for game in schedule]
+        return prefetch_games(eids, JSONARCHIVE_PATH, **kwargs)
 
 
     def __det_places(self, eid: EID, gamestats: dict, team: str) -> tuple:
@@ -101,22 +255,6 @@ class NflLoader():
         return dframe
 
 
-    def __create_subtable(self, dic: dict, category: str) -> pd.DataFrame:
-        prefix = {'rushing': 'rush_', 'passing': 'pass_', 'receiving': 'recv_',
-                  'kickret': 'kret_', 'puntret': 'pret_', 'kicking': 'k_', 'punting': 'p_'}
-        dframe = pd.DataFrame(dic[category]).T
-        dframe['player_id'] = dframe.index
-        if category in prefix.keys():
-            columns = list(dframe.columns)
-            for column in columns:
-                if column in ('name', 'player_id'):
-                    continue
-                columns[columns.index(column)] = prefix[category] + str(column)
-                dframe[[column]] = dframe[[column]].astype(np.float64)
-            dframe.columns = columns
-        return dframe
-
-
     def __add_player_info(self, table: pd.DataFrame) -> pd.DataFrame:
         """adds infos about players to the given table"""
         player_ids = list(table['player_id'])
@@ -129,96 +267,45 @@ class NflLoader():
         return pd.merge(table, playerinfos, on='player_id', how='outer')
 
     def add_fpts(self, table):
-        """new function to calculate fantasy points
-        hopefuly faster than the old one
+        """adds simplified fantasypoints (no returns, defense and fieldgoal bonus)
+        to the given table
         """
-        # defense_positions = ('NT', 'DB', 'DT', 'LB', 'DE', 'CB', 'SAF')
-        # nr_defense_player = len(table[table['position'].isin(defense_positions)])
-        table['fpts'] = 0
-        table.fpts += table['pass_yds'] / 25 + table['pass_tds'] * 4 - table['pass_ints'] * 2
-        table.fpts += table['rush_yds'] / 10 + table['rush_tds'] * 6
-        table.fpts += table['recv_yds'] / 10 + table['recv_tds'] * 6
-        table.fpts += (table['pass_twoptm'] + table['rush_twoptm'] + table['recv_twoptm']) * 2
-        table.fpts += (table['rcv'] + table['trcv'] - table['lost']) * 2
-        # vereinfachte Rechnung der punkte für fieldgoals
-        # normally 5 pts for fg > 50 yds
-        table.fpts += table['k_fgm'] * 3
-        #continue here
+        table['fpts'] = score_table(table, ('basic',))['fpts_basic']
         return table
 
 
     def add_standardfpts(self, table):
         """adds standard fantasypoints to the given table"""
         # punkte für safety und recovertouchdown fehlen noch!!
-        # restrukturierung für bessere Performance und übersichtlichkeit!!!
-        fpts = []
-        defense = ['NT', 'DB', 'DT', 'LB', 'DE', 'CB', 'SAF']
-        n_defplayer = len(table[table['position'].isin(defense)])
-        # sfty = table.at[0, 'tot_score'] - table['pass_tds'].sum() * 6 - table['rush_tds'].sum()
-        # * 6 - table['k_xpmade'].sum() - table['k_totpfg'].sum()
-        for i in table.index:
-            tab = table.loc[i]
-            pts = 0
-            pts += tab['pass_yds'] / 25 + tab['pass_tds'] * 4 - tab['pass_ints'] * 2
-            pts += tab['rush_yds'] / 10 + tab['rush_tds'] * 6
-            pts += tab['recv_yds'] / 10 + tab['recv_tds'] * 6
-            pts += (tab['pass_twoptm'] + tab['rush_twoptm'] + tab['recv_twoptm']) * 2
-            if 'rcv' in table.columns:
-                pts += (tab['rcv'] + tab['trcv'] - tab['lost']) * 2
-            if 'k_fgyds' in table.columns:
-                if tab['k_fgyds'] >= 50:
-                    fgfactor = 5
-                else:
-                    fgfactor = 3
-                pts += tab['k_fgm'] * fgfactor
-            if 'k_xpmade' in table.columns:
-                pts += tab['k_xpmade']
-            if 'pret_tds' in table.columns:
-                pts += tab['pret_tds'] * 6
-            if 'kret_tds' in table.columns:
-                pts += tab['kret_tds'] * 6
-            pts += tab['sk'] + tab['int'] * 2
-            if tab['position'] in defense:
-                pts_allwd = int(tab['pts_allwd'])
-                if pts_allwd == 0:
-                    pts += 10 / n_defplayer
-                elif pts_allwd <= 6:
-                    pts += 7 / n_defplayer
-                elif pts_allwd <= 13:
-                    pts += 4 / n_defplayer
-                elif pts_allwd <= 20:
-                    pts += 1 / n_defplayer
-                elif pts_allwd <= 27:
-                    pts += 0
-                elif pts_allwd <= 34:
-                    pts += -1 / n_defplayer
-                else:
-                    pts += -4 / n_defplayer
-            fpts.append(pts)
-        fpts = np.array(fpts)
-        table['fpts'] = fpts
+        table['fpts'] = standard_fpts(table)
+        return table
+
+
+    def add_rulesetfpts(self, table):
+        """adds a fpts_<ruleset> column for every ruleset of the loader in one pass,
+        fpts keeps the standard fantasypoints
+        """
+        rulesets = list(self.rulesets)
+        if 'standard' not in rulesets:
+            rulesets.append('standard')
+        table = add_fpts_columns(table, rulesets)
+        table['fpts'] = table['fpts_standard']
+        if 'standard' not in self.rulesets:
+            del table['fpts_standard']
         return table
 
 
-    def __create_game_table(self, week: int, team: str) -> pd.DataFrame:
-        table = pd.DataFrame()
-        game_eid = self.get_game_eid(week, team)
+    def __create_raw_game_table(self, week: int, team: str, eid: EID = None) -> pd.DataFrame:
+        """builds the game table of the team from the gtd.json without player infos"""
+        game_eid = eid if eid is not None else self.get_game_eid(week, team)
         if game_eid is None:
             raise ValueError("No game eid available")
         gamestats = self.get_game_stats(game_eid)
+        if gamestats is None:
+            raise ValueError(f"No game stats of {game_eid} available")
         place, opponent, opp_place = self.__det_places(game_eid, gamestats, team)
-        statistics = gamestats[game_eid][place]['stats']
-        del statistics['team']
-        categories = list(statistics.keys())
-        categories.sort()
-        for category in categories:
-            if not table.empty:
-                if statistics[category]:
-                    table = pd.merge(table, self.__create_subtable(statistics, category),
-                                     how='outer', on=['player_id', 'name'], sort=False)
-            else:
-                if statistics[category]:
-                    table = self.__create_subtable(statistics, category)
+        with instrument.span('game.flatten'):
+            table = flatten_team_stats(gamestats[game_eid][place]['stats'])
         table['opponent'] = opponent
         if place == 'home':
             table['home'] = 1
@@ -230,156 +317,279 @@ class NflLoader():
         table = add_dateinfo(table, create_date_from_eid(game_eid))
         table['tot_score'] = gamestats[game_eid][place]['score']['T']
         table['pts_allwd'] = gamestats[game_eid][opp_place]['score']['T']
-        # table = table.sort_values(by='playerID')
-        # table = table.reset_index(drop=True)
         del table['name']
-        table = self.__add_player_info(table)
+        return table
+
+
+    def __finish_game_table(self, table: pd.DataFrame, week: int, team: str) -> pd.DataFrame:
+        """adds the player infos and fantasypoints to a raw game table and saves it"""
+        with instrument.span('game.player_join'):
+            table = self.__add_player_info(table)
         table['team'] = team
-        # breakpoint()
         table = self.__adjust_exp(table, self.season)
         table = table.fillna(value=0)
-        table = self.add_standardfpts(table)
+        with instrument.span('game.score'):
+            table = self.add_rulesetfpts(table)
+        if self.compact:
+            table = compact_table(table)
         if self.save:
-            directory_path = self.datapath / str(team)
-            directory_path.mkdir(parents=True, exist_ok=True)
-            table.to_csv(directory_path / f"{week}.csv")
+            self.__write_table(
+                table, game_key(self.season, self.seasontype, week, team),
+                self.datapath / str(team) / str(week))
+        instrument.count('rows.game', len(table))
+        return table
+
+
+    def __create_game_table(self, week: int, team: str, eid: EID = None) -> pd.DataFrame:
+        table = self.__create_raw_game_table(week, team, eid=eid)
+        if self.preload:
+            self.player_loader.resolve_player_infos(table['player_id'], self.priority)
+        return self.__finish_game_table(table, week, team)
+
+
+    def __concat(self, tables: list) -> pd.DataFrame:
+        if self.compact:
+            return concat_tables(tables)
+        return pd.concat(tables, ignore_index=True, sort=False)
+
+
+    def __is_cached(self, key: str) -> bool:
+        return not self.new and key in self.manifest
+
+
+    def __write_table(self, table: pd.DataFrame, key: str, stem: Path) -> Path:
+        with instrument.span(f'table.write.{key.split("/")[0]}'):
+            path = self.store.write(table, stem)
+        self.manifest.add(key, path)
+        return path
+
+
+    def __read_table(self, key: str, stem: Path, columns: list = None) -> pd.DataFrame:
+        '''reads a table of the manifest, returns None if the file is gone'''
+        kind = key.split('/')[0]
+        try:
+            with instrument.span(f'table.read.{kind}'):
+                table = self.store.read(stem, columns=columns)
+        except OSError:
+            self.manifest.remove(key)
+            instrument.count(f'cache.{kind}.misses')
+            return None
+        instrument.count(f'cache.{kind}.hits')
+        if self.compact:
+            # csv and tables of the former layout lose or lack the compact dtypes
+            table = compact_table(table)
+        path = self.store.get_path(stem)
+        if self.manifest.get_path(key) != path:
+            # the legacy csv table was converted by the store
+            self.manifest.add(key, path)
         return table
 
 
     def get_game_table(self, week: int, team: str, **kwargs) -> pd.DataFrame:
+        '''
+        optional arguments:
+        new bool: see NflLoader
+        eid str: eid of the game, skips the schedule lookup
+        columns list: only returns these columns of a stored table
+        '''
         self.new = kwargs.get('new', self.new)
-        directory_path = self.datapath / str(team)
-        directory_path.mkdir(parents=True, exist_ok=True)
-        file_path = directory_path / f"{week}.csv"
-        if (file_path not in directory_path.iterdir()) or self.new:
-            game_table = self.__create_game_table(week, team)
-            return game_table
-        return pd.read_csv(file_path, index_col=1)
+        table = self.__read_game_table(week, team, kwargs.get('columns'))
+        if table is not None:
+            return table
+        return self.__create_game_table(week, team, eid=kwargs.get('eid'))
 
 
-    def __threading_job(self, week, team, **kwargs):
-        table = self.get_game_table(week, team, **kwargs)
-        with threading.Lock():
-            self.tables.append(table)
+    def __read_game_table(self, week: int, team: str, columns: list = None) -> pd.DataFrame:
+        '''returns the stored game table or None'''
+        key = game_key(self.season, self.seasontype, week, team)
+        if not self.__is_cached(key):
+            return None
+        return self.__read_table(key, self.datapath / str(team) / str(week), columns)
+
+
+    def __create_game_tables(self, week: int, game: dict) -> list:
+        '''builds the tables of the home and the away team of the given game,
+        both tables share the same gtd.json, so it is fetched only once,
+        returns [(team, table, finished)], with preload new tables are returned raw,
+        games in the future or without gtd.json have no tables
+        '''
+        eid = EID(game['eid'])
+        tables = []
+        if create_date_from_eid(eid) > date.today():
+            return tables
+        for place in ('home', 'away'):
+            team = game[place]
+            table = self.__read_game_table(week, team)
+            if table is not None:
+                tables.append((team, table, True))
+            elif self.get_game_stats(eid) is None:
+                # not played yet or not fetchable, the game stays out of the weektable
+                break
+            elif self.preload:
+                tables.append((team, self.__create_raw_game_table(week, team, eid=eid), False))
+            else:
+                tables.append((team, self.__create_game_table(week, team, eid=eid), True))
+        return tables
 
 
     def __create_weektable(self, week: int) -> pd.DataFrame:
-        self.tables = []
-        # threads = []
         weektable = pd.DataFrame()
         if self.schedule_loader.season != self.season:
             self.schedule_loader = ScheduleLoader(
-                self.season, week, seasontype=self.seasontype, update=True
-                )
-        self.schedule = pd.DataFrame(
-            self.schedule_loader.get_schedule(
-                self.season, week, seasontype=self.seasontype)
-            )
-        for i in self.schedule.index:
-            for place in ('home', 'away'):
-                team = self.schedule.at[i, place]
-                self.tables.append(self.get_game_table(week, team))
-        weektable = pd.concat(self.tables, ignore_index=True, sort=False)
+                self.season, week, seasontype=self.seasontype, update=True,
+                ttl=self.schedule_ttl, priority=self.priority)
+        games = self.schedule_loader.get_schedule(self.season, week, seasontype=self.seasontype)
+        self.schedule = pd.DataFrame(games)
+        job = partial(self.__create_game_tables, week)
+        with instrument.span('week.games'):
+            if self.workers > 1:
+                # map keeps the schedule order, so the weektable is the same as sequential
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    game_tables = list(executor.map(job, games))
+            else:
+                game_tables = [job(game) for game in games]
+        game_tables = [entry for entries in game_tables for entry in entries]
+        if not game_tables:
+            # no game of the week was played yet, nothing to store
+            return weektable
+        if self.preload:
+            # the players missing in the preloaded infos are downloaded once per week
+            self.player_loader.resolve_player_infos(
+                [player_id for _, table, finished in game_tables if not finished
+                 for player_id in table['player_id']], self.priority)
+        self.tables = [
+            table if finished else self.__finish_game_table(table, week, team)
+            for team, table, finished in game_tables]
+        with instrument.span('week.concat'):
+            weektable = self.__concat(self.tables)
         self.tables.clear()
+        instrument.count('rows.week', len(weektable))
         if self.save:
-            file_path = self.datapath / f'{week}.csv'
-            weektable.to_csv(file_path)
+            self.__write_table(
+                weektable, week_key(self.season, self.seasontype, week), self.datapath / str(week))
         self.weektables[str(week)] = weektable
         return weektable
 
 
-    def get_weektable(self, week: int) -> pd.DataFrame:
-        directory_path = self.datapath
-        directory_path.mkdir(parents=True, exist_ok=True)
-        file_path = directory_path / f'{week}.csv'
-        if (file_path not in directory_path.iterdir()) or self.new:
-            return self.__create_weektable(week)
-        return self.weektables.get(str(week), pd.read_csv(file_path, index_col=0, parse_dates=True))
+    def get_weektable(self, week: int, columns: list = None) -> pd.DataFrame:
+        key = week_key(self.season, self.seasontype, week)
+        if self.__is_cached(key):
+            if str(week) in self.weektables and columns is None:
+                return self.weektables[str(week)]
+            table = self.__read_table(key, self.datapath / str(week), columns)
+            if table is not None:
+                return table
+        return self.__create_weektable(week)
 
 
-    def __create_seasontable(self):
+    def __get_season_weeks(self) -> list:
+        '''weeks of a finished season, the current season has no seasontable yet'''
         current_season = self.schedule_loader.get_season()
-        if self.season < current_season:
-            if self.seasontype == 'REG':
-                weeks = [x for x in range(1, 18, 1)]
-            else:
-                weeks = [x for x in range(1, 5, 1)]
-            for week in tqdm(weeks, smoothing=0, desc="Weeks"):
-                weektable = self.get_weektable(week)
-                self.seasontable = self.seasontable.append(weektable, ignore_index=True, sort=False)
+        if self.season >= current_season:
+            return []
+        if self.seasontype == 'REG':
+            return [x for x in range(1, 18, 1)]
+        return [x for x in range(1, 5, 1)]
+
+
+    def __create_seasontable(self):
         if self.save:
-            file_path = self.datapath.parent / f'{self.season}_{self.seasontype}.csv'
-            self.seasontable.to_csv(file_path)
+            # streaming through the store keeps only one week besides the result in memory
+            self.write_seasontable()
+            self.seasontable = self.store.read(self.get_seasontable_stem())
+            if self.compact:
+                self.seasontable = compact_table(self.seasontable)
+            return self.seasontable
+        weektables = [self.get_weektable(week)
+                      for week in tqdm(self.__get_season_weeks(), smoothing=0, desc="Weeks")]
+        if weektables:
+            self.seasontable = self.__concat(weektables)
+        else:
+            self.seasontable = pd.DataFrame()
         return self.seasontable
 
 
-    def get_seasontable(self):
-        file_path = self.datapath.parent / f'{self.season}_{self.seasontype}.csv'
-        if (file_path not in self.datapath.parent.iterdir()) or self.new:
-            return self.__create_seasontable()
-        return pd.read_csv(file_path, index_col=0, parse_dates=True)
-
+    def write_seasontable(self) -> Path:
+        '''
+        builds the seasontable straight on disk, the weektables are stored
+        and streamed into the seasontable one at a time, so only one week
+        is held in memory, returns the path of the seasontable
+        '''
+        stems = []
+        for week in tqdm(self.__get_season_weeks(), smoothing=0, desc="Weeks"):
+            key = week_key(self.season, self.seasontype, week)
+            stem = self.datapath / str(week)
+            if not self.__is_cached(key) or not self.store.exists(stem):
+                weektable = self.__create_weektable(week)
+                self.weektables.pop(str(week), None)
+                if weektable.empty:
+                    # no game of the week was played, there is no table to stream
+                    continue
+                if not self.save:
+                    self.__write_table(weektable, key, stem)
+                del weektable
+            stems.append(stem)
+        stem = self.get_seasontable_stem()
+        key = season_key(self.season, self.seasontype)
+        if not stems:
+            return self.__write_table(pd.DataFrame(), key, stem)
+        with instrument.span('season.concat'):
+            path = self.store.write_concat(stems, stem)
+        self.manifest.add(key, path)
+        return path
+
+
+    def get_seasontable_stem(self) -> Path:
+        '''path of the seasontable without the suffix of the storage format'''
+        return self.datapath.parent / f'{self.season}_{self.seasontype}'
+
+
+    def get_seasontable(self, columns: list = None):
+        key = season_key(self.season, self.seasontype)
+        if self.__is_cached(key):
+            table = self.__read_table(key, self.get_seasontable_stem(), columns)
+            if table is not None:
+                return table
+        return self.__create_seasontable()
+
+
+def create_team_view(schedule: pd.DataFrame) -> pd.DataFrame:
+    """turns a schedule (eid, home, away, week) into one row per team and game
+    with the columns team, home, away, opponent, date, year, month, day, weekday, seasonweek
+    """
+    home_view = pd.DataFrame(
+        {'team': schedule['home'], 'home': 1, 'away': 0, 'opponent': schedule['away']})
+    away_view = pd.DataFrame(
+        {'team': schedule['away'], 'home': 0, 'away': 1, 'opponent': schedule['home']})
+    view = pd.concat([home_view, away_view], ignore_index=True)
+    eids = pd.concat([schedule['eid'], schedule['eid']], ignore_index=True)
+    dates = pd.to_datetime(eids.str[:8], format='%Y%m%d')
+    view['date'] = dates.dt.date
+    view['year'] = dates.dt.year.astype('int64')
+    view['month'] = dates.dt.month.astype('int64')
+    view['day'] = dates.dt.day.astype('int64')
+    view['weekday'] = dates.dt.weekday.astype('int64')
+    view['seasonweek'] = pd.concat([schedule['week'], schedule['week']], ignore_index=True)
+    return view
 
-def add_columns(df):
-    df = df.copy()
-    df["home"] = 0
-    df["away"] = 0
-    df["opponent"] = None
-    df["date"] = None
-    df["year"] = 0
-    df["month"] = 0
-    df["day"] = 0
-    df["weekday"] = 0
-    return df
 
 def create_test_data(season: int, weeks: list) -> pd.DataFrame:
     """create a DataFrame for predictions"""
-    schedule_loader = ScheduleLoader(season, weeks[0], update=True)
-    # get active players
-    # player_loader = PlayerDataLoader()
-    # active_players = pd.DataFrame(player_loader.get_active_players())
+    index = ScheduleLoader(season, update=True).get_index(season, 'REG')
     active_players = get_active_players_for_all_teams()
-    test_data = []
-    for week in weeks:
-        schedule = schedule_loader.get_schedule(season, week, 'REG')
-        schedule_frame = pd.DataFrame(schedule)
-        # get active teams
-        active_teams = list(schedule_frame['home']) + list(schedule_frame['away'])
-        week_data = active_players[active_players.team.isin(active_teams)].copy()
-        week_data = add_columns(week_data)
-        for row in schedule_frame.iterrows():
-            row = row[1]
-            home_view = week_data[week_data['team'] == row["home"]].index
-            week_data.loc[home_view, "home"] = 1
-            week_data.loc[home_view, "away"] = 0
-            week_data.loc[home_view, "opponent"] = row["away"]
-            gamedate = create_date_from_eid(row["eid"])
-            week_data.loc[home_view, "date"] = gamedate
-            week_data.loc[home_view, "year"] = gamedate.year
-            week_data.loc[home_view, "month"] = gamedate.month
-            week_data.loc[home_view, "day"] = gamedate.day
-            week_data.loc[home_view, "weekday"] = gamedate.weekday()
-            away_view = week_data[week_data['team'] == row["away"]].index
-            week_data.loc[away_view, "home"] = 0
-            week_data.loc[away_view, "away"] = 1
-            week_data.loc[away_view, "opponent"] = row["home"]
-            week_data.loc[away_view, "date"] = gamedate
-            week_data.loc[away_view, "year"] = gamedate.year
-            week_data.loc[away_view, "month"] = gamedate.month
-            week_data.loc[away_view, "day"] = gamedate.day
-            week_data.loc[away_view, "weekday"] = gamedate.weekday()
-        week_data['seasonweek'] = week
-        if 'id' in week_data.columns:
-            del week_data['id']
-        if 'status' in week_data.columns:
-            del week_data["status"]
-        test_data.append(week_data)
-        print(f"Week {week} finished!")
-    test_data = pd.concat(test_data, sort=False, ignore_index=True)
-    # del week_data["esb_id"]
+    schedule = pd.concat(
+        [pd.DataFrame(index.get_games(season, 'REG', week)).assign(week=week)
+         for week in weeks],
+        ignore_index=True)
+    view = create_team_view(schedule)
+    # one merge for all weeks, the stable sort restores the player order within each week
+    test_data = active_players.merge(view, on='team', how='inner', sort=False)
+    test_data = test_data.sort_values('seasonweek', kind='stable', ignore_index=True)
+    for column in ('id', 'status'):
+        if column in test_data.columns:
+            del test_data[column]
     return test_data
-    # continue here
-    # raise NotImplementedError
+
 
 if __name__ == "__main__":
     create_test_data(2019, [1,])
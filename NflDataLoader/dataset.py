@@ -0,0 +1,159 @@
+# dataset.py
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow.dataset
+except ImportError:
+    pyarrow = None
+
+from .manifest import CacheManifest, season_key, week_key
+from .schema import compact_table, concat_tables
+from .tablestore import CsvStore
+
+DATABASE_PATH = Path("NflDataLoader/database")
+# formats pyarrow.dataset reads with pushdown, keyed by the suffix of the stored tables
+ARROW_FORMATS = {'.parquet': 'parquet', '.feather': 'feather'}
+FILTER_COLUMNS = ('seasonweek', 'team', 'position', 'player_id')
+
+
+def _as_list(values) -> list:
+    if values is None:
+        return None
+    if isinstance(values, (str, int)):
+        return [values]
+    return list(values)
+
+
+class NflDataset():
+    """Lazy view on the stored season tables (and the week tables of seasons
+    without a season table). Only the partitions of the selected seasons are opened
+    and only the requested columns and matching rows are read from them.
+    """
+    def __init__(self, seasons=None, **kwargs):
+        """
+        seasons int or list: e.g. range(2009, 2020), None selects all stored seasons
+
+        optional arguments:
+        seasontypes list: (default ['REG'])
+        weeks list: values of seasonweek
+        teams list: team abbreviations, e.g. ['CAR', 'NO']
+        positions list: e.g. ['QB', 'WR']
+        player_ids list: gsis ids
+        columns list: returned columns, None returns all columns
+        path str: root of the stored tables (default 'NflDataLoader/database')
+        compact bool: if True returns the compact schema of schema.compact_table
+            (default False)
+        """
+        self.seasons = _as_list(seasons)
+        self.seasontypes = _as_list(kwargs.get('seasontypes', ['REG']))
+        self.filters = {
+            'seasonweek': _as_list(kwargs.get('weeks')),
+            'team': _as_list(kwargs.get('teams')),
+            'position': _as_list(kwargs.get('positions')),
+            'player_id': _as_list(kwargs.get('player_ids')),
+        }
+        self.columns = _as_list(kwargs.get('columns'))
+        self.compact = kwargs.get('compact', False)
+        self.manifest = CacheManifest.for_root(Path(kwargs.get('path', DATABASE_PATH)))
+
+
+    def __stored_seasons(self) -> list:
+        seasons = set()
+        for key in self.manifest.entries:
+            kind, season, *_ = key.split('/')
+            if kind in ('season', 'week'):
+                seasons.add(int(season))
+        return sorted(seasons)
+
+
+    def partitions(self) -> list:
+        """paths of the tables which contain the selected rows,
+        the season table of a season or its week tables if it has none
+        """
+        seasons = self.seasons if self.seasons is not None else self.__stored_seasons()
+        weeks = self.filters['seasonweek']
+        paths = []
+        for season in seasons:
+            for seasontype in self.seasontypes:
+                path = self.manifest.get_path(season_key(season, seasontype))
+                if path is not None:
+                    paths.append(path)
+                    continue
+                prefix = week_key(season, seasontype, '')
+                week_keys = sorted(
+                    (key for key in self.manifest.entries if key.startswith(prefix)),
+                    key=lambda key: int(key[len(prefix):]))
+                paths += [self.manifest.get_path(key) for key in week_keys
+                          if weeks is None or int(key[len(prefix):]) in weeks]
+        return paths
+
+
+    def __filters(self) -> dict:
+        return {column: values for column, values in self.filters.items() if values is not None}
+
+
+    def __arrow_chunks(self, path: Path, batch_size: int) -> Iterator[pd.DataFrame]:
+        dataset = pyarrow.dataset.dataset(path, format=ARROW_FORMATS[path.suffix])
+        names = dataset.schema.names
+        expression = None
+        for column, values in self.__filters().items():
+            if column not in names:
+                # the partition can't contain a matching row
+                return
+            condition = pyarrow.dataset.field(column).isin(values)
+            expression = condition if expression is None else expression & condition
+        columns = None
+        if self.columns is not None:
+            columns = [column for column in self.columns if column in names]
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+    def __csv_chunks(self, path: Path, batch_size: int) -> Iterator[pd.DataFrame]:
+        filters = self.__filters()
+        usecols = None
+        if self.columns is not None:
+            wanted = set(self.columns) | set(filters)
+            usecols = lambda column: column in wanted or column.startswith('Unnamed: 0')
+        for chunk in pd.read_csv(path, index_col=0, usecols=usecols, chunksize=batch_size):
+            mask = pd.Series(True, index=chunk.index)
+            for column, values in filters.items():
+                if column not in chunk.columns:
+                    return
+                mask &= chunk[column].isin(values)
+            chunk = chunk[mask]
+            if self.columns is not None:
+                chunk = chunk[[column for column in self.columns if column in chunk.columns]]
+            if 'date' in chunk.columns:
+                chunk['date'] = pd.to_datetime(chunk['date'], errors='coerce')
+            if len(chunk):
+                yield chunk
+
+
+    def iter_chunks(self, batch_size: int = 65536) -> Iterator[pd.DataFrame]:
+        """yields the selected rows in frames of at most batch_size rows,
+        only one chunk is held in memory
+        """
+        for path in self.partitions():
+            if path.suffix == CsvStore.suffix:
+                chunks = self.__csv_chunks(path, batch_size)
+            elif pyarrow is None:
+                raise ImportError(f"reading {path} needs pyarrow")
+            else:
+                chunks = self.__arrow_chunks(path, batch_size)
+            for chunk in chunks:
+                yield compact_table(chunk) if self.compact else chunk
+
+
+    def to_frame(self) -> pd.DataFrame:
+        """returns the selected rows and columns as one DataFrame"""
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame(columns=self.columns)
+        if self.compact:
+            return concat_tables(chunks)
+        return pd.concat(chunks, ignore_index=True, sort=False)
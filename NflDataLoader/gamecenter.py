@@ -0,0 +1,131 @@
+# gamecenter.py
+import asyncio
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import instrument
+from .scheduleloader import save_obj_to_json
+from .jsonarchive import is_archived
+from .httpclient import RETRY_STATUS
+
+GAMECENTER_URL = 'http://www.nfl.com/liveupdate/game-center/{eid}/{eid}_gtd.json'
+JSONARCHIVE_PATH = Path("NflDataLoader/database/jsonarchive")
+CATEGORY_PREFIXES = {
+    'rushing': 'rush_', 'passing': 'pass_', 'receiving': 'recv_',
+    'kickret': 'kret_', 'puntret': 'pret_', 'kicking': 'k_', 'punting': 'p_',
+}
+
+
+async def _fetch_game(session, semaphore, eid: str, directory_path: Path, **kwargs) -> bool:
+    url = kwargs.get('url', GAMECENTER_URL).format(eid=eid)
+    retries = kwargs.get('retries', 3)
+    backoff = kwargs.get('backoff', 0.5)
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff * 2 ** (attempt - 1))
+            try:
+                async with session.get(url) as resp:
+                    if resp.status == 200:
+                        gamestats = await resp.json(content_type=None)
+                        await loop.run_in_executor(
+                            None, save_obj_to_json, gamestats, directory_path, f'{eid}.json')
+                        return True
+                    if resp.status not in RETRY_STATUS:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            except ValueError:
+                # a truncated or non-json body, retried like a dropped connection
+                instrument.count('gamecenter.invalid_json')
+                continue
+    print(f"Couldn't load game stats for {eid}")
+    return False
+
+
+async def fetch_games(eids: Iterable[str], directory_path: Path = JSONARCHIVE_PATH,
+                      **kwargs) -> dict:
+    """downloads the gtd.json of all given eids into directory_path
+    with one pooled client, returns {eid: success}
+
+    optional arguments:
+    concurrency int: maximal number of parallel requests (default 16)
+    retries int: retries per game after a failed request (default 3)
+    backoff float: seconds before the first retry, doubled each retry (default 0.5)
+    timeout float: seconds per request (default 10)
+    url str: url template with an {eid} placeholder (default GAMECENTER_URL)
+    """
+    if aiohttp is None:
+        raise ImportError("fetching games asynchronously needs aiohttp")
+    concurrency = kwargs.pop('concurrency', 16)
+    timeout = aiohttp.ClientTimeout(total=kwargs.pop('timeout', 10))
+    directory_path = Path(directory_path)
+    directory_path.mkdir(parents=True, exist_ok=True)
+    eids = list(dict.fromkeys(eids))
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(
+            *(_fetch_game(session, semaphore, eid, directory_path, **kwargs) for eid in eids))
+    return dict(zip(eids, results))
+
+
+def prefetch_games(eids: Iterable[str], directory_path: Path = JSONARCHIVE_PATH,
+                   **kwargs) -> dict:
+    """downloads all games of eids which are not yet in the archive,
+    takes the optional arguments of fetch_games, returns {eid: success}
+    """
+    directory_path = Path(directory_path)
+    missing = [eid for eid in eids if not is_archived(directory_path, eid)]
+    if not missing:
+        return {}
+    return asyncio.run(fetch_games(missing, directory_path, **kwargs))
+
+
+def flatten_team_stats(statistics: dict) -> pd.DataFrame:
+    """flattens the stats of one team of a gtd.json into one row per player,
+    stat columns get the prefix of their category (e.g. rush_yds),
+    categories without prefix (e.g. defense, fumbles) keep their stat names,
+    players and columns are ordered by their first appearance in the sorted categories
+    """
+    rows = {}
+    names = []
+    columns = {}
+    for category in sorted(statistics):
+        players = statistics[category]
+        if category == 'team' or not players:
+            continue
+        prefix = CATEGORY_PREFIXES.get(category, '')
+        for player_id, stats in players.items():
+            row = rows.setdefault(player_id, len(rows))
+            if row == len(names):
+                names.append(stats.get('name'))
+            for stat, value in stats.items():
+                if stat == 'name':
+                    continue
+                positions, values = columns.setdefault(prefix + stat, ([], []))
+                positions.append(row)
+                values.append(value)
+        if 'player_id' not in columns:
+            # the first category is followed by the player_id like in the former merge
+            columns['player_id'] = None
+    table = {}
+    for column, entries in columns.items():
+        if column == 'player_id':
+            table['name'] = names
+            table['player_id'] = list(rows)
+            continue
+        array = np.full(len(rows), np.nan)
+        positions, values = entries
+        array[positions] = values
+        table[column] = array
+    return pd.DataFrame(table)
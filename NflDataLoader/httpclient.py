@@ -0,0 +1,147 @@
+# httpclient.py
+import io
+import threading
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import instrument
+
+# status codes worth another try, everything else (e.g. 404) is final
+RETRY_STATUS = (429, 500, 502, 503, 504)
+DEFAULT_TIMEOUT = 10
+# seconds per request for hosts which answer slower or faster than the default,
+# the downloads of the package don't pass their own timeout, so this is the one
+# place to tune them (a timeout argument of get still overrides it)
+HOST_TIMEOUTS = {
+    'www.nfl.com': 5,
+    'nfl.com': 5,
+}
+USER_AGENT = 'NflDataLoader'
+
+
+class HttpClient():
+    """One requests.Session for all downloads: keep-alive connections pooled per host,
+    retries with exponential backoff for connection errors and RETRY_STATUS,
+    timeouts per host and hooks, which are called with every response
+    (instrument.record_response is always attached).
+    """
+    def __init__(self, **kwargs):
+        """
+        optional arguments:
+        retries int: retries per request (default 3)
+        backoff float: backoff factor, the n-th retry waits backoff * 2 ** (n - 1) seconds
+            (default 0.5)
+        pool_size int: kept connections per host (default 16)
+        timeout float: seconds per request of hosts without own timeout (default 10)
+        timeouts dict: seconds per request by host (default HOST_TIMEOUTS)
+        """
+        self.retries = kwargs.get('retries', 3)
+        self.backoff = kwargs.get('backoff', 0.5)
+        self.pool_size = kwargs.get('pool_size', 16)
+        self.timeout = kwargs.get('timeout', DEFAULT_TIMEOUT)
+        self.timeouts = dict(kwargs.get('timeouts', HOST_TIMEOUTS))
+        self.hooks = []
+        self.session = self.__create_session()
+
+
+    def __create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries, connect=self.retries, read=self.retries,
+            status=self.retries, backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUS, allowed_methods=('GET', 'HEAD'),
+            raise_on_status=False, respect_retry_after_header=True)
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+
+    def mount(self, prefix: str, adapter):
+        """routes the urls starting with prefix through adapter (e.g. for tests)"""
+        self.session.mount(prefix, adapter)
+
+
+    def add_hook(self, hook):
+        """hook(response, stage) is called after every request"""
+        self.hooks.append(hook)
+
+
+    def get_timeout(self, url: str) -> float:
+        return self.timeouts.get(urlsplit(url).netloc, self.timeout)
+
+
+    def get(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        """GET request with the pooled session, raises the exceptions of requests
+        (requests.RequestException) once the retries are used up
+
+        optional arguments:
+        stage str: name of the stage for the instrumentation, e.g. 'schedule'
+        timeout float: overrides the timeout of the host
+        other keyword arguments are passed to requests.Session.get (e.g. headers)
+        """
+        stage = kwargs.pop('stage', None)
+        kwargs.setdefault('timeout', self.get_timeout(url))
+        try:
+            response = self.session.get(url, params=params, **kwargs)
+        except requests.RequestException:
+            instrument.count('http.errors')
+            if stage:
+                instrument.count(f'http.{stage}.errors')
+            raise
+        instrument.record_response(response, stage)
+        for hook in self.hooks:
+            hook(response, stage)
+        return response
+
+
+    def read_html(self, url: str, params: dict = None, **kwargs) -> list:
+        """downloads url and returns its tables like pd.read_html,
+        takes the optional arguments of get
+        """
+        response = self.get(url, params, **kwargs)
+        response.raise_for_status()
+        return pd.read_html(io.StringIO(response.text))
+
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """returns the client shared by all downloaders"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure(**kwargs) -> HttpClient:
+    """replaces the shared client with one with the given options of HttpClient"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+        return _client
+
+
+def get(url: str, params: dict = None, **kwargs) -> requests.Response:
+    """GET request with the shared client, see HttpClient.get"""
+    return get_client().get(url, params, **kwargs)
+
+
+def read_html(url: str, params: dict = None, **kwargs) -> list:
+    """tables of url with the shared client, see HttpClient.read_html"""
+    return get_client().read_html(url, params, **kwargs)
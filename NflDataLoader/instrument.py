@@ -0,0 +1,141 @@
+# instrument.py
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# spans and counters are only recorded after enable()
+# or with the environment variable NFLDATALOADER_INSTRUMENT=1
+_enabled = os.environ.get('NFLDATALOADER_INSTRUMENT', '') not in ('', '0')
+_NULL_SPAN = nullcontext()
+
+
+class Recorder():
+    """Collects the time per stage (spans) and counters of a run, thread safe."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                self.spans[name] = [1, seconds, seconds]
+            else:
+                span[0] += 1
+                span[1] += seconds
+                span[2] = max(span[2], seconds)
+
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                'spans': {
+                    name: {'count': count, 'seconds': total, 'max_seconds': longest}
+                    for name, (count, total, longest) in sorted(self.spans.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+
+class _Span():
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        RECORDER.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+RECORDER = Recorder()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str):
+    """context manager which adds its duration to the stage name,
+    a shared no-op context if the instrumentation is disabled
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def count(name: str, value: int = 1):
+    if _enabled:
+        RECORDER.count(name, value)
+
+
+def record_response(response, stage: str = None):
+    """counts a requests response: requests, bytes and latency in total and per host
+    (and per stage, e.g. 'schedule')
+    """
+    if not _enabled:
+        return
+    host = urlsplit(response.url).netloc or 'unknown'
+    size = len(response.content)
+    latency = response.elapsed.total_seconds()
+    for name in ['http', f'http.{host}'] + ([f'http.{stage}'] if stage else []):
+        RECORDER.count(f'{name}.requests')
+        RECORDER.count(f'{name}.bytes', size)
+        RECORDER.add_time(f'{name}.latency', latency)
+    if response.status_code >= 400:
+        RECORDER.count(f'http.status_{response.status_code}')
+
+
+def summary() -> str:
+    """the recorded spans and counters as text table"""
+    report = RECORDER.as_dict()
+    lines = [f"{'span':40} {'count':>8} {'total s':>10} {'mean ms':>10} {'max ms':>10}"]
+    for name, entry in report['spans'].items():
+        mean = entry['seconds'] / entry['count'] * 1000
+        lines.append(f"{name:40} {entry['count']:8} {entry['seconds']:10.3f} "
+                     f"{mean:10.2f} {entry['max_seconds'] * 1000:10.2f}")
+    lines.append('')
+    lines.append(f"{'counter':40} {'value':>10}")
+    for name, value in report['counters'].items():
+        lines.append(f"{name:40} {value:10}")
+    return '\n'.join(lines)
+
+
+def write_report(path: Path) -> Path:
+    """writes the recorded spans and counters as json"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as jfile:
+        json.dump(RECORDER.as_dict(), jfile, indent=4)
+    return path
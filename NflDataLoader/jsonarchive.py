@@ -0,0 +1,207 @@
+# jsonarchive.py
+import argparse
+import json
+import mmap
+import os
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+from . import serialization
+
+PACK_SUFFIX = '.pack'
+INDEX_SUFFIX = '.idx'
+
+
+def season_of_eid(eid: str) -> int:
+    """games until march belong to the season of the previous year"""
+    year, month = int(eid[:4]), int(eid[4:6])
+    return year - 1 if month < 3 else year
+
+
+class PackedArchive():
+    """Compressed json records of one season in {season}.pack,
+    {season}.idx maps the keys (eids) to offset, length and crc32 of their record,
+    so a single record is read through mmap without touching the others.
+    """
+    def __init__(self, directory: Path, season: int):
+        self.directory = Path(directory)
+        self.pack_path = self.directory / f'{season}{PACK_SUFFIX}'
+        self.index_path = self.directory / f'{season}{INDEX_SUFFIX}'
+        self._lock = threading.RLock()
+        self._mmap = None
+        self._index_mtime = None
+        self.index = {}
+        self.reload()
+
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+    def reload(self):
+        """reads the index again if it was changed on disk"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.index_path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._index_mtime:
+                return
+            with open(self.index_path, 'r') as jfile:
+                self.index = json.load(jfile)
+            self._index_mtime = mtime
+            self.__close_mmap()
+
+
+    def read_bytes(self, key: str) -> bytes:
+        """returns the uncompressed json of key, raises serialization.CorruptFileError
+        if the record doesn't match its crc32 (indexes of older versions have none)
+        or can't be decompressed
+        """
+        with self._lock:
+            offset, length, *checksum = self.index[key]
+            if self._mmap is None:
+                with open(self.pack_path, 'rb') as pack:
+                    self._mmap = mmap.mmap(pack.fileno(), 0, access=mmap.ACCESS_READ)
+            record = self._mmap[offset:offset + length]
+        if len(record) != length:
+            raise serialization.CorruptFileError(f"truncated record {key} in {self.pack_path}")
+        if checksum and zlib.crc32(record) != checksum[0]:
+            raise serialization.CorruptFileError(
+                f"checksum mismatch of {key} in {self.pack_path}")
+        try:
+            return zlib.decompress(record)
+        except zlib.error as err:
+            raise serialization.CorruptFileError(
+                f"corrupt record {key} in {self.pack_path}: {err}") from err
+
+
+    def load(self, key: str):
+        """raises serialization.CorruptFileError for corrupt records"""
+        try:
+            return json.loads(self.read_bytes(key))
+        except ValueError as err:
+            if isinstance(err, serialization.CorruptFileError):
+                raise
+            raise serialization.CorruptFileError(f"invalid json of {key}: {err}") from err
+
+
+    def append(self, records: dict) -> int:
+        """appends {key: obj} to the pack, existing keys are skipped,
+        returns the number of appended records
+        """
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            index = dict(self.index)
+            with open(self.pack_path, 'ab') as pack:
+                offset = pack.tell()
+                for key, obj in records.items():
+                    if key in index:
+                        continue
+                    record = zlib.compress(
+                        json.dumps(obj, sort_keys=True, separators=(',', ':')).encode())
+                    pack.write(record)
+                    index[key] = [offset, len(record), zlib.crc32(record)]
+                    offset += len(record)
+            appended = len(index) - len(self.index)
+            # the index is replaced atomically after the records are written
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as jfile:
+                json.dump(index, jfile)
+            os.replace(tmp_path, self.index_path)
+            self.index = index
+            self._index_mtime = os.stat(self.index_path).st_mtime_ns
+            self.__close_mmap()
+            return appended
+
+
+    def __close_mmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(directory: Path, season: int) -> PackedArchive:
+    """returns the archive of the season in directory, shared in the whole process"""
+    key = (os.path.abspath(directory), int(season))
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = PackedArchive(directory, season)
+        return _archives[key]
+
+
+def read_packed_bytes(filepath: Path) -> bytes:
+    """reads the json of a loose file path (e.g. jsonarchive/{eid}.json) from the pack,
+    raises FileNotFoundError if it is not packed
+    """
+    filepath = Path(filepath)
+    key = filepath.stem
+    if not key[:8].isdigit():
+        raise FileNotFoundError(filepath)
+    archive = get_archive(filepath.parent, season_of_eid(key))
+    if key not in archive:
+        archive.reload()
+        if key not in archive:
+            raise FileNotFoundError(filepath)
+    return archive.read_bytes(key)
+
+
+def load_packed(filepath: Path):
+    """loads the record of a loose file path from the pack, see read_packed_bytes"""
+    return serialization.loads(read_packed_bytes(filepath))
+
+
+def is_archived(directory: Path, key: str) -> bool:
+    """True if key (an eid) is a loose file or packed in directory"""
+    directory = Path(directory)
+    if (directory / f'{key}.json').exists():
+        return True
+    archive = get_archive(directory, season_of_eid(key))
+    archive.reload()
+    return key in archive
+
+
+def pack_directory(directory: Path, remove: bool = False) -> int:
+    """packs the loose {eid}.json files of directory into the season archives,
+    remove deletes the loose files after packing, returns the number of packed files
+    """
+    directory = Path(directory)
+    seasons = {}
+    for path in sorted(directory.glob('*.json')):
+        if path.stem[:8].isdigit():
+            seasons.setdefault(season_of_eid(path.stem), []).append(path)
+    packed = 0
+    for season, paths in seasons.items():
+        archive = get_archive(directory, season)
+        records = {}
+        for path in paths:
+            if path.stem not in archive:
+                try:
+                    records[path.stem] = serialization.read(path)
+                except serialization.CorruptFileError as err:
+                    print(f"skipped the corrupt file {path} ({err})")
+                    continue
+        packed += archive.append(records)
+        if remove:
+            for path in paths:
+                if path.stem in archive:
+                    path.unlink()
+    return packed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="packs the loose gtd.json archive")
+    parser.add_argument('directory', nargs='?', default='NflDataLoader/database/jsonarchive')
+    parser.add_argument('--remove', action='store_true', help="delete the loose files")
+    args = parser.parse_args()
+    print(f"packed {pack_directory(Path(args.directory), args.remove)} games")
@@ -0,0 +1,224 @@
+# manifest.py
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+from .jsonarchive import is_archived
+
+MANIFEST_FILENAME = 'manifest.json'
+JOURNAL_FILENAME = 'manifest.journal'
+# number of journal lines after which the manifest is rewritten
+COMPACT_AFTER = 1000
+TABLE_SUFFIXES = r'(csv|parquet|feather)'
+# relative paths of the cached files below a database root and their keys
+LAYOUT = [
+    (re.compile(r'(?P<season>\d{4})/(?P<seasontype>[A-Z]+)/(?P<team>[A-Z]+)/(?P<week>\d+)\.'
+                + TABLE_SUFFIXES),
+     'game/{season}/{seasontype}/{week}/{team}'),
+    (re.compile(r'(?P<season>\d{4})/(?P<seasontype>[A-Z]+)/(?P<week>\d+)\.' + TABLE_SUFFIXES),
+     'week/{season}/{seasontype}/{week}'),
+    (re.compile(r'(?P<season>\d{4})/(?P=season)_(?P<seasontype>[A-Z]+)\.' + TABLE_SUFFIXES),
+     'season/{season}/{seasontype}'),
+    (re.compile(r'(?P<season>[^/]+)/(?P<seasontype>[^/]+)/(?P<week>[^/]+)\.json'),
+     'schedule/{season}/{seasontype}/{week}'),
+]
+
+
+def game_key(season, seasontype, week, team) -> str:
+    return f'game/{season}/{seasontype}/{week}/{team}'
+
+
+def week_key(season, seasontype, week) -> str:
+    return f'week/{season}/{seasontype}/{week}'
+
+
+def season_key(season, seasontype) -> str:
+    return f'season/{season}/{seasontype}'
+
+
+def schedule_key(season, seasontype, week) -> str:
+    return f'schedule/{season}/{seasontype}/{week}'
+
+
+def gamestats_key(eid) -> str:
+    return f'gamestats/{eid}'
+
+
+class CacheManifest():
+    """Index of the cached files below a database root, kept in root/manifest.json.
+    Entries are dicts with the relative 'path' of the file and optional metadata.
+    Changes are appended as single lines to root/manifest.journal, which is
+    merged into manifest.json after COMPACT_AFTER changes.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_FILENAME
+        self.journal_path = self.root / JOURNAL_FILENAME
+        self._lock = threading.RLock()
+        self._journal_length = 0
+        self.entries = self.__load()
+
+
+    @classmethod
+    def for_root(cls, root: Path) -> 'CacheManifest':
+        """returns the manifest of the given root, shared in the whole process"""
+        key = os.path.abspath(root)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(root)
+            return cls._instances[key]
+
+
+    def __load(self) -> dict:
+        try:
+            with open(self.path, 'r') as jfile:
+                entries = json.load(jfile)
+        except (FileNotFoundError, ValueError):
+            entries = self.scan()
+        try:
+            with open(self.journal_path, 'r+b') as journal:
+                lines = journal.read().split(b'\n')
+                if lines[-1]:
+                    # a line torn by a crash while it was written, it is cut off,
+                    # so the next change isn't appended to it
+                    journal.truncate(journal.tell() - len(lines[-1]))
+        except FileNotFoundError:
+            lines = []
+        for line in lines[:-1]:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                continue
+            self._journal_length += 1
+            if change['entry'] is None:
+                entries.pop(change['key'], None)
+            else:
+                entries[change['key']] = change['entry']
+        return entries
+
+
+    def __record(self, key: str, entry: dict):
+        """appends the change of key to the journal (entry None removes key)"""
+        with self._lock:
+            if self._journal_length >= COMPACT_AFTER:
+                self.save()
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, 'a') as journal:
+                journal.write(json.dumps({'key': key, 'entry': entry}, sort_keys=True) + '\n')
+            self._journal_length += 1
+
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+
+    def get(self, key: str) -> dict:
+        return self.entries.get(key)
+
+
+    def get_path(self, key: str) -> Path:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return self.root / entry['path']
+
+
+    def add(self, key: str, path: Path, **metadata):
+        """adds or replaces the entry of key and saves the manifest"""
+        path = Path(os.path.relpath(path, self.root))
+        with self._lock:
+            self.entries[key] = dict(metadata, path=path.as_posix())
+            self.__record(key, self.entries[key])
+
+
+    def update(self, key: str, **metadata):
+        """changes the metadata of an existing entry and saves the manifest"""
+        with self._lock:
+            self.entries[key].update(metadata)
+            self.__record(key, self.entries[key])
+
+
+    def remove(self, key: str):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self.__record(key, None)
+
+
+    def save(self):
+        """writes all entries atomically to manifest.json and clears the journal,
+        readers see the old or the new version
+        """
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.manifest', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as jfile:
+                    json.dump(self.entries, jfile, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            # replaying the old journal on the new manifest gives the same entries,
+            # so a crash before the journal is cleared loses nothing
+            with open(self.journal_path, 'w'):
+                pass
+            self._journal_length = 0
+
+
+    def scan(self) -> dict:
+        """creates the entries from the files on disk"""
+        entries = {}
+        if not self.root.exists():
+            return entries
+        for path in sorted(self.root.rglob('*')):
+            relative = path.relative_to(self.root).as_posix()
+            for pattern, key in LAYOUT:
+                match = pattern.fullmatch(relative)
+                if match is None:
+                    continue
+                key = key.format(**match.groupdict())
+                # a converted columnar table replaces the legacy csv table
+                if key not in entries or entries[key]['path'].endswith('.csv'):
+                    entries[key] = {'path': relative}
+                break
+        return entries
+
+
+    def rebuild(self) -> int:
+        """replaces the entries with the files on disk, entries whose file is still
+        there keep their metadata, returns the number of entries
+        """
+        with self._lock:
+            entries = self.scan()
+            for key, entry in self.entries.items():
+                if key in entries:
+                    if entries[key]['path'] == entry.get('path'):
+                        entries[key] = entry
+                # game stats aren't found by scan, they may be packed into a season archive
+                elif key.startswith('gamestats/') and 'path' in entry:
+                    path = self.root / entry['path']
+                    if is_archived(path.parent, path.stem):
+                        entries[key] = entry
+            self.entries = entries
+            self.save()
+            return len(self.entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="repairs the cache manifests")
+    parser.add_argument('command', choices=['repair'])
+    parser.add_argument(
+        'roots', nargs='*',
+        default=['NflDataLoader/database', 'NflDataLoader/database/schedule'])
+    args = parser.parse_args()
+    for root in args.roots:
+        n_entries = CacheManifest.for_root(root).rebuild()
+        print(f"{root}: {n_entries} entries")
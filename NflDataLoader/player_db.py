@@ -1,4 +1,5 @@
 # from datetime import date
+from pathlib import Path
 from typing import Sequence
 import sqlalchemy as db
 from sqlalchemy import Column, Integer, String, Date
@@ -52,6 +53,8 @@ class Player(Base):
 
 class Players():
     def __init__(self, path: str = 'NflDataLoader/database/nflplayers.db', echo: bool = False):
+        # sqlite creates the file but not its directory
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
         db_path = "sqlite:///" + path
         self.engine = db.create_engine(db_path, echo=echo)
         self._create_playerdb()
@@ -120,6 +123,42 @@ class Players():
             self.SafeSession.remove()
 
 
+    def add_players(self, newplayers: Sequence[Player]) -> int:
+        """
+        adds the players which are not already in the database in one transaction,
+        uses esb_id (player_id without esb_id) to distinguish between players,
+        returns the number of added players
+        """
+        session = self.SafeSession()
+        try:
+            esb_ids = {player.esb_id for player in newplayers if player.esb_id is not None}
+            gsis_ids = {player.player_id for player in newplayers
+                        if player.esb_id is None and player.player_id is not None}
+            known = {('esb', esb_id) for esb_id, in
+                     session.query(Player.esb_id).filter(Player.esb_id.in_(esb_ids))}
+            known |= {('gsis', gsis_id) for gsis_id, in
+                      session.query(Player.player_id).filter(Player.player_id.in_(gsis_ids))}
+            added = []
+            for player in newplayers:
+                if player.esb_id is not None:
+                    key = ('esb', player.esb_id)
+                elif player.player_id is not None:
+                    key = ('gsis', player.player_id)
+                else:
+                    print(f'Missing ID for Player {player.name}')
+                    continue
+                if key in known:
+                    print(f"Player {player.name} is already in the database.")
+                    continue
+                known.add(key)
+                added.append(player)
+            session.add_all(added)
+            session.commit()
+        finally:
+            self.SafeSession.remove()
+        return len(added)
+
+
     def get_first_player(self):
         session = self.SafeSession()
         result = session.query(Player).first()
@@ -158,6 +197,14 @@ class Players():
             yield player.asdict()
 
 
+    def get_all_players(self):
+        """returns a list of playerdictionaries of all players in the database"""
+        session = self.SafeSession()
+        players = [player.asdict() for player in session.query(Player)]
+        self.SafeSession.remove()
+        return players
+
+
     def get_active_players(self):
         """ returns a list of playerdictionaries from players whose status == 'ACT'"""
         session = self.SafeSession()
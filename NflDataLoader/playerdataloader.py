@@ -1,9 +1,12 @@
 # playerdataloader.py
+import threading
 from typing import Sequence
 import pandas as pd
 
+from . import instrument
 from .player_db import Players
-from .roster import update_database, download_player_data
+from .roster import update_database, download_player_data, download_players_data
+from .scheduler import BULK
 
 class PlayerDataLoader():
     def __init__(self, **kwargs):
@@ -17,6 +20,9 @@ class PlayerDataLoader():
             path=self.db_path,
             echo=kwargs.get('echo', False)
             )
+        # infos by gsis id of all players, filled by preload
+        self.infos = None
+        self._lock = threading.Lock()
 
 
     def update_database(self):
@@ -51,14 +57,58 @@ class PlayerDataLoader():
         return self.db.get_active_players()
 
 
+    def preload(self):
+        """loads the infos of all players of the database into memory,
+        afterwards get_player_infos doesn't query the database
+        """
+        with self._lock, instrument.span('players.preload'):
+            self.infos = {}
+            for player in self.db.get_all_players():
+                self.infos.setdefault(player['player_id'], player)
+
+
+    def resolve_player_infos(self, gsis_ids: Sequence, priority: int = BULK) -> list:
+        """downloads the players of gsis_ids which are not preloaded in one batch
+        (concurrently through the shared FetchScheduler), adds them to the database
+        in one transaction and to the preloaded infos, returns the resolved ids
+        """
+        if self.infos is None:
+            self.preload()
+        with self._lock:
+            missing = [i for i in dict.fromkeys(gsis_ids) if i not in self.infos]
+        if not missing:
+            return missing
+        instrument.count('players.resolved', len(missing))
+        with instrument.span('players.download'):
+            downloaded = download_players_data(missing, priority)
+        unavailable = [gsis_id for gsis_id, data in downloaded.items() if data is None]
+        found = {gsis_id: data for gsis_id, data in downloaded.items() if data is not None}
+        with instrument.span('players.insert'):
+            self.db.add_players([self.db.create_player(data) for data in found.values()])
+        with self._lock:
+            self.infos.update(found)
+        if unavailable:
+            raise ValueError(f"For the players with ids {unavailable} no data available.")
+        return missing
+
+
     def get_player_infos(self, gsis_ids: Sequence) -> pd.DataFrame:
-        """return infos for players with the given gsis_ids as panda DataFrame"""
+        """return infos for players with the given gsis_ids as panda DataFrame,
+        after preload the infos are taken from memory and missing players are skipped,
+        see resolve_player_infos
+        """
+        if self.infos is not None:
+            with self._lock, instrument.span('players.lookup'):
+                return pd.DataFrame(
+                    [self.infos[i] for i in dict.fromkeys(gsis_ids) if i in self.infos])
         infos = []
-        for p in self.get_multiple_player_data(gsis_ids=gsis_ids):
-            infos.append(p)
+        with instrument.span('players.query'):
+            for p in self.get_multiple_player_data(gsis_ids=gsis_ids):
+                infos.append(p)
         if len(gsis_ids) == len(infos):
             return pd.DataFrame(infos)
         gsis_ids = set(gsis_ids) - {i['player_id'] for i in infos}
+        instrument.count('players.db_misses', len(gsis_ids))
         for gsis_id in gsis_ids:
             infos.append(self.get_player_data(gsis_id=gsis_id))
         return pd.DataFrame(infos)
@@ -0,0 +1,278 @@
+# replay.py
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import httpclient
+
+# response headers worth replaying (matched case-insensitively), the body is stored decoded
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+_KEPT_KEYS = {header.lower() for header in KEPT_HEADERS}
+
+
+def normalize_url(url: str) -> str:
+    """url with sorted query parameters, so the order of params doesn't matter"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class CassetteStore():
+    """Recorded responses in a directory, one json file per method and url."""
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+
+    def __len__(self) -> int:
+        return len(list(self.directory.glob('*.json')))
+
+
+    def get_path(self, method: str, url: str) -> Path:
+        key = f'{method.upper()} {normalize_url(url)}'
+        return self.directory / f'{hashlib.sha1(key.encode()).hexdigest()}.json'
+
+
+    def add(self, method: str, url: str, status: int, body: bytes, headers: dict = None) -> Path:
+        """stores a response, replaces an older one of the same request"""
+        record = {
+            'method': method.upper(),
+            'url': normalize_url(url),
+            'status': status,
+            'headers': {key: value for key, value in (headers or {}).items()
+                        if key.lower() in _KEPT_KEYS},
+            'body': base64.b64encode(body).decode('ascii'),
+        }
+        path = self.get_path(method, url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as jfile:
+            json.dump(record, jfile, indent=4)
+        os.replace(tmp_path, path)
+        return path
+
+
+    def get(self, method: str, url: str) -> dict:
+        """returns the record of the request with the decoded body or None"""
+        try:
+            with open(self.get_path(method, url), 'r') as jfile:
+                record = json.load(jfile)
+        except FileNotFoundError:
+            return None
+        record['body'] = base64.b64decode(record['body'])
+        return record
+
+
+    def record(self, response, stage: str = None):
+        """httpclient hook, stores every response of the client under the requested
+        url and the urls of its redirects, so a replay of the request finds it
+        """
+        urls = [redirect.request.url for redirect in response.history] + [response.url]
+        for url in dict.fromkeys(urls):
+            self.add(response.request.method, url, response.status_code,
+                     response.content, response.headers)
+
+
+class Faults():
+    """latency and injected errors of a replay: every request waits latency seconds,
+    a share of error_rate requests fails with error_status
+    """
+    def __init__(self, latency: float = 0, error_rate: float = 0, error_status: int = 503,
+                 seed: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+
+    def apply(self) -> bool:
+        """waits the latency, returns True if the request has to fail"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+class ReplayAdapter(BaseAdapter):
+    """requests adapter answering from a CassetteStore without network,
+    missing requests get a 404 (or raise ConnectionError with strict=True),
+    error_status 0 raises a ConnectionError instead of an error response
+    """
+    def __init__(self, store: CassetteStore, strict: bool = False, **faults):
+        super().__init__()
+        self.store = store
+        self.strict = strict
+        self.faults = Faults(**faults)
+
+
+    def send(self, request, **kwargs):
+        if self.faults.apply():
+            if not self.faults.error_status:
+                raise requests.ConnectionError(f"injected error for {request.url}")
+            return self.__build(request, self.faults.error_status, b'', {})
+        record = self.store.get(request.method, request.url)
+        if record is None:
+            if self.strict:
+                raise requests.ConnectionError(f"{request.url} is not recorded")
+            return self.__build(request, 404, b'', {})
+        return self.__build(request, record['status'], record['body'], record['headers'])
+
+
+    def __build(self, request, status: int, body: bytes, headers: dict):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.reason = 'replayed'
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+
+    def close(self):
+        pass
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are separate writes, with nagle every response waits for the ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        # /{scheme}/{netloc}/{path}?{query} of the original url
+        scheme, _, rest = self.path.lstrip('/').partition('/')
+        url = f'{scheme}://{rest}'
+        if server.faults.apply():
+            return self.__respond(server.faults.error_status or 503, b'', {})
+        record = server.store.get('GET', url)
+        if record is None:
+            return self.__respond(404, b'', {})
+        self.__respond(record['status'], record['body'], record['headers'])
+
+    def __respond(self, status: int, body: bytes, headers: dict):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _RewriteAdapter(HTTPAdapter):
+    """sends the requests of all hosts to the replay server, keeps the retries"""
+    def __init__(self, server_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.server_url = server_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = (f'{self.server_url}/{parts.scheme}/{parts.netloc}{parts.path}'
+                       + (f'?{parts.query}' if parts.query else ''))
+        return super().send(request, **kwargs)
+
+
+class ReplayServer():
+    """local http server which serves a CassetteStore with latency and error injection,
+    so concurrency and retries run against real sockets
+    """
+    def __init__(self, store: CassetteStore, host: str = '127.0.0.1', port: int = 0, **faults):
+        self.server = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self.server.daemon_threads = True
+        self.server.store = store
+        self.server.faults = Faults(**faults)
+        self.thread = None
+
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+    def rewrite(self, url: str) -> str:
+        """the url of the replay server for an original url (templates work as well)"""
+        parts = urlsplit(url)
+        return (f'{self.url}/{parts.scheme}/{parts.netloc}{parts.path}'
+                + (f'?{parts.query}' if parts.query else ''))
+
+
+    def install(self, client: httpclient.HttpClient = None):
+        """routes all requests of client (default the shared client) to the server"""
+        client = client or httpclient.get_client()
+        retry = client.session.get_adapter('http://').max_retries
+        for prefix in ('http://', 'https://'):
+            client.mount(prefix, _RewriteAdapter(self.url, max_retries=retry))
+
+
+    def start(self) -> 'ReplayServer':
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record(directory: Path, client: httpclient.HttpClient = None) -> CassetteStore:
+    """records every response of client (default the shared client) into directory"""
+    store = CassetteStore(directory)
+    (client or httpclient.get_client()).add_hook(store.record)
+    return store
+
+
+def replay(directory: Path, client: httpclient.HttpClient = None, **kwargs) -> ReplayAdapter:
+    """answers all requests of client (default the shared client) from directory,
+    takes the arguments of ReplayAdapter (strict, latency, error_rate, error_status, seed)
+    """
+    adapter = ReplayAdapter(CassetteStore(directory), **kwargs)
+    client = client or httpclient.get_client()
+    for prefix in ('http://', 'https://'):
+        client.mount(prefix, adapter)
+    return adapter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="serves recorded responses")
+    parser.add_argument('directory', nargs='?', default='NflDataLoader/database/cassettes')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help="seconds per request")
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    replay_server = ReplayServer(
+        CassetteStore(args.directory), port=args.port, latency=args.latency,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+    print(f"serving {args.directory} on {replay_server.url}/{{scheme}}/{{host}}/{{path}}")
+    try:
+        replay_server.server.serve_forever()
+    except KeyboardInterrupt:
+        replay_server.stop()
@@ -3,14 +3,16 @@ import re
 from datetime import date
 from typing import Tuple, List
 from pathlib import Path
+from urllib.parse import urlsplit
 from dateutil.parser import parse
 
-import requests
-from requests.exceptions import ConnectTimeout
+from requests.exceptions import RequestException
 from bs4 import BeautifulSoup as BS
 from tqdm import tqdm
 
+from . import httpclient, instrument
 from .player_db import Players
+from .scheduler import get_scheduler, BULK
 from .helperfunctions import convert_inch_to_cm, convert_pounds_to_kg
 
 
@@ -142,11 +144,17 @@ def download_player_data(gsis_id: str) -> dict:
     """Downloads the data for the player with the given gsis_id"""
     URL = 'http://www.nfl.com/players/profile'
     content = {'id': gsis_id}
-    response = requests.get(URL, content, timeout=5)
+    try:
+        with instrument.span('roster.profile.download'):
+            response = httpclient.get(URL, content, stage='profile')
+    except RequestException:
+        print(f"No connection to the profile of {gsis_id}")
+        return None
     soup = BS(response.text, 'html.parser')
     try:
         playerinfo = soup.find(id='player-bio').find(class_='player-info')
-        meta = get_meta_data(playerinfo)
+        with instrument.span('roster.profile.parse'):
+            meta = get_meta_data(playerinfo)
         meta['player_id'] = gsis_id
         index = response.text.find('ESB ID')
         meta['esb_id'] = response.text[index+8:index+17]
@@ -159,9 +167,13 @@ def download_player_data(gsis_id: str) -> dict:
     return meta
 
 
-def find_player_infos(html_text, team: str):
+def parse_roster(html_text, team: str) -> Tuple[Roster, List[str]]:
+    """parses the rows of a roster page without resolving the player ids,
+    returns the players and the urls of their profiles in the same order
+    """
     soup = BS(html_text, 'html.parser')
     tbodys = soup.find(id='result').find_all('tbody')
+    roster, player_urls = [], []
     for row in tbodys[len(tbodys) - 1].find_all('tr'):
         try:
             tds, data = [], []
@@ -170,9 +182,8 @@ def find_player_infos(html_text, team: str):
                 data.append(td.get_text().strip())
             name = tds[1].a.get_text().strip()
             player_url = "http://www.nfl.com" + tds[1].a.get('href')
-            gsis_id, esb_id = get_player_ids(player_url)
             d = {
-                'player_id': gsis_id,
+                'player_id': None,
                 'trikotnumber': data[0],
                 'name': name,
                 'position': data[2],
@@ -183,34 +194,78 @@ def find_player_infos(html_text, team: str):
                 'exp': data[7],
                 'college': data[8],
                 'team': team,
-                'esb_id': esb_id
+                'esb_id': None
             }
-            yield d
         except NameError as e:
             print(e)
+            continue
+        roster.append(d)
+        player_urls.append(player_url)
+    return roster, player_urls
+
+
+def add_player_ids(roster: Roster, player_urls: List[str], priority: int = BULK) -> Roster:
+    """sets player_id and esb_id of the players of parse_roster,
+    the profiles are resolved concurrently
+    """
+    for player, (gsis_id, esb_id) in zip(roster, resolve_player_ids(player_urls, priority)):
+        player['player_id'] = gsis_id
+        player['esb_id'] = esb_id
+    return roster
+
 
+def find_player_infos(html_text, team: str, priority: int = BULK):
+    roster, player_urls = parse_roster(html_text, team)
+    yield from add_player_ids(roster, player_urls, priority)
 
-def download_roster(team: str):
+
+def download_roster(team: str, priority: int = BULK):
     roster_url = 'http://www.nfl.com/teams/roster'
     roster_load = {'team': team}
     try:
-        response = requests.get(roster_url, roster_load, timeout=5)
-    except ConnectTimeout:
-        print(response.url)
-    roster = []
-    for player in find_player_infos(response.text, team):
-        roster.append(player)
+        with instrument.span('roster.download'):
+            response = httpclient.get(roster_url, roster_load, stage='roster')
+    except RequestException:
+        print(f"No connection to the roster of {team}")
+        return []
+    roster = list(find_player_infos(response.text, team, priority))
+    instrument.count('rows.roster', len(roster))
     return roster
 
+
+def download_rosters(teams: List[str] = TEAMS, priority: int = BULK) -> dict:
+    """returns {team: roster} like download_roster, the roster pages are fetched
+    concurrently and the profiles of all teams are resolved in one batch
+    """
+    roster_url = 'http://www.nfl.com/teams/roster'
+    scheduler = get_scheduler()
+    futures = {
+        team: scheduler.fetch(roster_url, {'team': team}, priority=priority, stage='roster')
+        for team in teams}
+    rosters, player_urls = {}, []
+    for team, future in futures.items():
+        try:
+            response = future.result()
+        except RequestException:
+            print(f"No connection to the roster of {team}")
+            rosters[team] = []
+            continue
+        with instrument.span('roster.parse'):
+            rosters[team], urls = parse_roster(response.text, team)
+        player_urls += urls
+    players = [player for roster in rosters.values() for player in roster]
+    add_player_ids(players, player_urls, priority)
+    instrument.count('rows.roster', len(players))
+    return rosters
+
 def get_player_links(team: str):
     url = "http://nfl.com/teams/roster"
     load = {'team': team}
-    try:
-        response = requests.get(url, load, timeout=10)
+    with instrument.span('roster.download'):
+        response = httpclient.get(url, load, stage='roster')
+    with instrument.span('roster.parse'):
         player_links = extract_links(response.text)
-        return player_links
-    except ConnectTimeout:
-        raise ConnectTimeout(f"Connection to {response.url} timed out!")
+    return player_links
 
 def extract_links(html_text):
     soup = BS(html_text, 'lxml')
@@ -229,9 +284,10 @@ def convert_name(old_name: str) -> str:
 
 def get_player_ids(url: str) -> Player_IDs:
     try:
-        response = requests.get(url, timeout=10)
-    except ConnectTimeout:
-        print(f"Timout while connecting to {url}")
+        with instrument.span('roster.ids.download'):
+            response = httpclient.get(url, stage='player_ids')
+    except RequestException:
+        print(f"No connection to {url}")
         return ("gsis0000", "esb0000")
     if response.status_code == 200:
         text = response.text
@@ -247,11 +303,49 @@ def get_player_ids(url: str) -> Player_IDs:
     return (gsis_id, esb_id)
 
 
-def download_player_ids(team: str):
+def resolve_player_ids(player_urls: List[str], priority: int = BULK) -> List[Player_IDs]:
+    """fetches the (gsis_id, esb_id) of the profile urls with the workers and pooled
+    connections of the shared FetchScheduler, returns them in the order of player_urls
+    """
+    player_ids = collect_player_ids(submit_player_ids(
+        {url: url for url in player_urls}, priority))
+    return [player_ids[url] for url in player_urls]
+
+
+def submit_player_ids(links: dict, priority: int = BULK) -> dict:
+    """schedules get_player_ids for the profile urls of {name: url},
+    returns {name: Future}
+    """
+    scheduler = get_scheduler()
+    return {
+        name: scheduler.submit(get_player_ids, url, host=urlsplit(url).netloc, priority=priority)
+        for name, url in links.items()}
+
+
+def collect_player_ids(futures: dict) -> dict:
+    """waits for the futures of submit_player_ids, returns {name: (gsis_id, esb_id)}"""
+    return {name: future.result() for name, future in futures.items()}
+
+
+def download_players_data(gsis_ids: List[str], priority: int = BULK) -> dict:
+    """downloads the data of the players with download_player_data, the profiles
+    are fetched concurrently by the shared FetchScheduler,
+    returns {gsis_id: data} in the order of gsis_ids
+    """
+    scheduler = get_scheduler()
+    futures = {
+        gsis_id: scheduler.submit(
+            download_player_data, gsis_id, host='www.nfl.com', priority=priority)
+        for gsis_id in dict.fromkeys(gsis_ids)}
+    return {gsis_id: future.result() for gsis_id, future in futures.items()}
+
+
+def download_player_ids(team: str, priority: int = BULK):
+    """returns {name: (gsis_id, esb_id)} of the roster of team,
+    the profile pages are fetched concurrently by the shared FetchScheduler
+    """
     links = get_player_links(team)
-    # multithreading?!
-    ids = {name: get_player_ids(url) for name, url in links.items()}
-    return ids
+    return collect_player_ids(submit_player_ids(links, priority))
 
 
 def convert_roster(roster: Roster) -> Roster:
@@ -289,9 +383,9 @@ def create_db_entries(db: Players, roster: Roster) -> list:
 
 def create_new_database(PATH: Path = Path('NflDataLoader/database/nflplayers.db'), **kwargs):
     db = Players(path=str(PATH), echo=kwargs.get('echo', False))
-    for team in tqdm(TEAMS, desc="Downloading Roster..."):
-        team_roster = download_roster(team)
-        roster = create_db_entries(db, team_roster)
+    rosters = download_rosters(TEAMS)
+    for team in tqdm(TEAMS, desc="Creating Database..."):
+        roster = create_db_entries(db, rosters[team])
         for player in roster:
             db.add_player(player)
     return db
@@ -300,9 +394,9 @@ def create_new_database(PATH: Path = Path('NflDataLoader/database/nflplayers.db'
 def update_database(PATH: Path = Path('NflDataLoader/database/nflplayers.db')):
     if PATH.exists():
         db = Players(path=str(PATH))
+        rosters = download_rosters(TEAMS)
         for team in tqdm(TEAMS, desc="Updating Database..."):
-            team_roster = download_roster(team)
-            team_roster = create_db_entries(db, team_roster)
+            team_roster = create_db_entries(db, rosters[team])
             for player in team_roster:
                 db.update_player(player, esb_id=player.esb_id)
     else:
@@ -1,30 +1,128 @@
-import io
-import shelve
-import json
-from xml.sax import make_parser
+import os
+import threading
+import time
 from datetime import date
 from pathlib import Path
-from typing import NewType
+from typing import NewType, NamedTuple
 
-import requests
-from requests.exceptions import Timeout
+from requests.exceptions import RequestException
 import pandas as pd
 
-from .NFLHandler import NflHandler
+from . import httpclient, instrument, serialization
+from .scorestrip import parse_games
+from .manifest import CacheManifest, schedule_key
+from .jsonarchive import read_packed_bytes
+from .serialization import CorruptFileError
+from .scheduler import get_scheduler, BULK
 
 EID = NewType('EID', str)
+SCHEDULE_URL = 'http://www.nfl.com/ajax/scorestrip'
+# seconds until the schedule of a week with open games is fetched again
+SCHEDULE_TTL = 6 * 3600
+
+class TeamGame(NamedTuple):
+    """the game of a team in a week"""
+    eid: EID
+    team: str
+    opponent: str
+    home: bool
+    date: date
+
+
+class ScheduleIndex():
+    """Games of one or more seasons in memory, by (season, seasontype, week, team)
+    and by eid. Teams are matched exactly.
+    """
+    def __init__(self):
+        self.games = {}
+        self.team_games = {}
+        # eids by (season, seasontype, week)
+        self.weeks = {}
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+
+    def __contains__(self, eid: EID) -> bool:
+        return eid in self.games
+
+
+    def add_week(self, season: int, seasontype: str, week: int, games: list):
+        """adds the games of a week, replaces the games the week had before"""
+        week_key = (season, seasontype, week)
+        with self._lock:
+            for eid in self.weeks.pop(week_key, ()):
+                game = self.games.pop(eid)
+                for place in ('home', 'away'):
+                    self.team_games.pop(week_key + (game[place],), None)
+            eids = []
+            for game in games or ():
+                eid = EID(game['eid'])
+                gamedate = create_date_from_eid(eid)
+                self.games[eid] = game
+                self.team_games[week_key + (game['home'],)] = TeamGame(
+                    eid, game['home'], game['away'], True, gamedate)
+                self.team_games[week_key + (game['away'],)] = TeamGame(
+                    eid, game['away'], game['home'], False, gamedate)
+                eids.append(eid)
+            self.weeks[week_key] = eids
+
+
+    def get(self, season: int, seasontype: str, week: int, team: str) -> TeamGame:
+        """returns the TeamGame of the team or None in its bye week"""
+        return self.team_games.get((season, seasontype, week, team))
+
+
+    def get_eid(self, season: int, seasontype: str, week: int, team: str) -> EID:
+        team_game = self.get(season, seasontype, week, team)
+        return None if team_game is None else team_game.eid
+
+
+    def get_game(self, eid: EID) -> dict:
+        return self.games.get(eid)
+
+
+    def get_games(self, season: int, seasontype: str, week: int) -> list:
+        """returns the games of the week in schedule order"""
+        return [self.games[eid] for eid in self.weeks.get((season, seasontype, week), ())]
+
+
+    def get_current_week(self, season: int, seasontype: str = 'REG', dte: date = None) -> int:
+        """returns the first indexed week with a game on or after dte (default today),
+        the last week if all games are played
+        """
+        dte = dte or date.today()
+        weeks = sorted(week for (s, stype, week) in self.weeks
+                       if s == season and stype == seasontype)
+        for week in weeks:
+            eids = self.weeks[(season, seasontype, week)]
+            if any(create_date_from_eid(eid) >= dte for eid in eids):
+                return week
+        return weeks[-1] if weeks else None
+
 
 class ScheduleLoader():
     def __init__(self, season, week=None, seasontype='REG', update=True, **kwargs):
         """
         opt argument:
         path: str = location for the schedule data
+        ttl: float = seconds until a week with open games is fetched again,
+            finished weeks are never fetched again (default SCHEDULE_TTL)
+        priority: int = priority of the downloads in the shared FetchScheduler
+            (default scheduler.BULK)
         """
         self.season = season
         self.seasontype = seasontype
+        self.ttl = kwargs.get('ttl', SCHEDULE_TTL)
+        self.priority = kwargs.get('priority', BULK)
         self.base_path = Path(kwargs.get('path', 'NflDataLoader/database/schedule'))
         self.directory_path = self.base_path / str(season) / seasontype
-        self.directory_path.mkdir(parents=True, exist_ok=True)
+        self.manifest = CacheManifest.for_root(self.base_path)
+        self.index = ScheduleIndex()
+        # (season, seasontype) of the completely indexed seasons
+        self.indexed = set()
         if update:
             self.update_schedule()
         if week:
@@ -35,57 +133,146 @@ class ScheduleLoader():
             self.schedule = None
 
 
-    def __load_schedule(self, season, week, seasontype):
+    def __download_schedule(self, season, week, seasontype) -> bytes:
         '''
-        loads game schedule for the given combination of season & week,
-        returns list of game dictionaries,
+        downloads the scorestrip for the given combination of season & week,
+        returns the raw xml or None
         '''
-        url = 'http://www.nfl.com/ajax/scorestrip'
         payload = {'season': season, 'seasonType': seasontype, 'week': week}
         try:
-            schedule = requests.get(url, payload, timeout=2)
-        except Timeout:
-            print(f"Timeout during schedule connection! Season: {season}, Week: {week}")
+            with instrument.span('schedule.download'):
+                schedule = httpclient.get(SCHEDULE_URL, payload, stage='schedule')
+        except RequestException:
+            print(f"No schedule connection! Season: {season}, Week: {week}")
             return None
         if schedule.status_code == 200:
-            schedule.encoding = 'UTF-8'
-            schedule_file = io.StringIO(schedule.text)
-            parser = make_parser()
-            content_handler = NflHandler(season, seasontype, week)
-            parser.setContentHandler(content_handler)
-            parser.parse(schedule_file)
-            return content_handler.get_games()
+            return schedule.content
         print("Couldn't load schedule")
         return None
 
 
-    def update_schedule(self):
+    def __parse_schedules(self, documents: list) -> dict:
+        '''
+        parses the scorestrips of (season, seasontype, week, content) in one batch,
+        returns {week: list of game dictionaries}
+        '''
+        with instrument.span('schedule.parse'):
+            parsed = parse_games(documents)
+            games = {week: [] for _, _, week, _ in documents}
+            for game in parsed:
+                games[game['week']].append(game)
+        instrument.count('rows.schedule', len(parsed))
+        return games
+
+
+    def __load_schedule(self, season, week, seasontype):
+        '''
+        loads game schedule for the given combination of season & week,
+        returns list of game dictionaries,
+        the download waits for the nfl.com bucket of the shared scheduler
+        '''
+        content = get_scheduler().submit(
+            self.__download_schedule, season, week, seasontype,
+            host='www.nfl.com', priority=self.priority).result()
+        if content is None:
+            return None
+        return self.__parse_schedules([(season, seasontype, week, content)])[week]
+
+
+    def update_schedule(self, force: bool = False) -> list:
         '''
-        updates the game schedule for the given season
+        fetches the schedules of the season's weeks which are missing or stale,
+        all of them with force=True, the downloads run concurrently and
+        are parsed in one batch, returns the refreshed weeks
         '''
         if self.seasontype == 'REG':
             weeks = [week for week in range(1, 18, 1)]
         else:
             weeks = [week for week in range(1, 5, 1)]
-        for week in weeks:
-            schedule = self.__load_schedule(self.season, week, self.seasontype)
-            save_obj_to_json(schedule, self.directory_path, f"{week}.json")
-        return
+        stale = [week for week in weeks
+                 if force or self.is_stale(self.season, week, self.seasontype)]
+        instrument.count('cache.schedule.fresh', len(weeks) - len(stale))
+        scheduler = get_scheduler()
+        futures = [
+            (week, scheduler.submit(
+                self.__download_schedule, self.season, week, self.seasontype,
+                host='www.nfl.com', priority=self.priority))
+            for week in stale]
+        # a failed download keeps the old schedule
+        documents = [(self.season, self.seasontype, week, future.result())
+                     for week, future in futures]
+        documents = [document for document in documents if document[3] is not None]
+        if not documents:
+            return []
+        schedules = self.__parse_schedules(documents)
+        for week, schedule in schedules.items():
+            self.__save_schedule(schedule, self.season, week, self.seasontype)
+        return list(schedules)
+
+
+    def is_stale(self, season: int, week: int, seasontype: str) -> bool:
+        '''
+        True if the schedule of the week is missing or has open games
+        and was fetched more than ttl seconds ago
+        '''
+        key = schedule_key(season, seasontype, week)
+        entry = self.manifest.get(key)
+        if entry is None:
+            return True
+        if 'finished' not in entry:
+            # entries of older versions and of manifest scans have no freshness yet
+            path = self.manifest.get_path(key)
+            try:
+                schedule = load_json(path)
+                fetched = os.path.getmtime(path)
+            except (FileNotFoundError, ValueError):
+                return True
+            if schedule is None:
+                # a failed download of older versions
+                return True
+            self.manifest.update(key, fetched=fetched, finished=is_finished(schedule))
+            entry = self.manifest.get(key)
+        if entry['finished']:
+            return False
+        return time.time() - entry['fetched'] > self.ttl
+
+
+    def __save_schedule(self, schedule, season, week, seasontype):
+        directory_path = self.base_path / str(season) / seasontype
+        save_obj_to_json(schedule, directory_path, f"{week}.json")
+        self.manifest.add(
+            schedule_key(season, seasontype, week), directory_path / f"{week}.json",
+            fetched=time.time(), finished=is_finished(schedule))
+        if (season, seasontype) in self.indexed:
+            self.index.add_week(season, seasontype, week, schedule)
 
 
     def get_schedule(self, season: int, week: int, seasontype: str) -> list:
         '''
-        returns the games for a given combination of season, week, seasontype
+        returns the games for a given combination of season, week, seasontype,
+        stale schedules are fetched again, the old one is kept if that fails
         '''
         self.directory_path = self.base_path / str(season) / seasontype
-        self.directory_path.mkdir(parents=True, exist_ok=True)
-        filename = f"{week}.json"
-        file_path = self.directory_path / filename
-        if file_path in self.directory_path.iterdir():
-            schedule = load_json(file_path)
-        else:
+        key = schedule_key(season, seasontype, week)
+        stale = self.is_stale(season, week, seasontype)
+        schedule = None
+        if stale:
+            instrument.count('cache.schedule.misses')
             schedule = self.__load_schedule(season, week, seasontype)
-            save_obj_to_json(schedule, self.directory_path, filename)
+            if schedule is not None:
+                self.__save_schedule(schedule, season, week, seasontype)
+        if schedule is None and key in self.manifest:
+            try:
+                schedule = load_json(self.manifest.get_path(key))
+                if not stale:
+                    instrument.count('cache.schedule.hits')
+            except (FileNotFoundError, CorruptFileError) as err:
+                if isinstance(err, CorruptFileError):
+                    print(f"Corrupt schedule of week {week} ({err}), fetching it again")
+                    instrument.count('cache.schedule.corrupt')
+                self.manifest.remove(key)
+                if not stale:
+                    return self.get_schedule(season, week, seasontype)
         self.schedule = schedule
         return schedule
 
@@ -104,36 +291,63 @@ class ScheduleLoader():
         return season
 
 
-    def get_current_week(self, dte=date.today()):
+    def get_index(self, season: int = None, seasontype: str = None) -> ScheduleIndex:
+        '''
+        returns the index of all loaded seasons, the weeks of the given season
+        (default the loader's season) are added on the first call, later calls
+        load the weeks which failed before or went stale since
+        '''
+        season = self.season if season is None else season
+        seasontype = seasontype or self.seasontype
+        weeks = range(1, 18, 1) if seasontype == 'REG' else range(1, 5, 1)
+        if (season, seasontype) in self.indexed:
+            weeks = [week for week in weeks
+                     if (season, seasontype, week) not in self.index.weeks
+                     or self.is_stale(season, week, seasontype)]
+        for week in weeks:
+            schedule = self.get_schedule(season, week, seasontype)
+            # a week which failed to load stays out of the index until it loads
+            if schedule is not None:
+                self.index.add_week(season, seasontype, week, schedule)
+        self.indexed.add((season, seasontype))
+        return self.index
+
+
+    def get_current_week(self, dte=None):
         '''
-        needs rework
+        returns the first regular season week with games on or after the given
+        datetime.date (standard is the current date), 17 after the season
         '''
+        dte = dte or date.today()
         season = self.get_season(dte=dte)
-        shelf = shelve.open(f'database/schedule/shelves/{season}')
-        for week in range(1, 18, 1):
-            games = shelf[str(week)]
-            open_games = 0
-            for game in games:
-                if not game['finished']:
-                    open_games += 1
-            if open_games > 0:
-                shelf.close()
-                return week
-        shelf.close()
-        return 17
+        week = self.get_index(season, 'REG').get_current_week(season, 'REG', dte)
+        return week or 17
+
+
+def is_finished(schedule: list) -> bool:
+    '''True if the schedule has games and all of them are finished'''
+    return bool(schedule) and all(game.get('finished', False) for game in schedule)
 
 
 def save_obj_to_json(obj, fpath, filename):
-    fpath.mkdir(parents=True, exist_ok=True)
-    filepath = fpath / filename
-    with open(filepath, 'w') as jfile:
-        json.dump(obj, jfile, sort_keys=True, indent=4)
+    '''writes obj atomically with the codec of serialization.configure'''
+    serialization.write(obj, Path(fpath) / filename)
+
+
+def read_json_bytes(filepath) -> bytes:
+    '''reads the raw json of a file, falls back to the packed archive of its directory'''
+    try:
+        with open(filepath, 'rb') as jfile:
+            return jfile.read()
+    except FileNotFoundError:
+        return read_packed_bytes(filepath)
 
 
 def load_json(filepath):
-    with open(filepath, 'r') as jfile:
-        obj = json.load(jfile)
-    return obj
+    '''loads a cached file, falls back to the packed archive of its directory,
+    raises serialization.CorruptFileError for truncated or corrupt files
+    '''
+    return serialization.loads(read_json_bytes(filepath))
 
 
 def create_date_from_eid(eid: EID) -> date:
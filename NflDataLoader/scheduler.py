@@ -0,0 +1,170 @@
+# scheduler.py
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from . import httpclient, instrument
+
+# priorities, lower values are fetched first
+INTERACTIVE = 0
+BULK = 10
+# requests per second and burst size by host (see get_host_key), team sites throttle early
+HOST_RATES = {
+    'nfl.com': (10, 10),
+}
+DEFAULT_RATE = (2, 4)
+
+
+def get_host_key(host: str) -> str:
+    """the bucket of a host, www.nfl.com and nfl.com are one site with one rate limit"""
+    host = host.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class TokenBucket():
+    """rate tokens per second, at most capacity tokens are saved for bursts"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def reserve(self, tokens: float = 1) -> float:
+        """takes the tokens, returns the seconds to wait until they are available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+    def acquire(self, tokens: float = 1):
+        """blocks until the tokens are available"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FetchScheduler():
+    """Runs download jobs on a bounded number of threads, jobs with a lower
+    priority value are started first (FIFO within a priority) and every job
+    takes tokens of the bucket of its host before it starts.
+    Jobs must not wait for other jobs of the same scheduler.
+    """
+    def __init__(self, **kwargs):
+        """
+        optional arguments:
+        workers int: number of threads (default 8)
+        rates dict: (requests per second, burst) by host, a host with and without www.
+            shares one bucket (default HOST_RATES)
+        default_rate tuple: (requests per second, burst) of other hosts (default DEFAULT_RATE)
+        """
+        self.workers = kwargs.get('workers', 8)
+        self.rates = {get_host_key(host): rate
+                      for host, rate in kwargs.get('rates', HOST_RATES).items()}
+        self.default_rate = kwargs.get('default_rate', DEFAULT_RATE)
+        self.buckets = {}
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._shutdown = False
+
+
+    def get_bucket(self, host: str) -> TokenBucket:
+        host = get_host_key(host)
+        with self._lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(*self.rates.get(host, self.default_rate))
+            return self.buckets[host]
+
+
+    def submit(self, func, *args, host: str = None, priority: int = BULK, cost: float = 1,
+               **kwargs) -> Future:
+        """schedules func(*args, **kwargs), which sends cost requests to host
+        (no rate limit without host), returns a Future of its result
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("the scheduler is shut down")
+            self.__start_workers()
+        self._queue.put((priority, next(self._counter), (future, func, args, kwargs, host, cost)))
+        instrument.count(f'scheduler.priority_{priority}.submitted')
+        return future
+
+
+    def fetch(self, url: str, params: dict = None, priority: int = BULK, **kwargs) -> Future:
+        """schedules httpclient.get(url, params, **kwargs) under the limit of the url's host"""
+        return self.submit(httpclient.get, url, params, host=urlsplit(url).netloc,
+                           priority=priority, **kwargs)
+
+
+    def shutdown(self, wait: bool = True):
+        """lets the workers finish the queued jobs and stops them"""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        for _ in threads:
+            # sentinels are queued after all jobs
+            self._queue.put((float('inf'), next(self._counter), None))
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+    def __start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self.__work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+
+    def __work(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            future, func, args, kwargs, host, cost = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if host is not None:
+                with instrument.span(f'scheduler.wait.{host}'):
+                    self.get_bucket(host).acquire(cost)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FetchScheduler:
+    """returns the scheduler shared by all downloaders"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler()
+        return _scheduler
+
+
+def configure(**kwargs) -> FetchScheduler:
+    """replaces the shared scheduler with one with the given options of FetchScheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+        _scheduler = FetchScheduler(**kwargs)
+        return _scheduler
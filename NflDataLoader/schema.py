@@ -0,0 +1,188 @@
+# schema.py
+import argparse
+import warnings
+from datetime import date
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from . import instrument
+from .scheduleloader import TEAMS
+from .tablestore import get_store
+
+# one dictionary for the teams and positions of all tables, so tables of
+# different weeks and seasons concat without converting the categories
+TEAM_DTYPE = pd.CategoricalDtype(sorted({team[0] for team in TEAMS} | {'JAC', 'LV'}))
+POSITION_DTYPE = pd.CategoricalDtype(sorted([
+    'QB', 'RB', 'FB', 'WR', 'TE', 'OL', 'OT', 'OG', 'T', 'G', 'C',
+    'DL', 'DE', 'DT', 'NT', 'LB', 'ILB', 'OLB', 'MLB', 'DB', 'CB', 'S', 'SS', 'FS',
+    'K', 'P', 'LS',
+]))
+SHARED_DTYPES = {
+    'team': TEAM_DTYPE,
+    'opponent': TEAM_DTYPE,
+    'position': POSITION_DTYPE,
+}
+# text columns with one dictionary per table
+CATEGORY_COLUMNS = ('name', 'college', 'player_id', 'esb_id')
+DATE_COLUMNS = ('date', 'birthdate')
+# fixed dtypes of the numeric columns, so a column has the same dtype in every
+# table and concat neither widens nor wraps it: counting stats are int16,
+# yards, averages, half sacks and points float32, whole-numbered or not
+FLOAT_PREFIXES = ('fpts',)
+FLOAT_COLUMNS = ('tot_score', 'pts_allwd')
+# stat names without the category prefix (e.g. rush_yds -> yds)
+FLOAT_STATS = ('yds', 'fgyds', 'avg', 'lng', 'lngtd', 'totpfg', 'sk')
+INT_DTYPES = {'id': np.int32}
+# column names whose float32 fallback was already reported
+_fallback_columns = set()
+
+
+def _is_text(column: pd.Series) -> bool:
+    return column.dtype == object or pd.api.types.is_string_dtype(column.dtype)
+
+
+def _to_category(column: pd.Series, dtype: pd.CategoricalDtype = None) -> pd.Series:
+    """values are stored as strings (fillna writes 0 into missing text),
+    values missing in the shared dictionary are appended to it
+    """
+    column = column.astype(str)
+    if dtype is None:
+        return column.astype('category')
+    unknown = sorted(set(column.unique()) - set(dtype.categories))
+    if unknown:
+        dtype = pd.CategoricalDtype(list(dtype.categories) + unknown)
+    return column.astype(dtype)
+
+
+def _to_datetime(column: pd.Series) -> pd.Series:
+    """dates as datetime64, anything else (e.g. 0 from fillna) becomes NaT"""
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return column
+    valid = column.map(lambda value: isinstance(value, (date, str)))
+    return pd.to_datetime(column.where(valid), errors='coerce')
+
+
+def get_dtype(column: str) -> np.dtype:
+    """the compact dtype of a numeric column, only depends on its name"""
+    name = str(column)
+    if (name.startswith(FLOAT_PREFIXES) or name in FLOAT_COLUMNS
+            or name.rsplit('_', 1)[-1] in FLOAT_STATS):
+        return np.dtype(np.float32)
+    return np.dtype(INT_DTYPES.get(name, np.int16))
+
+
+def _report_fallback(name: str, reason: str):
+    """counts the float32 fallback of a column, warns once per column name"""
+    instrument.count(f'schema.float_fallback.{name}')
+    if name not in _fallback_columns:
+        _fallback_columns.add(name)
+        warnings.warn(f"Column {name} {reason}, kept as float32", stacklevel=4)
+
+
+def _downcast(column: pd.Series) -> pd.Series:
+    """converts the column to get_dtype, values which don't fit the integer dtype
+    (fractions, missing values, overflow) keep float32 instead of being cut off
+    """
+    dtype = get_dtype(column.name)
+    if dtype.kind == 'f':
+        return column.astype(dtype)
+    values = column.to_numpy()
+    limits = np.iinfo(dtype)
+    if values.dtype.kind == 'f' and not (np.isfinite(values).all()
+                                         and (values == np.round(values)).all()):
+        _report_fallback(column.name, "has fractional or missing values")
+        return column.astype(np.float32)
+    if len(values) and (values.min() < limits.min or values.max() > limits.max):
+        _report_fallback(column.name, f"exceeds {dtype}")
+        return column.astype(np.float32)
+    return column.astype(dtype)
+
+
+def compact_table(table: pd.DataFrame) -> pd.DataFrame:
+    """returns the table with the compact schema: team, opponent and position
+    share one dictionary, other text columns are categoricals, dates are datetime64
+    and numbers get the fixed dtype of get_dtype, already compact columns are kept
+    """
+    table = table.copy()
+    for column in table.columns:
+        dtype = table[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if column in SHARED_DTYPES:
+            table[column] = _to_category(table[column], SHARED_DTYPES[column])
+        elif column in DATE_COLUMNS:
+            table[column] = _to_datetime(table[column])
+        elif column in CATEGORY_COLUMNS and _is_text(table[column]):
+            table[column] = _to_category(table[column])
+        elif dtype.kind in 'iuf' and dtype != get_dtype(column):
+            table[column] = _downcast(table[column])
+    return table
+
+
+def concat_tables(tables: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """like pd.concat(ignore_index=True, sort=False), categorical columns with
+    different dictionaries stay categorical with the union of the dictionaries
+    """
+    tables = list(tables)
+    categorical = {}
+    for table in tables:
+        for column in table.columns:
+            if isinstance(table[column].dtype, pd.CategoricalDtype):
+                categorical.setdefault(column, []).append(table[column])
+    for column, parts in categorical.items():
+        if all(part.dtype == parts[0].dtype for part in parts):
+            continue
+        dtype = union_categoricals(parts, ignore_order=True).dtype
+        tables = [
+            table.assign(**{column: table[column].astype(dtype)}) if column in table else table
+            for table in tables]
+    return pd.concat(tables, ignore_index=True, sort=False)
+
+
+def legacy_table(table: pd.DataFrame) -> pd.DataFrame:
+    """converts a compact table back to the former layout with object text and dates
+    and float64 numbers
+    """
+    table = table.copy()
+    for column in table.columns:
+        dtype = table[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            table[column] = table[column].astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            table[column] = pd.Series(table[column].dt.date, index=table.index, dtype=object)
+        elif dtype.kind in 'iuf':
+            table[column] = table[column].astype(np.float64)
+    return table
+
+
+def memory_report(table: pd.DataFrame) -> pd.DataFrame:
+    """memory in bytes of every column in the former and the compact layout,
+    the last row 'total' sums all columns
+    """
+    legacy = legacy_table(table)
+    compact = compact_table(table)
+    report = pd.DataFrame({
+        'legacy_dtype': legacy.dtypes.astype(str),
+        'legacy_bytes': legacy.memory_usage(index=False, deep=True),
+        'compact_dtype': compact.dtypes.astype(str),
+        'compact_bytes': compact.memory_usage(index=False, deep=True),
+    })
+    report.loc['total'] = [
+        '', report['legacy_bytes'].sum(), '', report['compact_bytes'].sum()]
+    report['ratio'] = report['compact_bytes'] / report['legacy_bytes']
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="compares the memory of a stored table in the former and the compact layout")
+    parser.add_argument('path', help="e.g. NflDataLoader/database/2018/2018_REG.parquet")
+    args = parser.parse_args()
+    path = Path(args.path)
+    table = get_store(path.suffix.lstrip('.')).read(path.with_suffix(''))
+    with pd.option_context('display.max_rows', None):
+        print(memory_report(table))
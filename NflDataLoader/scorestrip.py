@@ -0,0 +1,104 @@
+# scorestrip.py
+"""parsers of the nfl.com scorestrip xml,
+ScheduleLoader uses parse_games, parse_scorestrips is the columnar reference
+which the tests and benchmarks/bench_scorestrip.py compare parse_games with
+"""
+from datetime import date
+from typing import Iterable, Tuple
+from xml.parsers import expat
+
+import numpy as np
+import pandas as pd
+
+# columns of a parsed schedule, one row per game
+SCHEDULE_COLUMNS = ('eid', 'home', 'away', 'gamekey', 'season', 'seasonType', 'week',
+                    'date', 'finished')
+# keys of the game dicts of NflHandler.get_games
+GAME_KEYS = ('eid', 'home', 'away', 'gamekey', 'week', 'season', 'seasonType', 'finished')
+# the attributes of a <g> element and their columns
+GAME_ATTRIBUTES = (('eid', 'eid'), ('h', 'home'), ('v', 'away'), ('gsis', 'gamekey'))
+
+
+class _ScorestripReader():
+    """collects the games of scorestrip documents into column lists"""
+    def __init__(self):
+        self.columns = {column: [] for _, column in GAME_ATTRIBUTES}
+        self._appends = [(attribute, self.columns[column].append)
+                         for attribute, column in GAME_ATTRIBUTES]
+
+    def read(self, content: bytes) -> int:
+        """parses one document, returns its number of games"""
+        n_games = len(self.columns['eid'])
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = self.__start_element
+        parser.Parse(content, True)
+        return len(self.columns['eid']) - n_games
+
+    def __start_element(self, name, attrs):
+        if name == 'g':
+            for attribute, append in self._appends:
+                append(attrs[attribute])
+
+
+def _to_days(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    months = ((years - 1970) * 12 + months - 1).astype('datetime64[M]')
+    return months.astype('datetime64[D]') + (days - 1).astype('timedelta64[D]')
+
+
+def parse_scorestrips(documents: Iterable[Tuple[int, str, int, bytes]],
+                      today: date = None) -> pd.DataFrame:
+    """parses the raw scorestrips of many weeks at once,
+    documents are (season, seasontype, week, content) tuples,
+    returns one row per game with the SCHEDULE_COLUMNS,
+    finished is True like in NflHandler if the game's month and day
+    in the year of the season are before today,
+    not used by the loaders (see the module docstring)
+    """
+    reader = _ScorestripReader()
+    seasons, seasontypes, weeks = [], [], []
+    for season, seasontype, week, content in documents:
+        n_games = reader.read(content)
+        seasons += [season] * n_games
+        seasontypes += [seasontype] * n_games
+        weeks += [week] * n_games
+    eids = reader.columns['eid']
+    # yyyymmdd of the eids
+    codes = np.array([int(eid[:8]) for eid in eids], dtype=np.int64)
+    months = codes // 100 % 100
+    days = codes % 100
+    seasons = np.array(seasons, dtype=np.int64)
+    today = np.datetime64(today or date.today(), 'D')
+    columns = dict(reader.columns, season=seasons, seasonType=seasontypes, week=weeks,
+                   date=_to_days(codes // 10000, months, days),
+                   finished=_to_days(seasons, months, days) < today)
+    return pd.DataFrame({column: columns[column] for column in SCHEDULE_COLUMNS})
+
+
+def parse_games(documents: Iterable[Tuple[int, str, int, bytes]],
+                today: date = None) -> list:
+    """like to_games(parse_scorestrips(documents)), but builds the dicts of
+    NflHandler.get_games while parsing, without the numpy and DataFrame overhead
+    which outweighs the batch for the few weeks ScheduleLoader parses at once
+    """
+    today = today or date.today()
+    today = (today.year, today.month, today.day)
+    games = []
+    append = games.append
+    for season, seasontype, week, content in documents:
+        def start_element(name, attrs, season=season, seasontype=seasontype, week=week):
+            if name == 'g':
+                eid = attrs['eid']
+                append({'eid': eid, 'home': attrs['h'], 'away': attrs['v'],
+                        'gamekey': attrs['gsis'], 'week': week, 'season': season,
+                        'seasonType': seasontype,
+                        'finished': (season, int(eid[4:6]), int(eid[6:8])) < today})
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = start_element
+        parser.Parse(content, True)
+    return games
+
+
+def to_games(schedule: pd.DataFrame) -> list:
+    """returns the games of a parsed schedule as the dicts of NflHandler.get_games"""
+    rows = zip(*(schedule[key].tolist() for key in GAME_KEYS))
+    return [dict(zip(GAME_KEYS, row)) for row in rows]
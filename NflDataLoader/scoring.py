@@ -0,0 +1,115 @@
+# scoring.py
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFENSE_POSITIONS = ('NT', 'DB', 'DT', 'LB', 'DE', 'CB', 'SAF')
+# lower bounds of the points allowed brackets and the points of each bracket,
+# 0 -> 10, 1-6 -> 7, 7-13 -> 4, 14-20 -> 1, 21-27 -> 0, 28-34 -> -1, 35+ -> -4
+PTS_ALLWD_BINS = (1, 7, 14, 21, 28, 35)
+PTS_ALLWD_POINTS = (10, 7, 4, 1, 0, -1, -4)
+
+# a ruleset is plain data:
+# weights: points per unit of a stat column (missing columns count as 0)
+# fieldgoals: points per made fieldgoal, bracketed by the fieldgoal yards
+# points_allowed: points of the team defense, split among its defensive players
+STANDARD = {
+    'name': 'standard',
+    'weights': {
+        'pass_yds': 1 / 25, 'pass_tds': 4, 'pass_ints': -2, 'pass_twoptm': 2,
+        'rush_yds': 1 / 10, 'rush_tds': 6, 'rush_twoptm': 2,
+        'recv_yds': 1 / 10, 'recv_tds': 6, 'recv_twoptm': 2,
+        'rcv': 2, 'trcv': 2, 'lost': -2,
+        'k_xpmade': 1, 'pret_tds': 6, 'kret_tds': 6,
+        'sk': 1, 'int': 2,
+    },
+    'fieldgoals': {
+        'made': 'k_fgm', 'distance': 'k_fgyds', 'bins': (50,), 'points': (3, 5),
+    },
+    'points_allowed': {
+        'column': 'pts_allwd', 'positions': DEFENSE_POSITIONS,
+        'bins': PTS_ALLWD_BINS, 'points': PTS_ALLWD_POINTS,
+    },
+}
+
+
+def derive_ruleset(base: dict, name: str, **weights) -> dict:
+    """returns a copy of the base ruleset with the given name and changed weights"""
+    ruleset = dict(base)
+    ruleset['name'] = name
+    ruleset['weights'] = dict(base['weights'], **weights)
+    return ruleset
+
+
+HALF_PPR = derive_ruleset(STANDARD, 'half_ppr', recv_rec=0.5)
+PPR = derive_ruleset(STANDARD, 'ppr', recv_rec=1)
+# simplified scoring without returns, defense and fieldgoal bonus
+BASIC = {
+    'name': 'basic',
+    'weights': {
+        'pass_yds': 1 / 25, 'pass_tds': 4, 'pass_ints': -2, 'pass_twoptm': 2,
+        'rush_yds': 1 / 10, 'rush_tds': 6, 'rush_twoptm': 2,
+        'recv_yds': 1 / 10, 'recv_tds': 6, 'recv_twoptm': 2,
+        'rcv': 2, 'trcv': 2, 'lost': -2, 'k_fgm': 3,
+    },
+}
+
+RULESETS = {ruleset['name']: ruleset for ruleset in (STANDARD, HALF_PPR, PPR, BASIC)}
+DEFAULT_RULESETS = ('standard', 'half_ppr', 'ppr')
+
+
+def _column(table: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in table.columns:
+        return np.zeros(len(table), dtype=np.float64)
+    return table[name].to_numpy(dtype=np.float64)
+
+
+def _get_rulesets(rulesets: Sequence) -> list:
+    return [RULESETS[ruleset] if isinstance(ruleset, str) else ruleset
+            for ruleset in rulesets]
+
+
+def score_table(table: pd.DataFrame, rulesets: Sequence = DEFAULT_RULESETS) -> pd.DataFrame:
+    """calculates the fantasypoints of all given rulesets (names or dicts),
+    returns a DataFrame with a fpts_<ruleset> column per ruleset
+    """
+    rulesets = _get_rulesets(rulesets)
+    stats = sorted(set().union(*(ruleset['weights'] for ruleset in rulesets)))
+    weights = np.array([[ruleset['weights'].get(stat, 0) for ruleset in rulesets]
+                        for stat in stats], dtype=np.float64).reshape(len(stats), len(rulesets))
+    block = np.column_stack([_column(table, stat) for stat in stats]) if stats \
+        else np.zeros((len(table), 0))
+    points = block @ weights
+    for i, ruleset in enumerate(rulesets):
+        fieldgoals = ruleset.get('fieldgoals')
+        if fieldgoals:
+            bracket = np.digitize(_column(table, fieldgoals['distance']), fieldgoals['bins'])
+            fgpoints = np.asarray(fieldgoals['points'], dtype=np.float64)[bracket]
+            points[:, i] += _column(table, fieldgoals['made']) * fgpoints
+        allowed = ruleset.get('points_allowed')
+        if allowed and 'position' in table.columns:
+            is_defense = table['position'].isin(allowed['positions']).to_numpy()
+            n_defplayer = np.count_nonzero(is_defense)
+            if n_defplayer:
+                bracket = np.digitize(np.trunc(_column(table, allowed['column'])),
+                                      allowed['bins'])
+                def_pts = np.asarray(allowed['points'], dtype=np.float64)[bracket]
+                points[:, i] += np.where(is_defense, def_pts / n_defplayer, 0.0)
+    columns = [f"fpts_{ruleset['name']}" for ruleset in rulesets]
+    return pd.DataFrame(points, index=table.index, columns=columns)
+
+
+def add_fpts_columns(table: pd.DataFrame, rulesets: Sequence = DEFAULT_RULESETS) -> pd.DataFrame:
+    """adds a fpts_<ruleset> column for every given ruleset to the table"""
+    points = score_table(table, rulesets)
+    for column in points.columns:
+        table[column] = points[column]
+    return table
+
+
+def standard_fpts(table: pd.DataFrame) -> np.ndarray:
+    """calculates the standard fantasypoints for all rows of the given table,
+    returns an array aligned with the rows of the table
+    """
+    return score_table(table, (STANDARD,))['fpts_standard'].to_numpy()
@@ -0,0 +1,226 @@
+# serialization.py
+import json
+import os
+import pickle
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# first line of a cached file: magic, codec, compression and crc32 of the payload
+MAGIC = b'#nflcache'
+HEADER_FORMAT = '#nflcache {codec} {compression} {checksum:08x}\n'
+
+
+class CorruptFileError(ValueError):
+    """a cached file which is truncated or doesn't match its checksum"""
+
+
+class Codec():
+    """turns objects into bytes and back"""
+    name = ''
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """stdlib json with sorted keys, indent for human readable files"""
+    name = 'json'
+
+    def __init__(self, indent: int = None):
+        self.indent = indent
+
+    def dumps(self, obj) -> bytes:
+        separators = None if self.indent else (',', ':')
+        return json.dumps(obj, sort_keys=True, indent=self.indent,
+                          separators=separators).encode()
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    """json with orjson, the files are readable by JsonCodec and vice versa"""
+    name = 'orjson'
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+    def loads(self, data: bytes):
+        return orjson.loads(data)
+
+
+class PickleCodec(Codec):
+    """binary pickle, loading a pickle runs code of whoever wrote it, so pickled
+    files are only read by a Serializer which was configured with this codec
+    and the cache directory must only be writable by trusted users
+    """
+    name = 'pickle'
+
+    def dumps(self, obj) -> bytes:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes):
+        return pickle.loads(data)
+
+
+CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+    'pickle': PickleCodec,
+}
+# (compress, decompress) by name
+COMPRESSIONS = {
+    'none': (lambda data: data, lambda data: data),
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+if zstandard is not None:
+    COMPRESSIONS['zstd'] = (lambda data: zstandard.ZstdCompressor().compress(data),
+                            lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+def get_codec(name: str = 'json') -> Codec:
+    """returns the codec for the given name ('json', 'orjson', 'pickle')"""
+    try:
+        codec = CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec {name}, choose from {list(CODECS)}")
+    if codec is OrjsonCodec and orjson is None:
+        raise ImportError("The orjson codec needs orjson")
+    return codec()
+
+
+class Serializer():
+    """Writes objects with a codec, an optional compression and a checksum header,
+    reads files of every codec and compression and legacy files of plain json.
+    Pickled files are only read with the pickle codec, for the others they are corrupt.
+    """
+    def __init__(self, codec: str = 'json', compression: str = None):
+        """
+        codec str: 'json' (default), 'orjson' or 'pickle' (trusted caches only)
+        compression str: None (default), 'zlib' or 'zstd' (needs zstandard)
+        """
+        self.codec = get_codec(codec)
+        self.compression = compression or 'none'
+        if self.compression not in COMPRESSIONS:
+            if self.compression == 'zstd':
+                raise ImportError("The zstd compression needs zstandard")
+            raise ValueError(
+                f"Unknown compression {compression}, choose from {list(COMPRESSIONS)}")
+
+
+    def dumps(self, obj) -> bytes:
+        payload = COMPRESSIONS[self.compression][0](self.codec.dumps(obj))
+        header = HEADER_FORMAT.format(codec=self.codec.name, compression=self.compression,
+                                      checksum=zlib.crc32(payload))
+        return header.encode() + payload
+
+
+    def loads(self, data: bytes):
+        """raises CorruptFileError if data is truncated or doesn't match its checksum"""
+        return self.loads_sized(data)[0]
+
+
+    def loads_sized(self, data: bytes) -> tuple:
+        """like loads, returns (obj, size of the decompressed payload in bytes)"""
+        if not data.startswith(MAGIC):
+            try:
+                return json.loads(data), len(data)
+            except ValueError as err:
+                raise CorruptFileError(f"invalid json: {err}") from err
+        header, _, payload = data.partition(b'\n')
+        try:
+            _, codec, compression, checksum = header.decode().split(' ')
+            checksum = int(checksum, 16)
+        except ValueError:
+            raise CorruptFileError(f"invalid header {header[:60]!r}")
+        if zlib.crc32(payload) != checksum:
+            raise CorruptFileError("checksum mismatch")
+        # the checksum doesn't cover the header, a damaged codec or compression
+        # name is a corrupt file as well
+        if compression not in COMPRESSIONS:
+            if compression == 'zstd':
+                raise ImportError("Reading zstd compressed files needs zstandard")
+            raise CorruptFileError(f"unknown compression {compression!r}")
+        # the header alone must never pick pickle, whoever can write the cache
+        # could run code with it
+        if codec == PickleCodec.name and self.codec.name != PickleCodec.name:
+            raise CorruptFileError("pickled files are only read with the pickle codec")
+        try:
+            codec = get_codec(codec)
+        except ValueError as err:
+            raise CorruptFileError(str(err)) from err
+        payload = COMPRESSIONS[compression][1](payload)
+        return codec.loads(payload), len(payload)
+
+
+    def write(self, obj, path: Path):
+        """writes obj atomically, readers see the old or the new file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as outfile:
+                outfile.write(self.dumps(obj))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+    def read(self, path: Path):
+        with open(path, 'rb') as infile:
+            return self.loads(infile.read())
+
+
+_serializer = Serializer()
+_serializer_lock = threading.Lock()
+
+
+def get_serializer() -> Serializer:
+    """returns the serializer of all cached artifacts"""
+    return _serializer
+
+
+def configure(codec: str = 'json', compression: str = None) -> Serializer:
+    """replaces the serializer of all cached artifacts, files of the former
+    settings stay readable
+    """
+    global _serializer
+    with _serializer_lock:
+        _serializer = Serializer(codec, compression)
+        return _serializer
+
+
+def dumps(obj) -> bytes:
+    return get_serializer().dumps(obj)
+
+
+def loads(data: bytes):
+    return get_serializer().loads(data)
+
+
+def loads_sized(data: bytes) -> tuple:
+    return get_serializer().loads_sized(data)
+
+
+def write(obj, path: Path):
+    get_serializer().write(obj, path)
+
+
+def read(path: Path):
+    return get_serializer().read(path)
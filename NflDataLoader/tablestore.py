@@ -0,0 +1,320 @@
+# tablestore.py
+import argparse
+import warnings
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+DEFAULT_FORMAT = 'parquet' if pyarrow is not None else 'csv'
+# text columns of the player infos, fillna writes 0 where a player has no infos
+MIXED_COLUMNS = ('player_id', 'name', 'position', 'college', 'esb_id', 'team', 'birthdate')
+
+
+class TableStore():
+    """Reads and writes tables under a path without suffix (e.g. .../2019/REG/CAR/1),
+    the format specific stores add their suffix.
+    """
+    suffix = ''
+
+    def __init__(self, migrate: bool = True, strict: bool = False):
+        """
+        migrate bool: if True a legacy csv table is converted on the first read
+        strict bool: if True a mixed type column outside of MIXED_COLUMNS raises
+            a ValueError instead of a warning (columnar formats only)
+        """
+        self.migrate = migrate
+        self.strict = strict
+
+
+    def get_path(self, stem: Path) -> Path:
+        return Path(f"{stem}{self.suffix}")
+
+
+    def exists(self, stem: Path) -> bool:
+        if self.get_path(stem).exists():
+            return True
+        return self.migrate and CsvStore.suffix != self.suffix \
+            and Path(f"{stem}{CsvStore.suffix}").exists()
+
+
+    def write(self, table: pd.DataFrame, stem: Path) -> Path:
+        path = self.get_path(stem)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(table, path)
+        return path
+
+
+    def read(self, stem: Path, columns: Sequence = None) -> pd.DataFrame:
+        """reads the table, columns restricts the result to the given columns"""
+        path = self.get_path(stem)
+        if not path.exists() and self.migrate:
+            legacy_path = Path(f"{stem}{CsvStore.suffix}")
+            if legacy_path != path and legacy_path.exists():
+                self.write(CsvStore().read(stem), stem)
+        return self._read(path, columns)
+
+
+    def write_concat(self, stems: Sequence[Path], stem: Path) -> Path:
+        """writes the stored tables of stems one after another into one table,
+        like pd.concat(ignore_index=True, sort=False) but only one part is held in memory
+        """
+        raise NotImplementedError
+
+
+    def _migrated_path(self, stem: Path) -> Path:
+        path = self.get_path(stem)
+        if not path.exists() and self.exists(stem):
+            self.write(CsvStore().read(stem), stem)
+        return path
+
+
+    def _write(self, table: pd.DataFrame, path: Path):
+        raise NotImplementedError
+
+
+    def _read(self, path: Path, columns: Sequence = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class CsvStore(TableStore):
+    suffix = '.csv'
+
+    def write_concat(self, stems, stem):
+        paths = [self.get_path(part) for part in stems]
+        columns = []
+        for part in paths:
+            header = pd.read_csv(part, index_col=0, nrows=0).columns
+            columns += [column for column in header if column not in columns]
+        path = self.get_path(stem)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        offset = 0
+        for i, part in enumerate(paths):
+            table = pd.read_csv(part, index_col=0).reindex(columns=columns)
+            table.index = pd.RangeIndex(offset, offset + len(table))
+            table.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0)
+            offset += len(table)
+        return path
+
+
+    def _write(self, table, path):
+        table.to_csv(path)
+
+
+    def _read(self, path, columns=None):
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            # the first, unnamed column is the index
+            usecols = lambda column: column in wanted or column.startswith('Unnamed: 0')
+        table = pd.read_csv(path, index_col=0, usecols=usecols)
+        if 'date' in table.columns:
+            table['date'] = pd.to_datetime(table['date'], errors='coerce')
+        return table
+
+
+def _prepare_for_arrow(table: pd.DataFrame, strict: bool = False) -> pd.DataFrame:
+    """arrow needs one type per column, object columns with mixed types
+    (e.g. strings filled with 0 by fillna) are stored as strings,
+    other columns than MIXED_COLUMNS warn or with strict raise a ValueError
+    """
+    mixed = [column for column in table.columns
+             if table[column].dtype == object
+             and pd.api.types.infer_dtype(table[column], skipna=True).startswith('mixed')]
+    if not mixed:
+        return table
+    unknown = [column for column in mixed if column not in MIXED_COLUMNS]
+    if unknown:
+        message = f"Columns {unknown} have mixed types and are stored as strings"
+        if strict:
+            raise ValueError(message)
+        warnings.warn(message, stacklevel=3)
+    table = table.copy()
+    for column in mixed:
+        table[column] = table[column].astype(str)
+    return table
+
+
+def _unify_types(types: list):
+    types = [dtype for dtype in types if not pyarrow.types.is_null(dtype)]
+    if not types:
+        return pyarrow.null()
+    if all(dtype == types[0] for dtype in types):
+        return types[0]
+    if all(pyarrow.types.is_dictionary(dtype) for dtype in types):
+        # categoricals of the compact schema with different index widths
+        return pyarrow.dictionary(pyarrow.int32(), _unify_types([t.value_type for t in types]))
+    for is_type in (pyarrow.types.is_signed_integer, pyarrow.types.is_floating):
+        if all(is_type(dtype) for dtype in types):
+            return max(types, key=lambda dtype: dtype.bit_width)
+    numeric = (pyarrow.types.is_integer, pyarrow.types.is_floating, pyarrow.types.is_boolean)
+    if all(any(is_type(dtype) for is_type in numeric) for dtype in types):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def _unify_schemas(schemas: list):
+    """union of the fields in order of their first appearance,
+    conflicting types are promoted to the widest integer or float, float64 (mixed numbers)
+    or string
+    """
+    names, types = [], {}
+    for schema in schemas:
+        for field in schema:
+            if field.name.startswith('__index_level_'):
+                continue
+            if field.name not in types:
+                names.append(field.name)
+                types[field.name] = []
+            types[field.name].append(field.type)
+    return pyarrow.schema([(name, _unify_types(types[name])) for name in names])
+
+
+def _conform(table, schema):
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            column = table.column(field.name)
+            arrays.append(column if column.type == field.type else column.cast(field.type))
+        else:
+            arrays.append(pyarrow.nulls(table.num_rows, field.type))
+    return pyarrow.Table.from_arrays(arrays, schema=schema)
+
+
+class ArrowStore(TableStore):
+    """base for the stores based on arrow files, which can be written in parts"""
+
+    def write_concat(self, stems, stem):
+        paths = [self._migrated_path(part) for part in stems]
+        schema = self._writer_schema(_unify_schemas([self._read_schema(part) for part in paths]))
+        path = self.get_path(stem)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._open_writer(path, schema) as writer:
+            for part in paths:
+                writer.write_table(_conform(self._read_arrow(part), schema))
+        return path
+
+
+    def _writer_schema(self, schema):
+        return schema
+
+
+    def _read_schema(self, path: Path):
+        raise NotImplementedError
+
+
+    def _read_arrow(self, path: Path):
+        raise NotImplementedError
+
+
+    def _open_writer(self, path: Path, schema):
+        raise NotImplementedError
+
+
+class ParquetStore(ArrowStore):
+    suffix = '.parquet'
+
+    def _read_schema(self, path):
+        return pyarrow.parquet.read_schema(path)
+
+
+    def _read_arrow(self, path):
+        return pyarrow.parquet.read_table(path)
+
+
+    def _open_writer(self, path, schema):
+        return pyarrow.parquet.ParquetWriter(path, schema)
+
+    def _write(self, table, path):
+        _prepare_for_arrow(table, self.strict).to_parquet(path)
+
+
+    def _read(self, path, columns=None):
+        return pd.read_parquet(path, columns=None if columns is None else list(columns))
+
+
+class FeatherStore(ArrowStore):
+    suffix = '.feather'
+
+    def _writer_schema(self, schema):
+        # an ipc file holds one dictionary per column, so the categoricals of
+        # the parts are stored as their values
+        return pyarrow.schema([
+            (field.name, field.type.value_type)
+            if pyarrow.types.is_dictionary(field.type) else field
+            for field in schema])
+
+
+    def _read_schema(self, path):
+        with pyarrow.memory_map(str(path)) as source:
+            return pyarrow.ipc.open_file(source).schema
+
+
+    def _read_arrow(self, path):
+        return pyarrow.feather.read_table(path)
+
+
+    def _open_writer(self, path, schema):
+        return pyarrow.ipc.new_file(str(path), schema)
+
+    def _write(self, table, path):
+        # feather only supports the default index
+        _prepare_for_arrow(table, self.strict).reset_index(drop=True).to_feather(path)
+
+
+    def _read(self, path, columns=None):
+        return pd.read_feather(path, columns=None if columns is None else list(columns))
+
+
+STORES = {
+    'csv': CsvStore,
+    'parquet': ParquetStore,
+    'feather': FeatherStore,
+}
+
+
+def get_store(fmt: str = DEFAULT_FORMAT, **kwargs) -> TableStore:
+    """returns the table store for the given format ('csv', 'parquet', 'feather')"""
+    try:
+        store = STORES[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown table format {fmt}, choose from {list(STORES)}")
+    if store is not CsvStore and pyarrow is None:
+        raise ImportError(f"The {fmt} table format needs pyarrow")
+    return store(**kwargs)
+
+
+def migrate_csv_cache(root: Path, fmt: str = DEFAULT_FORMAT, remove: bool = False) -> list:
+    """converts all csv tables below root into the given format,
+    returns the list of converted tables
+    """
+    store = get_store(fmt)
+    converted = []
+    if isinstance(store, CsvStore):
+        return converted
+    for csv_path in sorted(Path(root).rglob(f"*{CsvStore.suffix}")):
+        stem = csv_path.with_suffix('')
+        if not store.get_path(stem).exists():
+            store.write(CsvStore().read(stem), stem)
+            converted.append(store.get_path(stem))
+        if remove:
+            csv_path.unlink()
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="converts a csv table cache")
+    parser.add_argument('root', nargs='?', default='NflDataLoader/database')
+    parser.add_argument('--format', default=DEFAULT_FORMAT, choices=list(STORES))
+    parser.add_argument('--remove', action='store_true', help="delete the csv files")
+    args = parser.parse_args()
+    tables = migrate_csv_cache(Path(args.root), args.format, args.remove)
+    print(f"converted {len(tables)} tables")
@@ -0,0 +1,230 @@
+"""times every stage of the pipeline on the synthetic fixtures of benchmarks.fixtures
+at several scales and stores the results as json, so commits can be compared;
+the stages run the code of NflLoader, ScheduleLoader, PlayerDataLoader, roster and
+active_players against the recorded responses (replay.ReplayAdapter, no network)
+in an empty database, the spans of the instrumentation split them up further
+
+python -m benchmarks.bench_pipeline [--scales small medium] [--repeat 3]
+                                    [--output benchmarks/results] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from NflDataLoader import httpclient, instrument, scheduler
+from NflDataLoader.active_players import get_depth_info
+from NflDataLoader.cache import GAME_CACHE
+from NflDataLoader.dataloader import NflLoader
+from NflDataLoader.playerdataloader import PlayerDataLoader
+from NflDataLoader.replay import replay
+from NflDataLoader.roster import TEAMS, download_rosters
+from NflDataLoader.scheduleloader import ScheduleLoader
+from NflDataLoader.tablestore import DEFAULT_FORMAT
+from benchmarks import fixtures
+
+# weeks of game data and teams of roster and depth chart pages per scale
+SCALES = {
+    'small': {'weeks': 1, 'teams': 2},
+    'medium': {'weeks': 4, 'teams': 8},
+    'large': {'weeks': 17, 'teams': 32},
+}
+SEASON = 2019
+RESULTS_PATH = Path('benchmarks/results')
+PLAYERS_PATH = Path('NflDataLoader/database/nflplayers.db')
+
+
+def best_of(func, repeat: int) -> tuple:
+    """returns the best time of repeat runs and the spans of that run"""
+    best = None
+    for _ in range(repeat):
+        instrument.RECORDER.reset()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            spans = instrument.RECORDER.as_dict()['spans']
+            best = (elapsed, {name: span['seconds'] for name, span in spans.items()})
+    return best
+
+
+class Pipeline():
+    """the recorded responses of one scale, every stage works on the results of
+    the former ones like a first run of NflLoader does, the working directory
+    has to be the temporary database directory
+    """
+    def __init__(self, weeks: int, teams: int):
+        self.weeks = list(range(1, weeks + 1))
+        self.teams = TEAMS[:teams]
+        fixtures.write_cassettes('cassettes', SEASON, self.weeks, teams=self.teams)
+        games = [game for week in self.weeks
+                 for game in fixtures.schedule_games(SEASON, 'REG', week)]
+        self.eids = [eid for eid, _, _ in games]
+        self.player_ids = list(dict.fromkeys(
+            player_id for eid, home, away in games
+            for game in fixtures.gamecenter_json(eid, home, away).values()
+            for place in ('home', 'away')
+            for category, players in game[place]['stats'].items() if category != 'team'
+            for player_id in players))
+
+
+    def schedule_update(self) -> int:
+        """downloads and parses the scorestrips of the season"""
+        loader = ScheduleLoader(SEASON, update=False)
+        return len(loader.update_schedule(force=True))
+
+
+    def gamestats(self) -> int:
+        """NflLoader.get_game_stats of all games, the first run downloads them,
+        the others read the stored files
+        """
+        GAME_CACHE.clear()
+        loader = NflLoader(SEASON)
+        return sum(loader.get_game_stats(eid) is not None for eid in self.eids)
+
+
+    def player_resolve(self) -> int:
+        """downloads the profiles of all players of the games into an empty database"""
+        PLAYERS_PATH.unlink(missing_ok=True)
+        loader = PlayerDataLoader(path=str(PLAYERS_PATH))
+        resolved = loader.resolve_player_infos(self.player_ids)
+        loader.db.engine.dispose()
+        return len(resolved)
+
+
+    def __week_tables(self, preload: bool) -> int:
+        GAME_CACHE.clear()
+        loader = NflLoader(SEASON, new=True, save=False, preload=preload)
+        rows = sum(len(loader.get_weektable(week)) for week in self.weeks)
+        loader.player_loader.db.engine.dispose()
+        return rows
+
+
+    def week_tables(self) -> int:
+        """the weektables with the player infos of the database"""
+        return self.__week_tables(preload=False)
+
+
+    def week_tables_preload(self) -> int:
+        return self.__week_tables(preload=True)
+
+
+    def season_build(self) -> int:
+        """stores the weektables and streams them into the seasontable"""
+        GAME_CACHE.clear()
+        loader = NflLoader(SEASON, new=True, preload=True)
+        path = loader.write_seasontable()
+        loader.player_loader.db.engine.dispose()
+        return len(loader.store.read(path.with_suffix('')))
+
+
+    def roster_download(self) -> int:
+        rosters = download_rosters(self.teams)
+        return sum(len(roster) for roster in rosters.values())
+
+
+    def depth_chart(self) -> int:
+        return sum(len(get_depth_info(team)) for team in self.teams)
+
+
+# stages in pipeline order, each one needs the results of the former ones
+STAGES = (
+    'schedule_update', 'gamestats', 'player_resolve', 'week_tables', 'week_tables_preload',
+    'season_build', 'roster_download', 'depth_chart',
+)
+
+
+def run_scale(scale: str, repeat: int) -> dict:
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            pipeline = Pipeline(**SCALES[scale])
+            replay('cassettes', httpclient.configure(backoff=0))
+            # the replay has no rate limit of its own
+            scheduler.configure(default_rate=(1000, 1000), rates={'nfl.com': (1000, 1000)})
+            instrument.enable()
+            for stage in STAGES:
+                func = getattr(pipeline, stage)
+                # the first run warms up and prepares the input of the next stage,
+                # the stages can be repeated on their own results
+                items = func()
+                seconds, spans = best_of(func, repeat)
+                results[stage] = {'seconds': seconds, 'items': items, 'spans': spans}
+        finally:
+            instrument.disable()
+            instrument.RECORDER.reset()
+            httpclient.configure()
+            scheduler.configure()
+            os.chdir(cwd)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, baseline: dict):
+    print(f"{'scale':8} {'stage':20} {'baseline s':>11} {'current s':>11} {'ratio':>7}")
+    for scale, stages in results['results'].items():
+        for stage, result in stages.items():
+            old = baseline['results'].get(scale, {}).get(stage)
+            if old is None:
+                continue
+            ratio = result['seconds'] / old['seconds'] if old['seconds'] else np.nan
+            print(f"{scale:8} {stage:20} {old['seconds']:11.4f} {result['seconds']:11.4f} "
+                  f"{ratio:7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="times the pipeline on synthetic fixtures")
+    parser.add_argument('--scales', nargs='+', default=list(SCALES), choices=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=RESULTS_PATH)
+    parser.add_argument('--compare', type=Path, help="results json of an older commit")
+    args = parser.parse_args()
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'storage': DEFAULT_FORMAT,
+        'results': {},
+    }
+    print(f"{'scale':8} {'stage':20} {'seconds':>10} {'items':>8}")
+    for scale in args.scales:
+        results['results'][scale] = run_scale(scale, args.repeat)
+        for stage, result in results['results'][scale].items():
+            print(f"{scale:8} {stage:20} {result['seconds']:10.4f} {result['items']:8}")
+            for name, seconds in result['spans'].items():
+                if not name.startswith('http.'):
+                    print(f"{'':8}   {name:40} {seconds:10.4f}")
+    args.output.mkdir(parents=True, exist_ok=True)
+    path = args.output / f'{commit}.json'
+    with open(path, 'w') as jfile:
+        json.dump(results, jfile, indent=4)
+    print(f"results saved to {path}")
+    if args.compare is not None:
+        with open(args.compare, 'r') as jfile:
+            compare(results, json.load(jfile))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
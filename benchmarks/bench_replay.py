@@ -0,0 +1,89 @@
+"""runs NflLoader against a local replay.ReplayServer serving the synthetic fixtures,
+so the network path (connection pool, scheduler, retries, prefetch) can be load
+tested without nfl.com
+
+python -m benchmarks.bench_replay [--weeks 2] [--workers 1 8] [--latency 0.02]
+                                  [--error-rate 0.05] [--cassettes dir]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from NflDataLoader import httpclient, scheduler
+from NflDataLoader.cache import GAME_CACHE
+from NflDataLoader.dataloader import NflLoader
+from NflDataLoader.gamecenter import GAMECENTER_URL, fetch_games
+from NflDataLoader.replay import CassetteStore, ReplayServer
+from benchmarks import fixtures
+
+SEASON = 2019
+# the replay server has no rate limit of its own
+REPLAY_RATES = {'nfl.com': (1000, 1000)}
+
+
+def run_loader(server: ReplayServer, weeks: list, workers: int) -> float:
+    """builds the week tables in an empty database, returns the seconds"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            Path('NflDataLoader/database').mkdir(parents=True)
+            GAME_CACHE.clear()
+            server.install(httpclient.configure(backoff=0.01))
+            scheduler.configure(workers=max(8, workers), rates=REPLAY_RATES)
+            start = time.perf_counter()
+            loader = NflLoader(SEASON, workers=workers, preload=True)
+            for week in weeks:
+                loader.get_weektable(week)
+            return time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+
+def run_prefetch(server: ReplayServer, weeks: list, concurrency: int) -> float:
+    """downloads the gtd.json of the weeks with gamecenter.fetch_games"""
+    eids = [eid for week in weeks for eid, _, _ in fixtures.schedule_games(SEASON, 'REG', week)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start = time.perf_counter()
+        results = asyncio.run(fetch_games(
+            eids, tmpdir, url=server.rewrite(GAMECENTER_URL), concurrency=concurrency,
+            backoff=0.01))
+        elapsed = time.perf_counter() - start
+    print(f"  prefetch concurrency {concurrency:>2}: {elapsed:.3f}s "
+          f"({sum(results.values())}/{len(results)} games)")
+    return elapsed
+
+
+def main(args):
+    weeks = list(range(1, args.weeks + 1))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        directory = Path(args.cassettes or tmpdir)
+        if not args.cassettes or not any(directory.glob('*.json')):
+            recorded = fixtures.write_cassettes(directory, SEASON, weeks)
+            print(f"recorded {recorded} responses into {directory}")
+        store = CassetteStore(directory)
+        with ReplayServer(store, latency=args.latency, error_rate=args.error_rate,
+                          seed=args.seed) as server:
+            print(f"replaying on {server.url}, latency {args.latency}s, "
+                  f"error rate {args.error_rate}")
+            for workers in args.workers:
+                elapsed = run_loader(server, weeks, workers)
+                print(f"  NflLoader workers {workers:>2}: {elapsed:.3f}s for {len(weeks)} weeks")
+            for workers in args.workers:
+                run_prefetch(server, weeks, workers)
+    httpclient.configure()
+    scheduler.configure()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--weeks', type=int, default=2)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds per request")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cassettes', help="directory of recorded responses to replay")
+    main(parser.parse_args())
@@ -0,0 +1,75 @@
+"""compares parsing scorestrips with a SAX parser and NflHandler per week, like
+ScheduleLoader did, with the batched expat reader of NflDataLoader.scorestrip,
+all timings end with the game dicts ScheduleLoader stores, except the columnar
+DataFrame on its own; one week is the path of ScheduleLoader.get_schedule
+
+python -m benchmarks.bench_scorestrip [seasons]
+"""
+import io
+import sys
+import time
+from xml.sax import make_parser
+
+from NflDataLoader.NFLHandler import NflHandler
+from NflDataLoader.scorestrip import parse_games, parse_scorestrips, to_games
+from benchmarks import fixtures
+
+
+def create_documents(seasons: int) -> list:
+    """17 regular season weeks per season, starting with 2019 - seasons"""
+    return [(season, 'REG', week, fixtures.scorestrip_xml(season, 'REG', week).encode())
+            for season in range(2019 - seasons, 2019) for week in range(1, 18)]
+
+
+def sax_games(documents: list) -> list:
+    """the former path of ScheduleLoader.__load_schedule"""
+    games = []
+    for season, seasontype, week, content in documents:
+        schedule_file = io.StringIO(content.decode('UTF-8'))
+        parser = make_parser()
+        content_handler = NflHandler(season, seasontype, week)
+        parser.setContentHandler(content_handler)
+        parser.parse(schedule_file)
+        games += content_handler.get_games()
+    return games
+
+
+def timeit(func, *args, repeat: int = 5):
+    """returns the result and the best time of repeat runs"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def columnar_games(documents: list) -> list:
+    return to_games(parse_scorestrips(documents))
+
+
+def main(seasons: int = 20):
+    documents = create_documents(seasons)
+    sax_result, sax_time = timeit(sax_games, documents)
+    games, games_time = timeit(parse_games, documents)
+    columnar, columnar_time = timeit(columnar_games, documents)
+    schedule, frame_time = timeit(parse_scorestrips, documents)
+    assert games == sax_result and columnar == sax_result, "results differ"
+    week = documents[:1]
+    _, sax_week_time = timeit(sax_games, week, repeat=500)
+    _, games_week_time = timeit(parse_games, week, repeat=500)
+    print(f"weeks: {len(documents)}, games: {len(schedule)}")
+    print(f"sax + NflHandler:         {sax_time:10.4f} s")
+    print(f"expat to dicts:           {games_time:10.4f} s  "
+          f"{sax_time / games_time:5.1f} x  (ScheduleLoader)")
+    print(f"expat columnar + dicts:   {columnar_time:10.4f} s  "
+          f"{sax_time / columnar_time:5.1f} x")
+    print(f"expat columnar only:      {frame_time:10.4f} s  "
+          f"{sax_time / frame_time:5.1f} x  (DataFrame, no dicts)")
+    print(f"one week, sax:            {sax_week_time * 1000:10.4f} ms")
+    print(f"one week, expat to dicts: {games_week_time * 1000:10.4f} ms "
+          f"{sax_week_time / games_week_time:5.1f} x  (get_schedule)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
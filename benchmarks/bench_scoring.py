@@ -0,0 +1,101 @@
+"""compares the old row loop of NflLoader.add_standardfpts with the
+column-wise scoring in NflDataLoader.scoring
+
+python -m benchmarks.bench_scoring [rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from NflDataLoader.scoring import standard_fpts, score_table, DEFENSE_POSITIONS
+
+STAT_COLUMNS = (
+    'pass_yds', 'pass_tds', 'pass_ints', 'pass_twoptm',
+    'rush_yds', 'rush_tds', 'rush_twoptm',
+    'recv_yds', 'recv_tds', 'recv_twoptm',
+    'rcv', 'trcv', 'lost', 'k_fgyds', 'k_fgm', 'k_xpmade',
+    'pret_tds', 'kret_tds', 'sk', 'int', 'pts_allwd', 'recv_rec',
+)
+POSITIONS = DEFENSE_POSITIONS + ('QB', 'RB', 'WR', 'TE', 'K', 'P')
+
+
+def create_season_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        column: rng.integers(0, 60, size=rows).astype(np.float64)
+        for column in STAT_COLUMNS
+    })
+    frame['position'] = rng.choice(POSITIONS, size=rows)
+    return frame
+
+
+def rowwise_standardfpts(table: pd.DataFrame) -> np.ndarray:
+    """the former implementation of NflLoader.add_standardfpts"""
+    fpts = []
+    defense = list(DEFENSE_POSITIONS)
+    n_defplayer = len(table[table['position'].isin(defense)])
+    for i in table.index:
+        tab = table.loc[i]
+        pts = 0
+        pts += tab['pass_yds'] / 25 + tab['pass_tds'] * 4 - tab['pass_ints'] * 2
+        pts += tab['rush_yds'] / 10 + tab['rush_tds'] * 6
+        pts += tab['recv_yds'] / 10 + tab['recv_tds'] * 6
+        pts += (tab['pass_twoptm'] + tab['rush_twoptm'] + tab['recv_twoptm']) * 2
+        if 'rcv' in table.columns:
+            pts += (tab['rcv'] + tab['trcv'] - tab['lost']) * 2
+        if 'k_fgyds' in table.columns:
+            if tab['k_fgyds'] >= 50:
+                fgfactor = 5
+            else:
+                fgfactor = 3
+            pts += tab['k_fgm'] * fgfactor
+        if 'k_xpmade' in table.columns:
+            pts += tab['k_xpmade']
+        if 'pret_tds' in table.columns:
+            pts += tab['pret_tds'] * 6
+        if 'kret_tds' in table.columns:
+            pts += tab['kret_tds'] * 6
+        pts += tab['sk'] + tab['int'] * 2
+        if tab['position'] in defense:
+            pts_allwd = int(tab['pts_allwd'])
+            if pts_allwd == 0:
+                pts += 10 / n_defplayer
+            elif pts_allwd <= 6:
+                pts += 7 / n_defplayer
+            elif pts_allwd <= 13:
+                pts += 4 / n_defplayer
+            elif pts_allwd <= 20:
+                pts += 1 / n_defplayer
+            elif pts_allwd <= 27:
+                pts += 0
+            elif pts_allwd <= 34:
+                pts += -1 / n_defplayer
+            else:
+                pts += -4 / n_defplayer
+        fpts.append(pts)
+    return np.array(fpts)
+
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(rows: int = 100000):
+    frame = create_season_frame(rows)
+    loop_result, loop_time = timeit(rowwise_standardfpts, frame)
+    vec_result, vec_time = timeit(standard_fpts, frame)
+    assert np.allclose(loop_result, vec_result), "results differ"
+    print(f"rows: {rows}")
+    print(f"row loop:   {loop_time:10.4f} s")
+    print(f"vectorized: {vec_time:10.4f} s")
+    print(f"speedup:    {loop_time / vec_time:10.1f} x")
+    _, rulesets_time = timeit(score_table, frame)
+    print(f"standard, half_ppr and ppr in one pass: {rulesets_time:10.4f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,51 @@
+"""compares read and write throughput of the table stores
+
+python -m benchmarks.bench_storage [rows]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from NflDataLoader.tablestore import STORES, get_store
+from benchmarks.bench_scoring import create_season_frame
+
+
+def create_stored_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frame = create_season_frame(rows, seed)
+    frame['player_id'] = [f"00-00{i:05d}" for i in rng.integers(0, 2000, size=rows)]
+    frame['team'] = rng.choice(['CAR', 'CHI', 'GB', 'NE', 'NYG', 'SF'], size=rows)
+    frame['date'] = pd.Timestamp('2019-09-08') + pd.to_timedelta(
+        rng.integers(0, 120, size=rows), unit='D')
+    frame['seasonweek'] = rng.integers(1, 18, size=rows)
+    return frame
+
+
+def main(rows: int = 100000):
+    frame = create_stored_frame(rows)
+    print(f"rows: {rows}")
+    print(f"{'format':10} {'write s':>10} {'read s':>10} {'read 3 cols s':>14} {'size MB':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for fmt in STORES:
+            store = get_store(fmt, migrate=False)
+            stem = Path(tmpdir) / 'season'
+            start = time.perf_counter()
+            path = store.write(frame, stem)
+            write_time = time.perf_counter() - start
+            start = time.perf_counter()
+            store.read(stem)
+            read_time = time.perf_counter() - start
+            start = time.perf_counter()
+            store.read(stem, columns=['player_id', 'seasonweek', 'rush_yds'])
+            projection_time = time.perf_counter() - start
+            size = path.stat().st_size / 2 ** 20
+            print(f"{fmt:10} {write_time:10.4f} {read_time:10.4f} "
+                  f"{projection_time:14.4f} {size:10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
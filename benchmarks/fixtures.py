@@ -0,0 +1,229 @@
+"""synthetic inputs shaped like the nfl.com responses, so every stage of the
+pipeline can be timed offline and reproducibly (all generators take a seed)
+"""
+import json
+from datetime import date, timedelta
+
+import numpy as np
+
+from NflDataLoader.active_players import team_urls
+from NflDataLoader.gamecenter import GAMECENTER_URL
+from NflDataLoader.replay import CassetteStore
+from NflDataLoader.roster import TEAMS
+
+POSITIONS = ('QB', 'RB', 'WR', 'TE', 'OT', 'OG', 'C', 'DE', 'DT', 'LB', 'CB', 'SS', 'FS',
+             'K', 'P', 'LS')
+COLLEGES = ('Alabama', 'Auburn', 'Clemson', 'Georgia', 'LSU', 'Michigan', 'Ohio State',
+            'Oklahoma', 'Stanford', 'USC')
+# stat names of the gtd.json categories
+CATEGORY_STATS = {
+    'passing': ('att', 'cmp', 'yds', 'tds', 'ints', 'twopta', 'twoptm'),
+    'rushing': ('att', 'yds', 'tds', 'lng', 'lngtd', 'twopta', 'twoptm'),
+    'receiving': ('rec', 'yds', 'tds', 'lng', 'lngtd', 'twopta', 'twoptm'),
+    'fumbles': ('tot', 'rcv', 'trcv', 'yds', 'lost'),
+    'kicking': ('fgm', 'fga', 'fgyds', 'totpfg', 'xpmade', 'xpmissed', 'xpa', 'xpb', 'xptot'),
+    'punting': ('pts', 'yds', 'avg', 'i20', 'lng'),
+    'kickret': ('ret', 'avg', 'tds', 'lng', 'lngtd'),
+    'puntret': ('ret', 'avg', 'tds', 'lng', 'lngtd'),
+    'defense': ('tkl', 'ast', 'sk', 'int', 'ffum'),
+}
+# players per team with an entry in the category
+CATEGORY_PLAYERS = {
+    'passing': 2, 'rushing': 5, 'receiving': 9, 'fumbles': 3, 'kicking': 1, 'punting': 1,
+    'kickret': 2, 'puntret': 1, 'defense': 24,
+}
+SEASON_START = {'PRE': (8, 8), 'REG': (9, 8), 'POST': (1, 4)}
+
+
+def gsis_id(team_index: int, player: int) -> str:
+    return f"00-00{team_index:02d}{player:03d}"
+
+
+def esb_id(team_index: int, player: int) -> str:
+    return f"ESB{team_index:02d}{player:04d}"
+
+
+def player_name(team_index: int, player: int) -> str:
+    return f"Player{team_index:02d}{player:03d} Team{TEAMS[team_index]}"
+
+
+def game_eid(season: int, seasontype: str, week: int, game: int) -> str:
+    month, day = SEASON_START[seasontype]
+    year = season + 1 if seasontype == 'POST' else season
+    gamedate = date(year, month, day) + timedelta(weeks=week - 1)
+    return f"{gamedate:%Y%m%d}{game:02d}"
+
+
+def schedule_games(season: int, seasontype: str, week: int, seed: int = 0) -> list:
+    """returns [(eid, home, away)] of 16 games in which every team plays once"""
+    rng = np.random.default_rng([seed, season, week])
+    teams = list(rng.permutation(TEAMS))
+    return [(game_eid(season, seasontype, week, i), teams[2 * i], teams[2 * i + 1])
+            for i in range(len(teams) // 2)]
+
+
+def scorestrip_xml(season: int, seasontype: str, week: int, seed: int = 0) -> str:
+    """the scorestrip of http://www.nfl.com/ajax/scorestrip"""
+    rows = []
+    for i, (eid, home, away) in enumerate(schedule_games(season, seasontype, week, seed)):
+        rows.append(
+            f'<g eid="{eid}" gsis="{57000 + week * 100 + i}" d="Sun" t="1:00" q="F" '
+            f'k="" h="{home}" hnn="home" hs="24" v="{away}" vnn="away" vs="17" '
+            f'p="" rz="" ga="" gt="{seasontype}"/>')
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<ss><gms w="{week}" y="{season}" '
+            f't="{seasontype}" gd="0" bph="0">' + ''.join(rows) + '</gms></ss>')
+
+
+def team_stats(team: str, rng) -> dict:
+    team_index = TEAMS.index(team)
+    stats = {}
+    for category, stat_names in CATEGORY_STATS.items():
+        players = rng.choice(45, size=CATEGORY_PLAYERS[category], replace=False)
+        stats[category] = {
+            gsis_id(team_index, player): dict(
+                {stat: int(value) for stat, value in zip(
+                    stat_names, rng.integers(0, 40, size=len(stat_names)))},
+                name=player_name(team_index, player))
+            for player in players
+        }
+    stats['team'] = {'totfd': int(rng.integers(10, 30)), 'totyds': int(rng.integers(200, 500))}
+    return stats
+
+
+def gamecenter_json(eid: str, home: str, away: str, seed: int = 0) -> dict:
+    """the gtd.json of http://www.nfl.com/liveupdate/game-center/{eid}/{eid}_gtd.json"""
+    rng = np.random.default_rng([seed, int(eid)])
+    game = {}
+    for place, team in (('home', home), ('away', away)):
+        game[place] = {
+            'abbr': team,
+            'score': {'T': int(rng.integers(0, 45))},
+            'stats': team_stats(team, rng),
+        }
+    return {eid: game}
+
+
+def player_row(team_index: int, player: int, rng) -> dict:
+    """a player of the players database"""
+    return {
+        'player_id': gsis_id(team_index, player),
+        'esb_id': esb_id(team_index, player),
+        'name': player_name(team_index, player),
+        'trikotnumber': int(rng.integers(1, 99)),
+        'position': POSITIONS[player % len(POSITIONS)],
+        'status': 'ACT',
+        'height': int(rng.integers(175, 205)),
+        'weight': int(rng.integers(80, 150)),
+        'birthdate': date(1985, 1, 1) + timedelta(days=int(rng.integers(0, 5000))),
+        'age': int(rng.integers(21, 38)),
+        'exp': int(rng.integers(0, 15)),
+        'college': COLLEGES[player % len(COLLEGES)],
+        'team': TEAMS[team_index],
+    }
+
+
+def player_rows(players_per_team: int = 45, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [player_row(team_index, player, rng)
+            for team_index in range(len(TEAMS)) for player in range(players_per_team)]
+
+
+def roster_html(team: str, players_per_team: int = 53, seed: int = 0) -> str:
+    """the roster page of http://www.nfl.com/teams/roster?team={team}"""
+    rng = np.random.default_rng([seed, TEAMS.index(team)])
+    team_index = TEAMS.index(team)
+    rows = []
+    for player in range(players_per_team):
+        info = player_row(team_index, player, rng)
+        last, first = info['name'].split(' ')[1], info['name'].split(' ')[0]
+        rows.append(
+            f"<tr><td>{info['trikotnumber']}</td>"
+            f"<td><a href=\"/player/{first.lower()}{last.lower()}/{2550000 + player}/profile\">"
+            f"{last}, {first}</a></td><td>{info['position']}</td><td>ACT</td>"
+            f"<td>6-{player % 12}</td><td>{200 + player}</td>"
+            f"<td>{info['birthdate']:%m/%d/%Y}</td><td>{info['exp']}</td>"
+            f"<td>{info['college']}</td></tr>")
+    return ('<html><body><div id="result"><table><tbody><tr><td>header</td></tr></tbody>'
+            '<tbody>' + ''.join(rows) + '</tbody></table></div></body></html>')
+
+
+def profile_html(team: str, player: int, seed: int = 0) -> str:
+    """the profile page of http://www.nfl.com/players/profile?id={gsis_id}"""
+    team_index = TEAMS.index(team)
+    info = player_row(team_index, player, np.random.default_rng([seed, team_index, player]))
+    return (
+        '<html><body><div id="player-bio"><div class="player-info">'
+        f'<p><span class="player-name">{info["name"]}</span>'
+        f'<span class="player-number">#{info["trikotnumber"]} {info["position"]}</span></p>'
+        f'<p><strong>Height</strong>: 6-{player % 12} <strong>Weight</strong>: '
+        f'{200 + player} <strong>Age</strong>: {info["age"]}</p>'
+        f'<p><strong>Born</strong>: {info["birthdate"]:%m/%d/%Y} Charlotte , NC</p>'
+        f'<p><strong>College</strong>: {info["college"]}</p>'
+        f'<p><strong>Experience</strong>: {info["exp"]}th season</p>'
+        '</div></div>'
+        f'<!-- GSIS ID: {info["player_id"]} ESB ID: {info["esb_id"]} -->'
+        '</body></html>')
+
+
+def depth_chart_html(team: str, seed: int = 0) -> str:
+    """the offense and defense depth charts of a team website"""
+    rng = np.random.default_rng([seed, TEAMS.index(team)])
+    team_index = TEAMS.index(team)
+    tables = []
+    for positions in (POSITIONS[:7], POSITIONS[7:13]):
+        rows = []
+        for position in positions:
+            players = rng.choice(45, size=3, replace=False)
+            names = ''.join(f'<td>{player_name(team_index, player)}</td>' for player in players)
+            rows.append(f'<tr><td>{position}</td>{names}</tr>')
+        tables.append(
+            '<table><thead><tr><th>Position</th><th>Starter</th><th>2nd</th><th>3rd</th>'
+            '</tr></thead><tbody>' + ''.join(rows) + '</tbody></table>')
+    return '<html><body>' + ''.join(tables) + '</body></html>'
+
+
+def roster_player_url(team: str, player: int) -> str:
+    """the profile link of a player on the roster page of roster_html"""
+    name = player_name(TEAMS.index(team), player)
+    first, last = name.split(' ')[0], name.split(' ')[1]
+    return f"http://www.nfl.com/player/{first.lower()}{last.lower()}/{2550000 + player}/profile"
+
+
+def write_cassettes(directory, season: int = 2019, weeks=range(1, 18), seed: int = 0,
+                    teams=()) -> int:
+    """records the synthetic responses of a regular season into a replay.CassetteStore:
+    the scorestrips, gtd.json of all games and the profiles of all players,
+    for the given teams also their roster pages, the profiles linked there and
+    their depth charts, returns the number of recorded responses
+    """
+    store = CassetteStore(directory)
+    xml = {'Content-Type': 'text/xml'}
+    html = {'Content-Type': 'text/html; charset=UTF-8'}
+    recorded = 0
+    for week in range(1, 18):
+        url = (f'http://www.nfl.com/ajax/scorestrip?season={season}&seasonType=REG'
+               f'&week={week}')
+        games = scorestrip_xml(season, 'REG', week, seed) if week in weeks else '<ss></ss>'
+        store.add('GET', url, 200, games.encode(), xml)
+        recorded += 1
+    for week in weeks:
+        for eid, home, away in schedule_games(season, 'REG', week, seed):
+            store.add('GET', GAMECENTER_URL.format(eid=eid), 200,
+                      json.dumps(gamecenter_json(eid, home, away, seed)).encode(),
+                      {'Content-Type': 'application/json', 'ETag': f'"{eid}"'})
+            recorded += 1
+    for team_index, team in enumerate(TEAMS):
+        for player in range(45):
+            url = f'http://www.nfl.com/players/profile?id={gsis_id(team_index, player)}'
+            store.add('GET', url, 200, profile_html(team, player, seed).encode(), html)
+            recorded += 1
+    for team in teams:
+        store.add('GET', f'http://www.nfl.com/teams/roster?team={team}', 200,
+                  roster_html(team, seed=seed).encode(), html)
+        for player in range(53):
+            store.add('GET', roster_player_url(team, player), 200,
+                      profile_html(team, player, seed).encode(), html)
+        store.add('GET', team_urls[team] + 'team/depth-chart', 200,
+                  depth_chart_html(team, seed).encode(), html)
+        recorded += 55
+    return recorded
@@ -3,6 +3,8 @@ from pathlib import Path
 import pandas as pd
 
 from NflDataLoader.dataloader import NflLoader, create_test_data
+from NflDataLoader.dataset import NflDataset
+from NflDataLoader import instrument
 from NflDataLoader.scheduleloader import (
         ScheduleLoader, create_date_from_eid
 )
@@ -27,15 +29,20 @@ def get_stats():
         nl = NflLoader(season, save=True)
         _ = nl.get_seasontable()
 
+def get_training_data():
+    # only the selected columns and rows of the stored season tables are read
+    dataset = NflDataset(
+        range(2009, 2020), positions=['QB', 'RB', 'WR', 'TE'],
+        columns=['player_id', 'position', 'team', 'seasonweek', 'fpts'], compact=True)
+    return dataset.to_frame()
+
 def get_stats_from_current_season(weeks: list):
     season = 2019
     loader = NflLoader(season)
-    weekdata = []
-    for week in weeks:
-        weekdata.append(loader.get_weektable(week))
-    df = pd.concat(weekdata, sort=False)
-    df.to_csv(loader.datapath.parent/f"{season}_REG.csv")
-    print(df.head())
+    # only unfinished or changed games are downloaded and rebuilt
+    rebuilt = loader.refresh(weeks)
+    print(f"rebuilt weeks: {rebuilt}")
+    print(loader.get_seasontable().head())
 
 def get_pre_season(season: int):
     loader = NflLoader(season, seasontype='PRE')
@@ -88,3 +95,7 @@ if __name__ == "__main__":
     # get_stats()
     # get_players()
     # df = get_depth()
+    if instrument.is_enabled():
+        # NFLDATALOADER_INSTRUMENT=1 python loadstats.py
+        print(instrument.summary())
+        instrument.write_report(Path("NflDataLoader/database/instrument_report.json"))
@@ -0,0 +1,48 @@
+import unittest
+
+from NflDataLoader.cache import PayloadCache
+
+
+class TestPayloadCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = PayloadCache(max_bytes=100)
+
+
+    def test_hit_and_miss(self):
+        self.cache.put('2019090500', {'a': 1}, 40)
+        self.assertEqual(self.cache.get('2019090500'), {'a': 1})
+        self.assertIsNone(self.cache.get('2019090800'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes']), (1, 1, 40))
+
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put('a', 1, 40)
+        self.cache.put('b', 2, 40)
+        self.cache.get('a')
+        self.cache.put('c', 3, 40)
+        self.assertIn('a', self.cache)
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(self.cache.size, 80)
+
+
+    def test_replace_and_invalidate(self):
+        self.cache.put('a', 1, 40)
+        self.cache.put('a', 2, 50)
+        self.assertEqual(self.cache.size, 50)
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.size, 0)
+
+
+    def test_cap(self):
+        self.cache.put('huge', 1, 101)
+        self.assertNotIn('huge', self.cache)
+        self.cache.put('a', 1, 60)
+        self.cache.configure(max_bytes=50)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
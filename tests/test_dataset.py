@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from NflDataLoader.dataset import NflDataset
+from NflDataLoader.manifest import CacheManifest, season_key, week_key
+from NflDataLoader.tablestore import pyarrow, get_store
+
+
+def create_week(week: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'player_id': ['00-01', '00-02', '00-03', '00-04'],
+        'team': ['CAR', 'CAR', 'NO', 'NO'],
+        'position': ['QB', 'WR', 'QB', 'K'],
+        'seasonweek': [week] * 4,
+        'fpts': [20.5, 8.0, 15.0, 7.0],
+    })
+
+
+class TestNflDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        self.manifest = CacheManifest.for_root(self.root)
+        fmt = 'parquet' if pyarrow is not None else 'csv'
+        season = pd.concat([create_week(1), create_week(2)], ignore_index=True)
+        stem = self.root / '2018' / '2018_REG'
+        self.manifest.add(season_key(2018, 'REG'), get_store(fmt).write(season, stem))
+        # the current season only has week tables
+        for week in (1, 2, 3):
+            stem = self.root / '2019' / 'REG' / str(week)
+            self.manifest.add(week_key(2019, 'REG', week), get_store('csv').write(
+                create_week(week), stem))
+
+
+    def test_partitions(self):
+        dataset = NflDataset(2019, weeks=[2, 3], path=self.root)
+        self.assertListEqual([path.stem for path in dataset.partitions()], ['2', '3'])
+        dataset = NflDataset(path=self.root)
+        self.assertEqual(len(dataset.partitions()), 4)
+
+
+    def test_filters_and_columns(self):
+        dataset = NflDataset(range(2018, 2020), weeks=[2], teams=['CAR'], positions=['QB'],
+                             columns=['player_id', 'fpts'], path=self.root)
+        frame = dataset.to_frame()
+        self.assertListEqual(list(frame.columns), ['player_id', 'fpts'])
+        self.assertListEqual(list(frame['player_id']), ['00-01', '00-01'])
+
+
+    def test_iter_chunks(self):
+        dataset = NflDataset(player_ids=['00-02', '00-04'], path=self.root)
+        chunks = list(dataset.iter_chunks(batch_size=1))
+        self.assertTrue(all(len(chunk) == 1 for chunk in chunks))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 10)
+
+
+    def test_no_match(self):
+        frame = NflDataset(2018, teams=['ATL'], columns=['fpts'], path=self.root).to_frame()
+        self.assertEqual(len(frame), 0)
+        self.assertListEqual(list(frame.columns), ['fpts'])
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+from NflDataLoader.gamecenter import aiohttp, prefetch_games, flatten_team_stats
+from NflDataLoader.scheduleloader import load_json
+
+FIXTURES = {
+    '2019090500': {'2019090500': {'home': {'abbr': 'CHI'}, 'away': {'abbr': 'GB'}}},
+    '2019090800': {'2019090800': {'home': {'abbr': 'CAR'}, 'away': {'abbr': 'LA'}}},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """serves the fixtures under /{eid}/{eid}_gtd.json,
+    eids in server.failures get a 503 until their failure count is used up,
+    eids in server.broken get a body that is not json
+    """
+    def do_GET(self):
+        eid = self.path.split('/')[1]
+        self.server.requests.append(eid)
+        if self.server.failures.get(eid, 0) > 0:
+            self.server.failures[eid] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if eid in self.server.broken:
+            body = b'<html>Service Unavailable</html>'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if eid not in FIXTURES:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps(FIXTURES[eid]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp not installed")
+class TestPrefetchGames(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.failures = {}
+        self.server.broken = set()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.url = f'http://{host}:{port}/{{eid}}/{{eid}}_gtd.json'
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = Path(self.tmpdir.name)
+
+
+    def test_prefetch_writes_archive(self):
+        results = prefetch_games(FIXTURES, self.archive, url=self.url, concurrency=2)
+        self.assertEqual(results, {eid: True for eid in FIXTURES})
+        for eid, gamestats in FIXTURES.items():
+            self.assertEqual(load_json(self.archive / f'{eid}.json'), gamestats)
+
+
+    def test_skips_archived_games(self):
+        prefetch_games(['2019090500'], self.archive, url=self.url)
+        results = prefetch_games(FIXTURES, self.archive, url=self.url)
+        self.assertEqual(list(results), ['2019090800'])
+        self.assertEqual(self.server.requests.count('2019090500'), 1)
+
+
+    def test_retries_with_backoff(self):
+        self.server.failures['2019090500'] = 2
+        results = prefetch_games(['2019090500'], self.archive, url=self.url,
+                                 retries=2, backoff=0.01)
+        self.assertTrue(results['2019090500'])
+        self.assertEqual(self.server.requests.count('2019090500'), 3)
+
+
+    def test_missing_game_is_not_retried(self):
+        results = prefetch_games(['2019090900'], self.archive, url=self.url, backoff=0.01)
+        self.assertFalse(results['2019090900'])
+        self.assertEqual(self.server.requests.count('2019090900'), 1)
+
+
+    def test_invalid_json_fails_only_its_game(self):
+        self.server.broken.add('2019090500')
+        results = prefetch_games(FIXTURES, self.archive, url=self.url,
+                                 retries=1, backoff=0.01)
+        self.assertEqual(results, {'2019090500': False, '2019090800': True})
+        self.assertEqual(self.server.requests.count('2019090500'), 2)
+        self.assertFalse((self.archive / '2019090500.json').exists())
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+
+class TestFlattenTeamStats(unittest.TestCase):
+    def test_flatten(self):
+        statistics = {
+            'team': {'totfd': 20},
+            'rushing': {'00-01': {'name': 'A.Back', 'att': 10, 'yds': 55},
+                        '00-02': {'name': 'B.Quarter', 'att': 2, 'yds': 7}},
+            'passing': {'00-02': {'name': 'B.Quarter', 'att': 30, 'yds': 250}},
+            'defense': {'00-03': {'name': 'C.Backer', 'tkl': 8, 'sk': 1}},
+            'kicking': {},
+        }
+        table = flatten_team_stats(statistics)
+        self.assertListEqual(
+            list(table.columns),
+            ['tkl', 'sk', 'name', 'player_id', 'pass_att', 'pass_yds', 'rush_att', 'rush_yds'])
+        self.assertListEqual(list(table['player_id']), ['00-03', '00-02', '00-01'])
+        self.assertListEqual(list(table['name']), ['C.Backer', 'B.Quarter', 'A.Back'])
+        self.assertListEqual(list(table['rush_yds'].fillna(-1)), [-1, 7.0, 55.0])
+        self.assertListEqual(list(table['pass_att'].fillna(-1)), [-1, 30.0, -1])
+        self.assertIn('team', statistics)
+
+
+if __name__ == "__main__":
+    unittest.main()
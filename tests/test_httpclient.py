@@ -0,0 +1,91 @@
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from NflDataLoader.httpclient import HttpClient
+
+PAGES = {
+    '/table': b'<html><table><tr><th>Player</th><th>Pos</th></tr>'
+              b'<tr><td>A. Player</td><td>QB</td></tr></table></html>',
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """serves PAGES with keep-alive, paths in server.failures get a 503
+    until their failure count is used up
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.server.connections.add(self.client_address)
+        if self.server.failures.get(self.path, 0) > 0:
+            self.server.failures[self.path] -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = PAGES.get(self.path)
+        self.send_response(200 if body is not None else 404)
+        body = body or b''
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.failures = {}
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.base_url = f'http://{host}:{port}'
+        self.client = HttpClient(backoff=0.01, timeouts={f'{host}:{port}': 2})
+
+
+    def test_keeps_connection_alive(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.base_url + '/table').status_code, 200)
+        self.assertEqual(len(self.server.connections), 1)
+
+
+    def test_retries_with_backoff(self):
+        self.server.failures['/table'] = 2
+        response = self.client.get(self.base_url + '/table')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests.count('/table'), 3)
+
+
+    def test_missing_page_is_not_retried(self):
+        response = self.client.get(self.base_url + '/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+    def test_read_html_and_hooks(self):
+        stages = []
+        self.client.add_hook(lambda response, stage: stages.append(stage))
+        tables = self.client.read_html(self.base_url + '/table', stage='roster')
+        self.assertListEqual(list(tables[0]['Player']), ['A. Player'])
+        self.assertListEqual(stages, ['roster'])
+
+
+    def test_timeout_per_host(self):
+        self.assertEqual(self.client.get_timeout(f'{self.base_url}/table'), 2)
+        self.assertEqual(self.client.get_timeout('http://example.com/'), self.client.timeout)
+
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
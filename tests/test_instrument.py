@@ -0,0 +1,55 @@
+import json
+import tempfile
+import unittest
+from datetime import timedelta
+from pathlib import Path
+
+from NflDataLoader import instrument
+
+
+class FakeResponse():
+    url = 'http://www.nfl.com/ajax/scorestrip?season=2019'
+    content = b'<ss></ss>'
+    status_code = 200
+    elapsed = timedelta(milliseconds=20)
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        instrument.RECORDER.reset()
+
+
+    def test_disabled_records_nothing(self):
+        instrument.disable()
+        with instrument.span('stage'):
+            instrument.count('rows', 3)
+        instrument.record_response(FakeResponse(), 'schedule')
+        self.assertDictEqual(instrument.RECORDER.as_dict(), {'spans': {}, 'counters': {}})
+
+
+    def test_spans_and_counters(self):
+        instrument.enable()
+        for _ in range(2):
+            with instrument.span('stage'):
+                instrument.count('rows', 3)
+        instrument.record_response(FakeResponse(), 'schedule')
+        report = instrument.RECORDER.as_dict()
+        self.assertEqual(report['spans']['stage']['count'], 2)
+        self.assertEqual(report['counters']['rows'], 6)
+        self.assertEqual(report['counters']['http.www.nfl.com.bytes'], 9)
+        self.assertEqual(report['counters']['http.schedule.requests'], 1)
+        self.assertAlmostEqual(report['spans']['http.latency']['seconds'], 0.02)
+        self.assertIn('http.schedule.latency', instrument.summary())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = instrument.write_report(Path(tmpdir) / 'report.json')
+            with open(path, 'r') as jfile:
+                self.assertDictEqual(json.load(jfile), report)
+
+
+    def tearDown(self):
+        instrument.disable()
+        instrument.RECORDER.reset()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from NflDataLoader.jsonarchive import (
+    pack_directory, get_archive, is_archived, season_of_eid, PACK_SUFFIX)
+from NflDataLoader.scheduleloader import load_json, save_obj_to_json
+from NflDataLoader.serialization import CorruptFileError
+
+GAMES = {
+    '2018090900': {'2018090900': {'home': {'abbr': 'CAR'}, 'away': {'abbr': 'DAL'}}},
+    '2018091600': {'2018091600': {'home': {'abbr': 'ATL'}, 'away': {'abbr': 'CAR'}}},
+    '2019011300': {'2019011300': {'home': {'abbr': 'NO'}, 'away': {'abbr': 'PHI'}}},
+    '2019090500': {'2019090500': {'home': {'abbr': 'CHI'}, 'away': {'abbr': 'GB'}}},
+}
+
+
+class TestPackedArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+        for eid, gamestats in GAMES.items():
+            save_obj_to_json(gamestats, self.directory, f'{eid}.json')
+
+
+    def test_season_of_eid(self):
+        self.assertEqual(season_of_eid('2019011300'), 2018)
+        self.assertEqual(season_of_eid('2019090500'), 2019)
+
+
+    def test_pack_and_load(self):
+        self.assertEqual(pack_directory(self.directory, remove=True), 4)
+        self.assertListEqual(list(self.directory.glob('*.json')), [])
+        self.assertListEqual(sorted(path.name for path in self.directory.glob(f'*{PACK_SUFFIX}')),
+                             ['2018.pack', '2019.pack'])
+        self.assertEqual(len(get_archive(self.directory, 2018)), 3)
+        for eid, gamestats in GAMES.items():
+            self.assertTrue(is_archived(self.directory, eid))
+            self.assertEqual(load_json(self.directory / f'{eid}.json'), gamestats)
+
+
+    def test_append_later_games(self):
+        pack_directory(self.directory, remove=True)
+        later = {'2019090800': {'home': {'abbr': 'CAR'}, 'away': {'abbr': 'LA'}}}
+        save_obj_to_json(later, self.directory, '2019090800.json')
+        self.assertEqual(pack_directory(self.directory), 1)
+        self.assertEqual(pack_directory(self.directory), 0)
+        self.assertEqual(get_archive(self.directory, 2019).load('2019090800'), later)
+        self.assertEqual(load_json(self.directory / '2019090500.json'), GAMES['2019090500'])
+
+
+    def test_corrupt_pack(self):
+        pack_directory(self.directory, remove=True)
+        pack_path = self.directory / f'2019{PACK_SUFFIX}'
+        data = bytearray(pack_path.read_bytes())
+        data[len(data) // 2] ^= 0xff
+        pack_path.write_bytes(bytes(data))
+        get_archive(self.directory, 2019).reload()
+        with self.assertRaises(CorruptFileError):
+            load_json(self.directory / '2019090500.json')
+        # the other season is untouched
+        self.assertEqual(load_json(self.directory / '2018090900.json'), GAMES['2018090900'])
+
+
+    def test_missing_game(self):
+        pack_directory(self.directory)
+        with self.assertRaises(FileNotFoundError):
+            load_json(self.directory / '2019091500.json')
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
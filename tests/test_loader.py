@@ -1,9 +1,19 @@
+import json
+import os
+import tempfile
 import unittest
+from datetime import date
 from pathlib import Path
 import pandas as pd
 
-from NflDataLoader.dataloader import NflLoader, create_test_data
-from NflDataLoader.scheduleloader import load_json
+from NflDataLoader import httpclient, scheduler
+from NflDataLoader.cache import GAME_CACHE
+from NflDataLoader.dataloader import NflLoader, create_test_data, create_team_view
+from NflDataLoader.gamecenter import GAMECENTER_URL, JSONARCHIVE_PATH
+from NflDataLoader.replay import CassetteStore, ReplayAdapter
+from NflDataLoader.roster import TEAMS
+from NflDataLoader.scheduleloader import load_json, SCHEDULE_URL
+from benchmarks import fixtures
 
 class TestDataLoader(unittest.TestCase):
 
@@ -46,6 +56,101 @@ class TestDataLoader(unittest.TestCase):
         self.assertEqual(len(columns), len(test_columns))
         self.assertListEqual(columns, test_columns)
 
+    def test_create_team_view(self):
+        schedule = pd.DataFrame({
+            'eid': ['2019110700', '2019111000'], 'home': ['OAK', 'NO'],
+            'away': ['LAC', 'ATL'], 'week': [10, 10]})
+        view = create_team_view(schedule).set_index('team')
+        self.assertListEqual(list(view['opponent'][['OAK', 'LAC', 'NO', 'ATL']]),
+                             ['LAC', 'OAK', 'ATL', 'NO'])
+        self.assertEqual(view.loc['LAC', 'home'], 0)
+        self.assertEqual(view.loc['LAC', 'away'], 1)
+        self.assertEqual(view.loc['ATL', 'date'], date(2019, 11, 10))
+        self.assertEqual(view.loc['ATL', 'weekday'], 6)
+        self.assertEqual(view.loc['OAK', 'seasonweek'], 10)
+
+
+class ConditionalReplayAdapter(ReplayAdapter):
+    """answers If-None-Match with a 304 like the game center"""
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        etag = response.headers.get('ETag')
+        if etag is not None and request.headers.get('If-None-Match') == etag:
+            response.status_code = 304
+            response._content = b''
+        return response
+
+
+class TestRefresh(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        Path('NflDataLoader/database').mkdir(parents=True)
+        # week 1 has a played game and a game without gtd.json
+        self.games = fixtures.schedule_games(2019, 'REG', 1)[:2]
+        store = self.store = CassetteStore('cassettes')
+        for week in range(1, 18):
+            rows = ''.join(f'<g eid="{eid}" gsis="1" d="Sun" q="F" h="{home}" v="{away}"/>'
+                           for eid, home, away in self.games) if week == 1 else ''
+            store.add('GET', f'{SCHEDULE_URL}?season=2019&seasonType=REG&week={week}', 200,
+                      f'<ss><gms w="{week}" y="2019" t="R">{rows}</gms></ss>'.encode())
+        eid, home, away = self.games[0]
+        store.add('GET', GAMECENTER_URL.format(eid=eid), 200,
+                  json.dumps(fixtures.gamecenter_json(eid, home, away)).encode(),
+                  {'ETag': f'"{eid}"'})
+        for team in (home, away):
+            for player in range(45):
+                store.add('GET', 'http://www.nfl.com/players/profile?id='
+                          f'{fixtures.gsis_id(TEAMS.index(team), player)}', 200,
+                          fixtures.profile_html(team, player).encode())
+        GAME_CACHE.clear()
+        client = httpclient.configure(backoff=0)
+        for prefix in ('http://', 'https://'):
+            client.mount(prefix, ConditionalReplayAdapter(store))
+        scheduler.configure(workers=4, default_rate=(1000, 1000),
+                            rates={'www.nfl.com': (1000, 1000)})
+
+
+    def test_unplayed_game(self):
+        loader = NflLoader(2019, preload=True)
+        self.assertListEqual(loader.refresh([1]), [1])
+        weektable = loader.get_weektable(1)
+        self.assertSetEqual(set(weektable['team']), set(self.games[0][1:]))
+        self.assertListEqual(loader.refresh([1]), [])
+
+
+    def test_lost_game_file(self):
+        loader = NflLoader(2019, preload=True)
+        loader.refresh([1])
+        eid = self.games[0][0]
+        (JSONARCHIVE_PATH / f'{eid}.json').unlink()
+        GAME_CACHE.clear()
+        # the stored ETag must not turn the download of the lost file into a 304
+        self.assertEqual(loader.get_game_stats(eid)[eid]['home']['abbr'], self.games[0][1])
+
+
+    def test_invalid_game_download(self):
+        loader = NflLoader(2019, preload=True)
+        eid, _, _ = self.games[1]
+        self.store.add('GET', GAMECENTER_URL.format(eid=eid), 200, b'<html></html>')
+        self.assertIsNone(loader.get_game_stats(eid))
+        self.assertFalse((JSONARCHIVE_PATH / f'{eid}.json').exists())
+
+
+    def test_seasontable_of_played_weeks(self):
+        loader = NflLoader(2019, preload=True)
+        seasontable = loader.store.read(loader.write_seasontable().with_suffix(''))
+        self.assertListEqual(list(seasontable['seasonweek'].unique()), [1])
+
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        httpclient.configure()
+        scheduler.configure()
+        GAME_CACHE.clear()
+        self.tmpdir.cleanup()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from NflDataLoader.jsonarchive import pack_directory
+from NflDataLoader.manifest import (
+    CacheManifest, game_key, week_key, season_key, schedule_key, gamestats_key)
+
+
+class TestCacheManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        files = ['2019/REG/CAR/1.csv', '2019/REG/CAR/1.parquet', '2019/REG/1.parquet',
+                 '2019/2019_REG.csv', 'schedule/2019/REG/1.json', 'jsonarchive/2019090500.json']
+        for name in files:
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+
+    def test_scan(self):
+        manifest = CacheManifest(self.root)
+        self.assertDictEqual(manifest.entries, {
+            game_key(2019, 'REG', 1, 'CAR'): {'path': '2019/REG/CAR/1.parquet'},
+            week_key(2019, 'REG', 1): {'path': '2019/REG/1.parquet'},
+            season_key(2019, 'REG'): {'path': '2019/2019_REG.csv'},
+        })
+        schedule_manifest = CacheManifest(self.root / 'schedule')
+        self.assertIn(schedule_key(2019, 'REG', 1), schedule_manifest)
+
+
+    def test_add_and_reload(self):
+        manifest = CacheManifest(self.root)
+        key = game_key(2019, 'REG', 2, 'CHI')
+        manifest.add(key, self.root / '2019/REG/CHI/2.parquet', finished=True)
+        reloaded = CacheManifest(self.root)
+        self.assertEqual(reloaded.get_path(key), self.root / '2019/REG/CHI/2.parquet')
+        self.assertTrue(reloaded.get(key)['finished'])
+        reloaded.remove(key)
+        self.assertNotIn(key, CacheManifest(self.root))
+        self.assertListEqual(list(self.root.glob('.manifest*')), [])
+
+
+    def test_journal(self):
+        manifest = CacheManifest(self.root)
+        manifest.add(game_key(2019, 'REG', 2, 'GB'), self.root / '2019/REG/GB/2.parquet')
+        manifest.remove(week_key(2019, 'REG', 1))
+        with open(manifest.journal_path, 'a') as journal:
+            journal.write('{"key": "torn')
+        reloaded = CacheManifest(self.root)
+        self.assertIn(game_key(2019, 'REG', 2, 'GB'), reloaded)
+        self.assertNotIn(week_key(2019, 'REG', 1), reloaded)
+        reloaded.save()
+        self.assertEqual(manifest.journal_path.stat().st_size, 0)
+        self.assertDictEqual(CacheManifest(self.root).entries, reloaded.entries)
+
+
+    def test_append_after_torn_line(self):
+        manifest = CacheManifest(self.root)
+        with open(manifest.journal_path, 'a') as journal:
+            journal.write('{"key": "torn')
+        reloaded = CacheManifest(self.root)
+        reloaded.add(game_key(2019, 'REG', 3, 'GB'), self.root / '2019/REG/GB/3.parquet')
+        reloaded.add(game_key(2019, 'REG', 4, 'GB'), self.root / '2019/REG/GB/4.parquet')
+        entries = CacheManifest(self.root).entries
+        self.assertIn(game_key(2019, 'REG', 3, 'GB'), entries)
+        self.assertIn(game_key(2019, 'REG', 4, 'GB'), entries)
+
+
+    def test_rebuild(self):
+        manifest = CacheManifest(self.root)
+        manifest.add(game_key(2018, 'REG', 1, 'GB'), self.root / '2018/REG/GB/1.parquet')
+        self.assertEqual(manifest.rebuild(), 3)
+        self.assertNotIn(game_key(2018, 'REG', 1, 'GB'), CacheManifest(self.root))
+
+
+    def test_rebuild_keeps_metadata(self):
+        manifest = CacheManifest(self.root)
+        archive = self.root / 'jsonarchive'
+        (archive / '2019090800.json').write_text('{}')
+        pack_directory(archive, remove=True)
+        manifest.add(game_key(2019, 'REG', 1, 'CAR'), self.root / '2019/REG/CAR/1.parquet',
+                     rows=45)
+        for eid in ('2019090500', '2019090800', '2019091500'):
+            manifest.add(gamestats_key(eid), archive / f'{eid}.json', etag=f'"{eid}"',
+                         finished=True)
+        manifest.rebuild()
+        entries = CacheManifest(self.root).entries
+        self.assertEqual(entries[game_key(2019, 'REG', 1, 'CAR')]['rows'], 45)
+        # a loose and a packed file keep their ETag, a missing one is dropped
+        self.assertEqual(entries[gamestats_key('2019090500')]['etag'], '"2019090500"')
+        self.assertTrue(entries[gamestats_key('2019090800')]['finished'])
+        self.assertNotIn(gamestats_key('2019091500'), entries)
+
+
+    def test_shared_instance(self):
+        self.assertIs(CacheManifest.for_root(self.root), CacheManifest.for_root(str(self.root)))
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
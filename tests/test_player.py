@@ -1,9 +1,11 @@
 import unittest
 from datetime import date
 from pathlib import Path
+from unittest import mock
 
 from NflDataLoader.helperfunctions import convert_pounds_to_kg, convert_inch_to_cm
 from NflDataLoader.player_db import Players
+from NflDataLoader.playerdataloader import PlayerDataLoader
 
 class TestHelperFunctions(unittest.TestCase):
     def test_convert_inch_to_cm_bindestreich(self):
@@ -87,7 +89,50 @@ class TestPlayerDB(unittest.TestCase):
         self.assertEqual(player2.status, new_player.status)
 
 
+    def test_add_players(self):
+        players = [self.players.create_player(infos) for infos in (
+            {'name': 'Test Player', 'player_id': '00-01', 'esb_id': 'test01'},
+            {'name': 'New Player', 'player_id': '00-02', 'esb_id': 'test02'},
+            {'name': 'New Player', 'player_id': '00-02', 'esb_id': 'test02'},
+            {'name': 'No Esb', 'player_id': '00-03'})]
+        self.assertEqual(self.players.add_players(players), 2)
+        self.assertIsNotNone(self.players.get_player(gsis_id='00-03'))
+        self.assertEqual(len(self.players.get_all_players()), 3)
+
+
     def tearDown(self):
         p = Path("tests/fixtures/test.db")
         if p.exists():
             p.unlink()
+
+
+class TestPlayerDataLoaderPreload(unittest.TestCase):
+    def setUp(self):
+        self.loader = PlayerDataLoader(path='tests/fixtures/test_preload.db')
+        self.loader.db.add_player(self.loader.db.create_player(
+            {'name': 'Test Player', 'player_id': '00-01', 'status': 'ACT', 'esb_id': 'test01'}))
+        self.loader.preload()
+
+
+    def test_get_player_infos(self):
+        infos = self.loader.get_player_infos(['00-01', '00-02'])
+        self.assertListEqual(list(infos['player_id']), ['00-01'])
+        self.assertEqual(infos.loc[0, 'name'], 'Test Player')
+
+
+    def test_resolve_player_infos(self):
+        data = {'name': 'New Player', 'player_id': '00-02', 'esb_id': 'test02'}
+        with mock.patch('NflDataLoader.roster.download_player_data',
+                        return_value=data) as download:
+            resolved = self.loader.resolve_player_infos(['00-01', '00-02', '00-02'])
+        download.assert_called_once_with('00-02')
+        self.assertListEqual(resolved, ['00-02'])
+        self.assertEqual(self.loader.db.get_player('00-02').name, 'New Player')
+        infos = self.loader.get_player_infos(['00-01', '00-02'])
+        self.assertListEqual(list(infos['player_id']), ['00-01', '00-02'])
+
+
+    def tearDown(self):
+        p = Path("tests/fixtures/test_preload.db")
+        if p.exists():
+            p.unlink()
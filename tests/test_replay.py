@@ -0,0 +1,134 @@
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from NflDataLoader.httpclient import HttpClient
+from NflDataLoader.replay import CassetteStore, ReplayServer, normalize_url, record, replay
+from tests.test_httpclient import StubHandler
+
+
+class TestCassetteStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = CassetteStore(self.tmpdir.name)
+
+
+    def test_query_order_does_not_matter(self):
+        self.assertEqual(normalize_url('http://WWW.nfl.com/ajax?week=1&season=2019'),
+                         normalize_url('http://www.nfl.com/ajax?season=2019&week=1'))
+        self.store.add('GET', 'http://www.nfl.com/ajax?week=1&season=2019', 200, b'<ss/>',
+                       {'Content-Type': 'text/xml', 'Set-Cookie': 'id=1'})
+        recorded = self.store.get('GET', 'http://www.nfl.com/ajax?season=2019&week=1')
+        self.assertEqual(recorded['body'], b'<ss/>')
+        self.assertDictEqual(recorded['headers'], {'Content-Type': 'text/xml'})
+        self.assertIsNone(self.store.get('GET', 'http://www.nfl.com/ajax?season=2019'))
+
+
+    def test_record_redirects(self):
+        redirect = requests.Response()
+        redirect.status_code = 301
+        redirect.request = requests.Request('GET', 'http://nfl.com/teams/roster').prepare()
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'<html/>'
+        response.headers = requests.structures.CaseInsensitiveDict({'content-type': 'text/html'})
+        response.url = 'http://www.nfl.com/teams/roster'
+        response.request = requests.Request('GET', response.url).prepare()
+        response.history = [redirect]
+        self.store.record(response)
+        for url in ('http://nfl.com/teams/roster', 'http://www.nfl.com/teams/roster'):
+            recorded = self.store.get('GET', url)
+            self.assertEqual(recorded['body'], b'<html/>')
+            self.assertDictEqual(recorded['headers'], {'content-type': 'text/html'})
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+class TestRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.failures = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.base_url = f'http://{host}:{port}'
+
+
+    def test_replays_recorded_responses(self):
+        client = HttpClient()
+        store = record(self.tmpdir.name, client)
+        client.get(self.base_url + '/table')
+        client.get(self.base_url + '/missing')
+        client.close()
+        self.assertEqual(len(store), 2)
+
+        offline = HttpClient()
+        replay(self.tmpdir.name, offline)
+        self.server.requests.clear()
+        response = offline.get(self.base_url + '/table')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'A. Player', response.content)
+        self.assertEqual(offline.get(self.base_url + '/missing').status_code, 404)
+        self.assertEqual(offline.get(self.base_url + '/other').status_code, 404)
+        self.assertListEqual(self.server.requests, [])
+
+
+    def test_strict_replay(self):
+        client = HttpClient()
+        replay(self.tmpdir.name, client, strict=True)
+        with self.assertRaises(requests.ConnectionError):
+            client.get(self.base_url + '/table')
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+
+class TestReplayServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = CassetteStore(self.tmpdir.name)
+        self.url = 'http://www.nfl.com/ajax/scorestrip?season=2019&seasonType=REG&week=1'
+        self.store.add('GET', self.url, 200, b'<ss></ss>', {'Content-Type': 'text/xml'})
+
+
+    def test_serves_over_sockets(self):
+        with ReplayServer(self.store) as server:
+            client = HttpClient()
+            server.install(client)
+            response = client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.text, '<ss></ss>')
+            self.assertEqual(requests.get(server.rewrite(self.url)).content, b'<ss></ss>')
+            client.close()
+
+
+    def test_injected_errors_are_retried(self):
+        # with seed 1 the first request fails and the second succeeds
+        with ReplayServer(self.store, error_rate=0.5, seed=1) as server:
+            client = HttpClient(retries=0)
+            server.install(client)
+            self.assertEqual(client.get(self.url).status_code, 503)
+            client.close()
+        with ReplayServer(self.store, error_rate=0.5, seed=1) as server:
+            client = HttpClient(backoff=0.01)
+            server.install(client)
+            self.assertEqual(client.get(self.url).status_code, 200)
+            client.close()
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+
+from NflDataLoader import httpclient, scheduler
+from NflDataLoader.replay import CassetteStore, replay
+from NflDataLoader.roster import download_roster, download_rosters, parse_roster
+
+PLAYERS = [('Kuechly, Luke', '00-0029248', 'ESB123456'),
+           ('Newton, Cam', '00-0027939', 'ESB654321'),
+           ('Olsen, Greg', '00-0025426', 'ESB111111')]
+
+
+def roster_html(players) -> str:
+    rows = ''.join(
+        f'<tr><td>{i}</td><td><a href="/player/p{i}/{gsis_id}/profile">{name}</a></td>'
+        f'<td>LB</td><td>ACT</td><td>6-3</td><td>238</td><td>12/20/1991</td><td>8</td>'
+        f'<td>Boston College</td></tr>'
+        for i, (name, gsis_id, _) in enumerate(players))
+    return ('<html><body><div id="result"><table><tbody><tr><td>header</td></tr></tbody>'
+            f'<tbody>{rows}</tbody></table></div></body></html>')
+
+
+class TestRoster(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        store = CassetteStore(self.tmpdir.name)
+        store.add('GET', 'http://www.nfl.com/teams/roster?team=CAR', 200,
+                  roster_html(PLAYERS).encode())
+        store.add('GET', 'http://www.nfl.com/teams/roster?team=ATL', 200,
+                  roster_html(PLAYERS[:1]).encode())
+        for i, (_, gsis_id, esb_id) in enumerate(PLAYERS):
+            store.add('GET', f'http://www.nfl.com/player/p{i}/{gsis_id}/profile', 200,
+                      f'<html><!-- GSIS ID: {gsis_id} ESB ID: {esb_id} --></html>'.encode())
+        self.client = httpclient.configure()
+        replay(store.directory, self.client, latency=0.01)
+        self.requests = []
+        self.client.add_hook(lambda response, stage: self.requests.append(stage))
+        scheduler.configure(workers=4, default_rate=(1000, 1000),
+                            rates={'www.nfl.com': (1000, 1000)})
+
+
+    def test_parse_without_ids(self):
+        roster, player_urls = parse_roster(roster_html(PLAYERS), 'CAR')
+        self.assertListEqual([player['name'] for player in roster],
+                             [name for name, _, _ in PLAYERS])
+        self.assertIsNone(roster[0]['player_id'])
+        self.assertEqual(player_urls[1], 'http://www.nfl.com/player/p1/00-0027939/profile')
+        self.assertListEqual(self.requests, [])
+
+
+    def test_ids_in_roster_order(self):
+        roster = download_roster('CAR')
+        self.assertListEqual([(player['player_id'], player['esb_id']) for player in roster],
+                             [(gsis_id, esb_id) for _, gsis_id, esb_id in PLAYERS])
+        self.assertEqual(self.requests.count('player_ids'), 3)
+
+
+    def test_rosters_of_many_teams(self):
+        rosters = download_rosters(['CAR', 'ATL'])
+        self.assertListEqual([player['player_id'] for player in rosters['ATL']],
+                             ['00-0029248'])
+        self.assertListEqual([player['team'] for player in rosters['CAR']], ['CAR'] * 3)
+        # the profile of the player of both rosters is fetched once
+        self.assertEqual(self.requests.count('player_ids'), 3)
+
+
+    def tearDown(self):
+        httpclient.configure()
+        scheduler.configure()
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
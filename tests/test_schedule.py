@@ -1,8 +1,18 @@
+import tempfile
 import unittest
 
-from datetime import date
+from datetime import date, timedelta
+from pathlib import Path
 
-from NflDataLoader.scheduleloader import ScheduleLoader, create_date_from_eid
+from NflDataLoader import httpclient, scheduler
+from NflDataLoader.replay import CassetteStore, replay
+from NflDataLoader.scheduleloader import (
+    ScheduleLoader, ScheduleIndex, SCHEDULE_URL, create_date_from_eid, save_obj_to_json)
+
+
+def scorestrip(season: int, week: int) -> bytes:
+    return (f'<ss><gms w="{week}" y="{season}" t="R"><g eid="{season}0905{week:02d}" '
+            f'gsis="1" h="CHI" v="GB"/></gms></ss>').encode()
 
 
 class TestScheduleLoader(unittest.TestCase):
@@ -14,6 +24,108 @@ class TestScheduleLoader(unittest.TestCase):
         self.assertEqual(test_game['entry1'], 1)
         self.assertEqual(test_game['entry2'], 2)
 
+    def test_cached_schedule(self):
+        games = [{'eid': '2019090500', 'home': 'CHI', 'away': 'GB'}]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            save_obj_to_json(games, Path(tmpdir) / '2019' / 'REG', '1.json')
+            loader = ScheduleLoader(2019, 1, update=False, path=tmpdir)
+            self.assertListEqual(loader.schedule, games)
+
+
+    def test_refresh_only_stale_weeks(self):
+        open_season = date.today().year + 1
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = CassetteStore(Path(tmpdir) / 'cassettes')
+            for season in (2019, open_season):
+                for week in range(1, 18):
+                    store.add('GET', f'{SCHEDULE_URL}?season={season}&seasonType=REG&week={week}',
+                              200, scorestrip(season, week))
+            client = httpclient.configure()
+            replay(store.directory, client)
+            requests = []
+            client.add_hook(lambda response, stage: requests.append(response.url))
+            path = Path(tmpdir) / 'schedule'
+            try:
+                ScheduleLoader(2019, update=True, path=path)
+                self.assertEqual(len(requests), 17)
+                # finished weeks are never fetched again
+                loader = ScheduleLoader(2019, 1, update=True, ttl=0, path=path)
+                self.assertEqual(len(requests), 17)
+                self.assertEqual(loader.schedule[0]['eid'], '2019090501')
+                # a truncated schedule is fetched again
+                week_path = path / '2019' / 'REG' / '1.json'
+                week_path.write_bytes(week_path.read_bytes()[:-10])
+                loader = ScheduleLoader(2019, 1, update=False, path=path)
+                self.assertEqual(len(requests), 18)
+                self.assertEqual(loader.schedule[0]['eid'], '2019090501')
+                # open weeks are fetched again after the ttl
+                ScheduleLoader(open_season, update=True, path=path)
+                ScheduleLoader(open_season, update=True, path=path)
+                self.assertEqual(len(requests), 35)
+                loader = ScheduleLoader(open_season, update=False, ttl=0, path=path)
+                self.assertListEqual(loader.update_schedule(), list(range(1, 18)))
+                self.assertEqual(len(requests), 52)
+            finally:
+                httpclient.configure()
+
+
+    def test_index_reloads_failed_and_stale_weeks(self):
+        open_season = date.today().year + 1
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = CassetteStore(Path(tmpdir) / 'cassettes')
+            url = f'{SCHEDULE_URL}?season={open_season}&seasonType=REG&week=' + '{}'
+            store.add('GET', url.format(1), 200, scorestrip(open_season, 1))
+            replay(store.directory, httpclient.configure(backoff=0))
+            try:
+                loader = ScheduleLoader(open_season, update=False, ttl=3600,
+                                        path=Path(tmpdir) / 'schedule')
+                index = loader.get_index()
+                self.assertIsNotNone(index.get_eid(open_season, 'REG', 1, 'CHI'))
+                self.assertIsNone(index.get_eid(open_season, 'REG', 2, 'CHI'))
+                # the failed week is loaded once it is available
+                store.add('GET', url.format(2), 200, scorestrip(open_season, 2))
+                index = loader.get_index()
+                self.assertEqual(index.get_eid(open_season, 'REG', 2, 'GB'),
+                                 f'{open_season}090502')
+                # a stale week is fetched again
+                store.add('GET', url.format(1), 200, scorestrip(open_season, 1).replace(
+                    b'h="CHI"', b'h="DET"'))
+                loader.ttl = 0
+                index = loader.get_index()
+                self.assertEqual(index.get(open_season, 'REG', 1, 'GB').opponent, 'DET')
+            finally:
+                httpclient.configure()
+
+
+    def test_single_week_uses_rate_limit(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = CassetteStore(Path(tmpdir) / 'cassettes')
+            store.add('GET', f'{SCHEDULE_URL}?season=2019&seasonType=REG&week=1', 200,
+                      scorestrip(2019, 1))
+            replay(store.directory, httpclient.configure(backoff=0))
+            bucket = scheduler.configure(rates={'nfl.com': (0.001, 10)}).get_bucket('nfl.com')
+            try:
+                loader = ScheduleLoader(2019, 1, update=False, path=Path(tmpdir) / 'schedule')
+                self.assertEqual(loader.schedule[0]['eid'], '2019090501')
+                self.assertLess(bucket.tokens, 10)
+            finally:
+                httpclient.configure()
+                scheduler.configure()
+
+
+    def test_get_current_week(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for week in range(1, 18):
+                gamedate = date(2019, 9, 5) + timedelta(weeks=week - 1)
+                games = [{'eid': f'{gamedate:%Y%m%d}00', 'home': 'NYG', 'away': 'NE',
+                          'week': week, 'finished': False}]
+                save_obj_to_json(games, Path(tmpdir) / '2019' / 'REG', f'{week}.json')
+            loader = ScheduleLoader(2019, update=False, path=tmpdir)
+            self.assertEqual(loader.get_current_week(date(2019, 9, 1)), 1)
+            self.assertEqual(loader.get_current_week(date(2019, 9, 13)), 3)
+            self.assertEqual(loader.get_current_week(date(2020, 1, 15)), 17)
+
+
     def test_get_previous_season(self):
         '''
         tests for the correct previous season (< march).
@@ -45,5 +157,34 @@ class TestScheduleLoader(unittest.TestCase):
         self.assertEqual(create_date_from_eid(eid), d)
 
 
+class TestScheduleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ScheduleIndex()
+        self.index.add_week(2019, 'REG', 1, [
+            {'eid': '2019090800', 'home': 'NYG', 'away': 'NE'},
+            {'eid': '2019090801', 'home': 'NYJ', 'away': 'BUF'},
+        ])
+
+
+    def test_exact_team_match(self):
+        game = self.index.get(2019, 'REG', 1, 'NE')
+        self.assertEqual(game.eid, '2019090800')
+        self.assertEqual(game.opponent, 'NYG')
+        self.assertFalse(game.home)
+        self.assertEqual(game.date, date(2019, 9, 8))
+        self.assertEqual(self.index.get_eid(2019, 'REG', 1, 'NYJ'), '2019090801')
+        self.assertIsNone(self.index.get_eid(2019, 'REG', 1, 'NY'))
+        self.assertEqual(self.index.get_game('2019090801')['away'], 'BUF')
+
+
+    def test_add_week_replaces_games(self):
+        self.index.add_week(2019, 'REG', 1, [{'eid': '2019090802', 'home': 'NYG', 'away': 'DAL'}])
+        self.assertEqual(len(self.index), 1)
+        self.assertIsNone(self.index.get(2019, 'REG', 1, 'NE'))
+        self.assertEqual(self.index.get(2019, 'REG', 1, 'NYG').opponent, 'DAL')
+        self.assertListEqual([game['eid'] for game in self.index.get_games(2019, 'REG', 1)],
+                             ['2019090802'])
+
+
 if __name__ == "__main__":
     unittest.main()
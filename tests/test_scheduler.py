@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+from NflDataLoader.scheduler import FetchScheduler, TokenBucket, INTERACTIVE, BULK
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+
+
+class TestFetchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FetchScheduler(workers=1, default_rate=(1000, 1000))
+
+
+    def test_priority_order(self):
+        started = threading.Event()
+        release = threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            release.wait()
+
+        self.scheduler.submit(block)
+        started.wait()
+        futures = [self.scheduler.submit(order.append, 'bulk 1', priority=BULK),
+                   self.scheduler.submit(order.append, 'bulk 2', priority=BULK),
+                   self.scheduler.submit(order.append, 'interactive', priority=INTERACTIVE)]
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertListEqual(order, ['interactive', 'bulk 1', 'bulk 2'])
+
+
+    def test_one_bucket_per_site(self):
+        scheduler = FetchScheduler(rates={'www.nfl.com': (5, 5)})
+        bucket = scheduler.get_bucket('www.nfl.com')
+        self.assertIs(scheduler.get_bucket('nfl.com'), bucket)
+        self.assertIs(scheduler.get_bucket('WWW.NFL.COM'), bucket)
+        self.assertEqual(bucket.rate, 5)
+        self.assertIsNot(scheduler.get_bucket('example.com'), bucket)
+
+
+    def test_exception_in_future(self):
+        future = self.scheduler.submit(int, 'no number')
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+
+
+    def test_bounded_concurrency(self):
+        scheduler = FetchScheduler(workers=2)
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def job():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        futures = [scheduler.submit(job) for _ in range(6)]
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+        self.assertEqual(running[1], 2)
+
+
+    def test_rate_limit_per_host(self):
+        scheduler = FetchScheduler(workers=4, rates={'slow.example': (20, 1)})
+        start = time.monotonic()
+        futures = [scheduler.submit(time.monotonic, host='slow.example') for _ in range(5)]
+        times = sorted(future.result(timeout=5) - start for future in futures)
+        scheduler.shutdown()
+        # one token at once, then 20 per second
+        self.assertGreaterEqual(times[-1], 0.18)
+
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
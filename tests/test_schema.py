@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+import warnings
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from NflDataLoader import instrument
+from NflDataLoader.schema import (
+    TEAM_DTYPE, compact_table, concat_tables, memory_report)
+from NflDataLoader.tablestore import pyarrow, get_store
+
+
+def create_table(team='CAR', opponent='NO'):
+    return pd.DataFrame({
+        'player_id': ['00-01', '00-02', '00-03'],
+        'name': ['A. Player', 'B. Player', 'C. Player'],
+        'team': [team] * 3,
+        'opponent': [opponent] * 3,
+        'position': ['QB', 'WR', 'XX'],
+        'college': ['Ohio State', 0, 'Auburn'],
+        'rush_yds': [12.0, 0.0, 103.0],
+        'rush_att': [3.0, 0.0, 21.0],
+        'fpts': [1.2, 0.0, 10.0],
+        'seasonweek': [1, 1, 1],
+        'date': [date(2019, 9, 8)] * 3,
+        'birthdate': [date(1990, 1, 1), 0, date(1995, 5, 5)],
+    })
+
+
+class TestCompactSchema(unittest.TestCase):
+    def test_compact_table(self):
+        table = compact_table(create_table())
+        self.assertEqual(table['team'].dtype, TEAM_DTYPE)
+        self.assertEqual(table['opponent'].dtype, TEAM_DTYPE)
+        self.assertIsInstance(table['position'].dtype, pd.CategoricalDtype)
+        self.assertListEqual(list(table['position']), ['QB', 'WR', 'XX'])
+        self.assertListEqual(list(table['college']), ['Ohio State', '0', 'Auburn'])
+        self.assertEqual(table['rush_yds'].dtype, np.float32)
+        self.assertEqual(table['rush_att'].dtype, np.int16)
+        self.assertEqual(table['fpts'].dtype, np.float32)
+        self.assertEqual(table['seasonweek'].dtype, np.int16)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(table['date']))
+        self.assertTrue(pd.isna(table.loc[1, 'birthdate']))
+
+
+    def test_float_fallback_is_reported_once(self):
+        enabled = instrument.is_enabled()
+        instrument.RECORDER.reset()
+        instrument.enable()
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                for _ in range(3):
+                    table = compact_table(create_table().assign(kret_ret=[0.5, 1.0, 2.0]))
+                    self.assertEqual(table['kret_ret'].dtype, np.float32)
+            self.assertEqual([str(w.message) for w in caught].count(
+                "Column kret_ret has fractional or missing values, kept as float32"), 1)
+            self.assertEqual(instrument.RECORDER.as_dict()['counters'][
+                'schema.float_fallback.kret_ret'], 3)
+        finally:
+            if not enabled:
+                instrument.disable()
+            instrument.RECORDER.reset()
+
+
+    def test_concat_keeps_categoricals(self):
+        week1 = compact_table(create_table())
+        week2 = create_table(team='ATL', opponent='TB')
+        week2['rush_yds'] += 0.5
+        week2['rush_att'] *= 100
+        week2 = compact_table(week2)
+        # the dtypes don't depend on the values of a table
+        self.assertTrue((week1.dtypes == week2.dtypes).all())
+        season = concat_tables([week1, week2])
+        self.assertEqual(season['team'].dtype, TEAM_DTYPE)
+        self.assertIsInstance(season['name'].dtype, pd.CategoricalDtype)
+        self.assertEqual(season['rush_yds'].dtype, np.float32)
+        self.assertListEqual(list(season['rush_att'][3:]), [300, 0, 2100])
+        self.assertListEqual(list(season['team']), ['CAR'] * 3 + ['ATL'] * 3)
+
+
+    def test_memory_report(self):
+        report = memory_report(create_table())
+        self.assertEqual(report.loc['team', 'compact_dtype'], 'category')
+        self.assertEqual(report.loc['rush_yds', 'legacy_dtype'], 'float64')
+        self.assertEqual(report.loc['total', 'legacy_bytes'],
+                         report['legacy_bytes'].drop('total').sum())
+
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_parquet_keeps_compact_schema(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            store = get_store('parquet')
+            store.write(compact_table(create_table()), root / '1')
+            store.write(compact_table(create_table(team='ATL', opponent='TB')), root / '2')
+            store.write_concat([root / '1', root / '2'], root / 'season')
+            season = store.read(root / 'season')
+        self.assertIsInstance(season['team'].dtype, pd.CategoricalDtype)
+        self.assertEqual(season['rush_yds'].dtype, np.float32)
+        self.assertListEqual(list(season['team']), ['CAR'] * 3 + ['ATL'] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import io
+import unittest
+from datetime import date
+from xml.sax import make_parser
+
+from NflDataLoader.NFLHandler import NflHandler
+from NflDataLoader.scorestrip import parse_games, parse_scorestrips, to_games, SCHEDULE_COLUMNS
+
+WEEK_1 = (b'<?xml version="1.0" encoding="UTF-8"?>\n<ss><gms w="1" y="2019" t="R">'
+          b'<g eid="2019090500" gsis="58150" d="Thu" h="CHI" v="GB" q="F"/>'
+          b'<g eid="2019090800" gsis="58151" d="Sun" h="NYG" v="NE" q="F"/></gms></ss>')
+WEEK_2 = (b'<ss><gms w="2" y="2019" t="R">'
+          b'<g eid="2019091200" gsis="58166" d="Thu" h="CAR" v="TB" q="P"/></gms></ss>')
+
+
+def handler_games(season, seasontype, week, content) -> list:
+    parser = make_parser()
+    handler = NflHandler(season, seasontype, week)
+    parser.setContentHandler(handler)
+    parser.parse(io.StringIO(content.decode()))
+    return handler.get_games()
+
+
+class TestScorestrip(unittest.TestCase):
+    def setUp(self):
+        self.documents = [(2019, 'REG', 1, WEEK_1), (2019, 'REG', 2, WEEK_2),
+                          (2019, 'REG', 3, b'<ss></ss>')]
+
+
+    def test_same_games_as_nflhandler(self):
+        expected = [game for document in self.documents for game in handler_games(*document)]
+        self.assertListEqual(to_games(parse_scorestrips(self.documents)), expected)
+        self.assertListEqual(parse_games(self.documents), expected)
+        today = date(2019, 9, 10)
+        self.assertListEqual(parse_games(self.documents, today=today),
+                             to_games(parse_scorestrips(self.documents, today=today)))
+
+
+    def test_columnar_schedule(self):
+        schedule = parse_scorestrips(self.documents, today=date(2019, 9, 10))
+        self.assertListEqual(list(schedule.columns), list(SCHEDULE_COLUMNS))
+        self.assertListEqual(list(schedule['week']), [1, 1, 2])
+        self.assertListEqual(list(schedule['home']), ['CHI', 'NYG', 'CAR'])
+        self.assertListEqual(list(schedule['finished']), [True, True, False])
+        self.assertEqual(schedule['date'][2].date(), date(2019, 9, 12))
+        self.assertEqual(len(parse_scorestrips([])), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
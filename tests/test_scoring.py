@@ -0,0 +1,68 @@
+import unittest
+
+import pandas as pd
+
+import numpy as np
+
+from NflDataLoader.scoring import standard_fpts, score_table, derive_ruleset, STANDARD
+
+
+def create_table(**columns):
+    base = {
+        'pass_yds': 0, 'pass_tds': 0, 'pass_ints': 0, 'pass_twoptm': 0,
+        'rush_yds': 0, 'rush_tds': 0, 'rush_twoptm': 0,
+        'recv_yds': 0, 'recv_tds': 0, 'recv_twoptm': 0,
+        'sk': 0, 'int': 0, 'pts_allwd': 0, 'position': 'QB',
+    }
+    rows = max(len(value) for value in columns.values())
+    table = pd.DataFrame({key: [value] * rows for key, value in base.items()})
+    for key, value in columns.items():
+        table[key] = value
+    return table
+
+
+class TestStandardFpts(unittest.TestCase):
+    def test_offense(self):
+        table = create_table(pass_yds=[250, 0], pass_tds=[2, 0], pass_ints=[1, 0],
+                             rush_yds=[0, 100], rush_tds=[0, 1])
+        np.testing.assert_allclose(standard_fpts(table), [16.0, 16.0])
+
+
+    def test_fieldgoal_bonus(self):
+        table = create_table(k_fgyds=[49, 50], k_fgm=[2, 2], k_xpmade=[1, 3])
+        np.testing.assert_allclose(standard_fpts(table), [7.0, 13.0])
+
+
+    def test_points_allowed_bracket(self):
+        allowed = [0, 6, 13, 20, 27, 34, 35]
+        table = create_table(pts_allwd=allowed, position=['LB'] * 6 + ['CB'])
+        expected = [pts / 7 for pts in (10, 7, 4, 1, 0, -1, -4)]
+        np.testing.assert_allclose(standard_fpts(table), expected)
+
+
+    def test_points_allowed_only_for_defense(self):
+        table = create_table(pts_allwd=[0, 0], position=['QB', 'DE'])
+        np.testing.assert_allclose(standard_fpts(table), [0.0, 10.0])
+
+
+class TestScoreTable(unittest.TestCase):
+    def test_rulesets_in_one_pass(self):
+        table = create_table(recv_rec=[4, 0], recv_yds=[50, 0], pass_tds=[0, 1])
+        points = score_table(table, ('standard', 'half_ppr', 'ppr'))
+        self.assertListEqual(
+            list(points.columns), ['fpts_standard', 'fpts_half_ppr', 'fpts_ppr'])
+        np.testing.assert_allclose(points['fpts_standard'], [5.0, 4.0])
+        np.testing.assert_allclose(points['fpts_half_ppr'], [7.0, 4.0])
+        np.testing.assert_allclose(points['fpts_ppr'], [9.0, 4.0])
+
+
+    def test_custom_ruleset(self):
+        ruleset = derive_ruleset(STANDARD, 'six_pt_pass', pass_tds=6)
+        table = create_table(pass_tds=[2], k_fgyds=[55], k_fgm=[1])
+        points = score_table(table, ('standard', ruleset))
+        np.testing.assert_allclose(points['fpts_standard'], [13.0])
+        np.testing.assert_allclose(points['fpts_six_pt_pass'], [17.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from NflDataLoader import serialization
+from NflDataLoader.serialization import Serializer, CorruptFileError, CODECS, COMPRESSIONS
+
+GAME = {'2019090500': {'home': {'abbr': 'CHI', 'score': {'T': 3}}, 'away': {'abbr': 'GB'}}}
+
+
+class TestSerializer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / '2019090500.json'
+
+
+    def test_roundtrip_of_all_codecs(self):
+        for codec in CODECS:
+            for compression in COMPRESSIONS:
+                try:
+                    serializer = Serializer(codec, compression)
+                except ImportError:
+                    continue
+                with self.subTest(codec=codec, compression=compression):
+                    serializer.write(GAME, self.path)
+                    self.assertDictEqual(serializer.read(self.path), GAME)
+                    if codec != 'pickle':
+                        # every serializer reads the json files of the others
+                        self.assertDictEqual(Serializer().read(self.path), GAME)
+
+
+    def test_pickle_is_opt_in(self):
+        data = Serializer('pickle').dumps(GAME)
+        with self.assertRaises(CorruptFileError):
+            Serializer().loads(data)
+        self.assertDictEqual(Serializer('pickle').loads(data), GAME)
+
+
+    def test_legacy_json_is_readable(self):
+        self.path.write_text('{"2019090500": {"home": {"abbr": "CHI"}}}')
+        self.assertEqual(Serializer().read(self.path)['2019090500']['home']['abbr'], 'CHI')
+
+
+    def test_corrupt_files_raise(self):
+        serializer = Serializer('json', 'zlib')
+        data = serializer.dumps(GAME)
+        for corrupt in (data[:-5], data[:-1] + bytes([data[-1] ^ 1]), b'{"2019090500": {"ho',
+                        data.replace(b' json ', b' jsom ', 1),
+                        data.replace(b' zlib ', b' zlia ', 1)):
+            with self.assertRaises(CorruptFileError):
+                serializer.loads(corrupt)
+
+
+    def test_decoded_size(self):
+        size = len(Serializer().codec.dumps(GAME))
+        for serializer in (Serializer(), Serializer('json', 'zlib')):
+            obj, decoded = serializer.loads_sized(serializer.dumps(GAME))
+            self.assertDictEqual(obj, GAME)
+            self.assertEqual(decoded, size)
+
+
+    def test_atomic_write(self):
+        serialization.write([1, 2], self.path)
+        serialization.write([3], self.path)
+        self.assertListEqual(serialization.read(self.path), [3])
+        self.assertListEqual(list(Path(self.tmpdir.name).iterdir()), [self.path])
+
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            Serializer('yaml')
+        with self.assertRaises(ValueError):
+            Serializer('json', 'rar')
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
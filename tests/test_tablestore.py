@@ -0,0 +1,133 @@
+import tempfile
+import unittest
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+from NflDataLoader.tablestore import (
+    pyarrow, get_store, migrate_csv_cache, CsvStore, MIXED_COLUMNS)
+
+
+def create_table():
+    return pd.DataFrame({
+        'player_id': ['00-01', '00-02', '00-03'],
+        'rush_yds': [12.0, 0.0, 103.5],
+        'seasonweek': [1, 1, 1],
+        'date': pd.to_datetime(['2019-09-08'] * 3),
+        'college': ['Ohio State', 0, 'Auburn'],
+    })
+
+
+def check_write_concat(test, store, root):
+    week1 = create_table().drop(columns=['college'])
+    week2 = create_table().drop(columns=['rush_yds'])
+    week2['seasonweek'] = 2
+    store.write(week1, root / '1')
+    store.write(week2, root / '2')
+    path = store.write_concat([root / '1', root / '2'], root / 'season')
+    test.assertEqual(path, store.get_path(root / 'season'))
+    season = store.read(root / 'season')
+    expected = pd.concat([week1, week2], ignore_index=True, sort=False)
+    test.assertListEqual(list(season.columns), list(expected.columns))
+    test.assertListEqual(list(season.index), list(range(6)))
+    test.assertListEqual(list(season['seasonweek']), [1, 1, 1, 2, 2, 2])
+    test.assertListEqual(list(season['rush_yds'].fillna(-1)), [12.0, 0.0, 103.5, -1, -1, -1])
+
+
+class TestCsvStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stem = Path(self.tmpdir.name) / 'CAR' / '1'
+
+
+    def test_column_projection(self):
+        store = get_store('csv')
+        store.write(create_table(), self.stem)
+        table = store.read(self.stem, columns=['player_id', 'rush_yds'])
+        self.assertListEqual(list(table.columns), ['player_id', 'rush_yds'])
+        self.assertListEqual(list(table['rush_yds']), [12.0, 0.0, 103.5])
+
+
+    def test_write_concat(self):
+        store = get_store('csv')
+        check_write_concat(self, store, Path(self.tmpdir.name))
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow not installed")
+class TestColumnarStores(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        self.stem = self.root / 'CAR' / '1'
+
+
+    def test_roundtrip_keeps_dtypes(self):
+        table = create_table()
+        for fmt in ('parquet', 'feather'):
+            store = get_store(fmt)
+            store.write(table, self.stem)
+            result = store.read(self.stem)
+            self.assertDictEqual(dict(result.dtypes.drop('college')),
+                                 dict(table.dtypes.drop('college')))
+            self.assertListEqual(list(result['college']), ['Ohio State', '0', 'Auburn'])
+
+
+    def test_known_mixed_columns(self):
+        # a player without infos gets 0 in the text columns of the player infos
+        table = pd.DataFrame({column: ['x', 0] for column in MIXED_COLUMNS})
+        table['birthdate'] = [pd.Timestamp('1990-01-01').date(), 0]
+        store = get_store('parquet', strict=True)
+        store.write(table, self.stem)
+        self.assertListEqual(list(store.read(self.stem)['college']), ['x', '0'])
+
+
+    def test_unknown_mixed_column(self):
+        table = create_table().rename(columns={'college': 'hometown'})
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            get_store('parquet').write(table, self.stem)
+        self.assertIn('hometown', str(caught[0].message))
+        with self.assertRaises(ValueError):
+            get_store('parquet', strict=True).write(table, self.stem)
+
+
+    def test_column_projection(self):
+        store = get_store('parquet')
+        store.write(create_table(), self.stem)
+        table = store.read(self.stem, columns=['seasonweek'])
+        self.assertListEqual(list(table.columns), ['seasonweek'])
+
+
+    def test_reads_legacy_csv(self):
+        CsvStore().write(create_table(), self.stem)
+        store = get_store('parquet')
+        self.assertTrue(store.exists(self.stem))
+        table = store.read(self.stem)
+        self.assertTrue(store.get_path(self.stem).exists())
+        self.assertListEqual(list(table['player_id']), ['00-01', '00-02', '00-03'])
+
+
+    def test_write_concat(self):
+        for fmt in ('parquet', 'feather'):
+            check_write_concat(self, get_store(fmt), self.root / fmt)
+
+
+    def test_migrate_csv_cache(self):
+        CsvStore().write(create_table(), self.stem)
+        CsvStore().write(create_table(), self.root / '1')
+        converted = migrate_csv_cache(self.root, 'parquet', remove=True)
+        self.assertEqual(len(converted), 2)
+        self.assertListEqual(list(self.root.rglob('*.csv')), [])
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()